@@ -0,0 +1,124 @@
+"""
+Control Planes (Mock Backend + Batched Fan-Out)
+Description: Stand-in for the production and staging control planes that
+             pattern 10 talks to. Each mock plane answers one command per
+             round trip after a configurable latency, serves a bounded number
+             of requests at once, and reports a status that is stable per
+             command. fan_out_commands() sends a whole list of commands to a
+             plane with bounded concurrency and folds the answers into one
+             compact summary, so a fleet check is one tool call instead of
+             hundreds of LLM-driven ones.
+
+Run `python control_plane.py` to see round trips and latency against fleet size.
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import Counter
+
+# 1. Configuration
+PLANE_LATENCY_SECONDS = float(os.getenv("MCP_PLANE_LATENCY", "0.05"))   # Per round trip
+PLANE_CAPACITY = int(os.getenv("MCP_PLANE_CAPACITY", "32"))            # Requests a plane serves at once
+BATCH_CONCURRENCY = int(os.getenv("MCP_BATCH_CONCURRENCY", "16"))      # In-flight commands per batched call
+MAX_BATCH_COMMANDS = 1000
+MAX_LISTED_ISSUES = 10   # The summary names the first few non-healthy targets only
+
+
+# 2. Mock Control Plane
+class MockControlPlane:
+    """One plane: fixed latency per round trip, bounded capacity, deterministic status per command."""
+
+    def __init__(self, name: str, healthy: str, statuses: dict, latency: float = PLANE_LATENCY_SECONDS,
+                 capacity: int = PLANE_CAPACITY):
+        self.name = name
+        self.healthy = healthy
+        self.statuses = statuses   # status -> share of commands that report it (the rest are healthy)
+        self.latency = latency
+        self.capacity = capacity
+        self._capacity, self._loop = None, None
+        self.round_trips = 0
+
+    def status_for(self, command: str) -> str:
+        """Stable per command, so repeated checks of one service agree."""
+        bucket = int.from_bytes(hashlib.blake2b(command.encode("utf-8"), digest_size=4).digest(), "little") / 2 ** 32
+        for status, share in self.statuses.items():
+            if bucket < share:
+                return status
+            bucket -= share
+        return self.healthy
+
+    async def execute(self, command: str) -> str:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:   # Semaphores are bound to one loop; the Validator runs several
+            self._capacity, self._loop = asyncio.Semaphore(self.capacity), loop
+        async with self._capacity:
+            self.round_trips += 1
+            await asyncio.sleep(self.latency)
+            return self.status_for(command)
+
+
+PLANES = {
+    "production": MockControlPlane("production", "Stable", {"Degraded": 0.04, "Unreachable": 0.01}),
+    "staging": MockControlPlane("staging", "Syncing with main branch", {"Build failed": 0.05, "Drifted": 0.05}),
+}
+
+
+# 3. Batched Fan-Out
+async def fan_out_commands(plane: str, commands: list, concurrency: int = BATCH_CONCURRENCY) -> dict:
+    """Runs every command against one plane, at most `concurrency` at a time, and aggregates the answers."""
+    target = PLANES[plane]
+    commands = list(dict.fromkeys(c.strip() for c in commands if c and c.strip()))[:MAX_BATCH_COMMANDS]
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(command: str) -> tuple:
+        async with semaphore:
+            return command, await target.execute(command)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one(c) for c in commands))
+    by_status = Counter(status for _, status in results)
+    issues = [(command, status) for command, status in results if status != target.healthy]
+    return {"plane": plane, "total": len(results), "healthy": by_status[target.healthy],
+            "by_status": dict(by_status), "issues": issues, "seconds": time.perf_counter() - started}
+
+
+def format_summary(summary: dict) -> str:
+    """Compact text for the model: counts first, then only the targets that need attention."""
+    counts = ", ".join(f"{status}: {n}" for status, n in sorted(summary["by_status"].items(), key=lambda kv: -kv[1]))
+    lines = [f"{summary['plane'].upper()}_PLANE: {summary['total']} commands checked, "
+             f"{summary['healthy']} healthy ({counts})."]
+    for command, status in summary["issues"][:MAX_LISTED_ISSUES]:
+        lines.append(f"- '{command}': {status}")
+    hidden = len(summary["issues"]) - MAX_LISTED_ISSUES
+    if hidden > 0:
+        lines.append(f"- ... and {hidden} more non-healthy targets.")
+    return "\n".join(lines)
+
+
+# --- BENCHMARK: PER-COMMAND TOOL CALLS VS ONE BATCHED CALL ---
+if __name__ == "__main__":
+    LLM_TURN_SECONDS = 1.5   # Typical local model round trip to decide and emit one tool call
+
+    async def main():
+        plane = PLANES["production"]
+        print(f"🕹️ Fleet health check: plane latency {plane.latency * 1000:.0f} ms, batch concurrency "
+              f"{BATCH_CONCURRENCY}, LLM turn ~{LLM_TURN_SECONDS}s (estimated, not measured)\n")
+        print(f"{'Services':>9}{'Mode':>12}{'Tool calls':>12}{'Round trips':>13}{'Plane time':>12}{'Est. total':>12}")
+        for services in (10, 100, 500):
+            commands = [f"health svc-{i:04d}" for i in range(services)]
+
+            plane.round_trips, started = 0, time.perf_counter()
+            for command in commands:   # One LLM-driven tool call per service
+                await plane.execute(command)
+            plane_seconds = time.perf_counter() - started
+            print(f"{services:>9}{'per-command':>12}{services:>12}{plane.round_trips:>13}{plane_seconds:>11.2f}s"
+                  f"{plane_seconds + services * LLM_TURN_SECONDS:>11.1f}s")
+
+            plane.round_trips = 0
+            summary = await fan_out_commands("production", commands)
+            print(f"{services:>9}{'batched':>12}{1:>12}{plane.round_trips:>13}{summary['seconds']:>11.2f}s"
+                  f"{summary['seconds'] + LLM_TURN_SECONDS:>11.1f}s")
+        print(f"\nSample summary returned to the model:\n{format_summary(summary)}")
+
+    asyncio.run(main())
@@ -2,69 +2,112 @@
 Pattern: Multi-Control Plane (MCP)
 Description: Demonstrates an agent acting as a central controller that 
              interfaces with multiple external control planes or environments.
+             Plane queries run through tool_runtime.py (short TTL cache,
+             single-flight over the async plane clients), and prod/staging
+             checks from the same turn run concurrently, each bounded by a
+             timeout (tool_timeout.py).
+             Fleet-wide checks use the batched *_fleet tools, which fan a list
+             of commands out to a plane in one call (see control_plane.py).
 """
 import asyncio
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
+from tool_runtime import cached_tool, metrics_report
+from tool_timeout import timed_tool, timeout_summary
+from control_plane import PLANES, fan_out_commands, format_summary
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_MCP_Orchestrator"
 
 # 2. Control Plane Tools (The "Server" endpoints)
-def query_production_plane(command: str) -> str:
+# Commands may name case-sensitive resources, so only whitespace is normalized
+@timed_tool()
+@cached_tool(ttl_seconds=10, case_sensitive=True)
+async def query_production_plane(command: str) -> str:
     """Sends a management command to the Production Control Plane to verify live status."""
-    return f"PROD_PLANE: Command '{command}' verified. Status: Stable. Uptime: 99.99%."
+    status = await PLANES["production"].execute(command)
+    return f"PROD_PLANE: Command '{command}' verified. Status: {status}. Uptime: 99.99%."
 
-def query_staging_plane(command: str) -> str:
+@timed_tool()
+@cached_tool(ttl_seconds=10, case_sensitive=True)
+async def query_staging_plane(command: str) -> str:
     """Sends a management command to the Staging/Dev Control Plane for testing."""
-    return f"STAGING_PLANE: Command '{command}' executed. Status: Syncing with main branch."
+    status = await PLANES["staging"].execute(command)
+    return f"STAGING_PLANE: Command '{command}' executed. Status: {status}."
+
+# Batched endpoints: one tool call per fleet instead of one LLM round trip per service
+@timed_tool()
+@cached_tool(ttl_seconds=10, case_sensitive=True)
+async def query_production_fleet(commands: list[str]) -> str:
+    """
+    Sends many management commands to the Production Control Plane in one call, one command per
+    service or target (e.g. ["health payments-api", "health auth-svc"]). Returns a health summary
+    with only the targets that need attention. Use this whenever more than one target is involved.
+    """
+    return format_summary(await fan_out_commands("production", commands))
+
+@timed_tool()
+@cached_tool(ttl_seconds=10, case_sensitive=True)
+async def query_staging_fleet(commands: list[str]) -> str:
+    """
+    Sends many management commands to the Staging/Dev Control Plane in one call, one command per
+    service or target. Returns a summary with only the targets that need attention.
+    Use this whenever more than one target is involved.
+    """
+    return format_summary(await fan_out_commands("staging", commands))
+
+PLANE_TOOLS = [query_production_plane, query_staging_plane, query_production_fleet, query_staging_fleet]
 
 # 3. Define the Agent
 # Naming with underscores ensures Pydantic validation passes
 mcp_agent = Agent(
     name="Infrastructure_Controller",
     model=OLLAMA_MODEL,
-    tools=[query_production_plane, query_staging_plane],
+    tools=PLANE_TOOLS,
     instruction=(
         "You are a Multi-Control Plane orchestrator. Your role is to determine which "
         "environment (Production or Staging) a user's request pertains to and use the "
-        "appropriate tool to execute the check. Always report the status back to the CIO."
+        "appropriate tool to execute the check. If both environments are involved, call both "
+        "tools in the same turn. When the request names several services, hosts or the whole fleet, "
+        "use the *_fleet tool with one command per target instead of calling the single-command tool "
+        "repeatedly. Always report the status back to the CIO."
     )
 )
 
 # 4. MCP Execution Logic
-async def execute_mcp(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "mcp_session_10"
+async def execute_mcp(user_query: str, stream: bool = False):
+    async with session_scope(APP_NAME, user_id="cio_admin", prefix="mcp") as SID:
     
-    yield "🌐 **Step 1:** Establishing secure handshakes with distributed Control Planes..."
+        yield "🌐 **Step 1:** Establishing secure handshakes with distributed Control Planes..."
     
-    await session_service.create_session(user_id="cio_admin", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=mcp_agent, session_service=session_service, app_name=APP_NAME)
+        runner = get_runner(mcp_agent, APP_NAME)
     
-    yield "📡 **Step 2:** Routing environment-specific commands via MCP protocols..."
+        yield "📡 **Step 2:** Routing environment-specific commands via MCP protocols..."
     
-    response_text = ""
-    msg = types.Content(role='user', parts=[types.Part(text=user_query)])
+        response_text = ""
+        msg = types.Content(role='user', parts=[types.Part(text=user_query)])
     
-    async for event in runner.run_async(user_id="cio_admin", session_id=SID, new_message=msg):
-        if event.is_final_response():
-            response_text = event.content.parts[0].text
+        async for chunk in stream_agent(runner, "cio_admin", SID, msg, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                response_text = chunk
             
-    yield "✅ **Step 3:** Multi-plane synchronization complete. Reporting results..."
-    yield f"### 🕹️ Multi-Control Plane Execution Report\n\n{response_text}"
+        yield "✅ **Step 3:** Multi-plane synchronization complete. Reporting results..."
+        yield (f"### 🕹️ Multi-Control Plane Execution Report\n\n{response_text}\n\n---\n#### 📊 Tool Cache\n"
+               f"{metrics_report(PLANE_TOOLS)}\n\n"
+               f"{timeout_summary(PLANE_TOOLS)}")
 
 # --- REQUIRED ENTRY POINT FOR VALIDATOR & DASHBOARD ---
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """
     The master entry point used by the Master Validator and Streamlit UI.
     This function MUST be named 'run_pattern' and be async.
     """
-    return execute_mcp(user_query)
+    return execute_mcp(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
@@ -4,12 +4,11 @@ Description: Evaluates requests against specific Corporate KPIs to ensure alignm
 """
 import asyncio
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
 
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_Goal_Setter"
 
 goal_agent = Agent(
@@ -22,22 +21,22 @@ goal_agent = Agent(
     )
 )
 
-async def execute_goal_setting(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "goal_session_11"
-    await session_service.create_session(user_id="cio", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=goal_agent, session_service=session_service, app_name=APP_NAME)
+async def execute_goal_setting(user_query: str, stream: bool = False):
+    async with session_scope(APP_NAME, user_id="cio", prefix="goal") as SID:
+        runner = get_runner(goal_agent, APP_NAME)
     
-    yield "🎯 **Step 1:** Mapping request to Corporate Strategic Pillars..."
+        yield "🎯 **Step 1:** Mapping request to Corporate Strategic Pillars..."
     
-    response = ""
-    msg = types.Content(role='user', parts=[types.Part(text=user_query)])
-    async for event in runner.run_async(user_id="cio", session_id=SID, new_message=msg):
-        if event.is_final_response():
-            response = event.content.parts[0].text
+        response = ""
+        msg = types.Content(role='user', parts=[types.Part(text=user_query)])
+        async for chunk in stream_agent(runner, "cio", SID, msg, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                response = chunk
             
-    yield f"### 🏁 Strategic Alignment Report\n\n{response}"
+        yield f"### 🏁 Strategic Alignment Report\n\n{response}"
 
 # --- REQUIRED ENTRY POINT ---
-async def run_pattern(user_query: str):
-    return execute_goal_setting(user_query)
\ No newline at end of file
+async def run_pattern(user_query: str, stream: bool = False):
+    return execute_goal_setting(user_query, stream)
\ No newline at end of file
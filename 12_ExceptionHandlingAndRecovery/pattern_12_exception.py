@@ -6,16 +6,31 @@ Description: Demonstrates how the system handles tool or system failures
 import asyncio
 import random
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
+from resilience import resilient, RetryPolicy, CircuitBreaker
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_Resilience_App"
 
 # 2. THE RESILIENT TOOL
+def historical_fallback(system_name: str) -> str:
+    """Deterministic degraded answer used when every retry and hedge has failed."""
+    return (f"DEGRADED: {system_name} is unreachable after automated retries. "
+            "Historical average: 99.5% uptime; treat live status as unknown.")
+
+# Failures are absorbed here (backoff, circuit breaker, hedging, last-known-good cache)
+# instead of surfacing to the LLM and costing an extra reasoning round trip.
+@resilient(
+    retry=RetryPolicy(max_attempts=4, base_delay=0.1, max_delay=1.0),
+    breaker=CircuitBreaker(failure_threshold=5, reset_timeout=10.0),
+    timeout=5.0,
+    hedge_after=0.5,
+    fallback=historical_fallback,
+    max_stale=300.0,   # A cached reading older than 5 minutes is not reported; the historical fallback is
+)
 def query_legacy_system(system_name: str) -> str:
     """
     Simulates a query to a flaky legacy IT system.
@@ -35,41 +50,44 @@ resilient_agent = Agent(
     tools=[query_legacy_system],
     instruction=(
         "You are a system resilience specialist. Use the 'query_legacy_system' tool to check health. "
-        "If a tool call fails, DO NOT crash. Instead, explain the failure to the CIO "
-        "and provide a manual fallback recommendation based on historical averages."
+        "Retries and failover are handled by the tool itself. If it returns a 'DEGRADED' "
+        "result (a cached reading or the historical average), report that value with its age or "
+        "source and flag the live status as unverified."
     )
 )
 
 # 4. Execution Logic with UI Updates
-async def execute_resilience(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "resilience_session_12"
+async def execute_resilience(user_query: str, stream: bool = False):
+    async with session_scope(APP_NAME, user_id="cio_admin", prefix="resilience") as SID:
     
-    yield "🛡️ **Step 1:** Initializing failover protocols and probing legacy systems..."
+        yield "🛡️ **Step 1:** Initializing failover protocols and probing legacy systems..."
     
-    await session_service.create_session(user_id="cio_admin", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=resilient_agent, session_service=session_service, app_name=APP_NAME)
+        runner = get_runner(resilient_agent, APP_NAME)
     
-    yield "🧠 **Step 2:** Executing tool calls with internal error-trapping logic..."
+        yield "🧠 **Step 2:** Executing tool calls with internal error-trapping logic..."
     
-    response_text = ""
-    msg = types.Content(role='user', parts=[types.Part(text=user_query)])
+        response_text = ""
+        msg = types.Content(role='user', parts=[types.Part(text=user_query)])
     
-    try:
-        async for event in runner.run_async(user_id="cio_admin", session_id=SID, new_message=msg):
-            if event.is_final_response():
-                response_text = event.content.parts[0].text
-    except Exception as e:
-        # Final safety net for the generator itself
-        response_text = f"The system encountered a fatal error during processing: {str(e)}"
+        try:
+            async for chunk in stream_agent(runner, "cio_admin", SID, msg, stream):
+                if isinstance(chunk, TextDelta):
+                    yield chunk
+                else:
+                    response_text = chunk
+        except Exception as e:
+            # Final safety net for the generator itself
+            response_text = f"The system encountered a fatal error during processing: {str(e)}"
             
-    yield "✅ **Step 3:** System response generated (Resilience active)."
-    yield f"### 🔋 System Availability Report\n\n{response_text}"
+        stats = query_legacy_system.resilience.stats
+        yield (f"✅ **Step 3:** System response generated (Resilience active: {stats['retries']} retries, "
+               f"{stats['hedges']} hedges, {stats['fallbacks']} fallbacks so far).")
+        yield f"### 🔋 System Availability Report\n\n{response_text}"
 
 # --- REQUIRED ENTRY POINT FOR VALIDATOR & DASHBOARD ---
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """The master entry point used by the Validator and Streamlit UI."""
-    return execute_resilience(user_query)
+    return execute_resilience(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
@@ -5,13 +5,12 @@ Description: Integrates an approval gate for high-stakes actions,
 """
 import asyncio
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_HITL_Gatekeeper"
 
 # 2. Define the Agent
@@ -27,47 +26,47 @@ hitl_agent = Agent(
 )
 
 # 3. Execution Logic
-async def execute_hitl(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "hitl_session_13"
+async def execute_hitl(user_query: str, stream: bool = False):
+    async with session_scope(APP_NAME, user_id="cio_admin", prefix="hitl") as SID:
     
-    yield "🛡️ **Step 1:** Identifying high-risk operations in the request..."
+        yield "🛡️ **Step 1:** Identifying high-risk operations in the request..."
     
-    await session_service.create_session(user_id="cio_admin", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=hitl_agent, session_service=session_service, app_name=APP_NAME)
+        runner = get_runner(hitl_agent, APP_NAME)
     
-    yield "📝 **Step 2:** Generating Proposed Action Plan for human review..."
+        yield "📝 **Step 2:** Generating Proposed Action Plan for human review..."
     
-    # Simulate the agent drafting the plan
-    response_text = ""
-    msg = types.Content(role='user', parts=[types.Part(text=f"Draft an execution plan for: {user_query}")])
+        # Simulate the agent drafting the plan
+        response_text = ""
+        msg = types.Content(role='user', parts=[types.Part(text=f"Draft an execution plan for: {user_query}")])
     
-    async for event in runner.run_async(user_id="cio_admin", session_id=SID, new_message=msg):
-        if event.is_final_response():
-            response_text = event.content.parts[0].text
+        async for chunk in stream_agent(runner, "cio_admin", SID, msg, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                response_text = chunk
 
-    yield "🚦 **PAUSE:** Awaiting Human-in-the-Loop (HITL) validation..."
+        yield "🚦 **PAUSE:** Awaiting Human-in-the-Loop (HITL) validation..."
     
-    # In a production Streamlit app, this would wait for a button click. 
-    # For the validator, we proceed with the simulated approval.
-    yield "✅ **Step 3:** Human approval received. Finalizing execution report."
+        # In a production Streamlit app, this would wait for a button click. 
+        # For the validator, we proceed with the simulated approval.
+        yield "✅ **Step 3:** Human approval received. Finalizing execution report."
     
-    final_output = (
-        f"### 🛂 HITL Approval Record\n"
-        f"**Status:** APPROVED BY ADMIN\n\n"
-        f"**Proposed Plan:**\n{response_text}\n\n"
-        f"---\n"
-        f"**Action:** The system has logged this approval and is ready for deployment."
-    )
-    yield final_output
+        final_output = (
+            f"### 🛂 HITL Approval Record\n"
+            f"**Status:** APPROVED BY ADMIN\n\n"
+            f"**Proposed Plan:**\n{response_text}\n\n"
+            f"---\n"
+            f"**Action:** The system has logged this approval and is ready for deployment."
+        )
+        yield final_output
 
 # --- REQUIRED ENTRY POINT FOR VALIDATOR & DASHBOARD ---
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """
     The master entry point used by the Master Validator and Streamlit UI.
     This function MUST be named 'run_pattern' and be async.
     """
-    return execute_hitl(user_query)
+    return execute_hitl(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
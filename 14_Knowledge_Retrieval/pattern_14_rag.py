@@ -4,32 +4,50 @@ Description: Demonstrates how an agent retrieves specific facts from a
              knowledge base to augment its response for high accuracy.
 """
 import asyncio
+import os
+import time
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
+from policy_index import PolicyIndex
+from vector_index import VectorIndex, hybrid_search
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_RAG_Knowledge_Base"
+POLICY_CORPUS_DIR = os.getenv("POLICY_CORPUS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "policies"))
+REFRESH_INTERVAL_SECONDS = 30   # How often the corpus directory is re-scanned for changed files
+TOP_K = 3
+FUSION_MODE = os.getenv("RAG_FUSION", "rrf")   # lexical | dense | rrf | weighted
+HYBRID_ALPHA = float(os.getenv("RAG_HYBRID_ALPHA", "0.5"))   # Dense weight in 'weighted' mode
 
-# 2. THE RETRIEVAL TOOL (Simulating a Vector Database)
+_policy_index = None
+_vector_index = None
+_last_refresh = 0.0
+
+def get_indexes() -> tuple:
+    """Opens the on-disk BM25 and dense indexes on first use and picks up file changes incrementally."""
+    global _policy_index, _vector_index, _last_refresh
+    now = time.monotonic()
+    if _policy_index is None:
+        _policy_index = PolicyIndex(POLICY_CORPUS_DIR).open()
+        _vector_index = VectorIndex(POLICY_CORPUS_DIR).open()
+        _last_refresh = now
+    elif now - _last_refresh > REFRESH_INTERVAL_SECONDS:
+        _policy_index.refresh()
+        _vector_index.refresh()
+        _last_refresh = now
+    return _policy_index, _vector_index
+
+# 2. THE RETRIEVAL TOOL (Hybrid BM25 + Dense Policy Index)
 def search_knowledge_base(query: str) -> str:
     """Searches the corporate IT policy manual for specific regulations."""
-    # Mock knowledge base entries
-    kb = {
-        "password": "POLICY_402: Passwords must be 16 characters and rotated every 90 days.",
-        "cloud": "POLICY_771: All cloud deployments must use the US-EAST-1 region for compliance.",
-        "remote": "POLICY_102: Remote work requires a company-issued VPN at all times."
-    }
-    
-    # Simple keyword match for the mock
-    for key in kb:
-        if key in query.lower():
-            return f"RETRIEVED_DOCUMENT: {kb[key]}"
-    
-    return "RETRIEVED_DOCUMENT: No specific policy found. Reverting to general industry best practices."
+    lexical, dense = get_indexes()
+    hits = hybrid_search(lexical, dense, query, k=TOP_K, mode=FUSION_MODE, alpha=HYBRID_ALPHA)
+    if not hits:
+        return "RETRIEVED_DOCUMENT: No specific policy found. Reverting to general industry best practices."
+    return "\n".join(f"RETRIEVED_DOCUMENT [{hit.policy_id}] ({hit.source}): {hit.text}" for hit in hits)
 
 # 3. Define the Agent
 rag_agent = Agent(
@@ -43,31 +61,31 @@ rag_agent = Agent(
 )
 
 # 4. Execution Logic
-async def execute_rag(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "rag_session_14"
+async def execute_rag(user_query: str, stream: bool = False):
+    async with session_scope(APP_NAME, user_id="cio_admin", prefix="rag") as SID:
     
-    yield "📚 **Step 1:** Identifying key terms for knowledge base retrieval..."
+        yield "📚 **Step 1:** Identifying key terms for knowledge base retrieval..."
     
-    await session_service.create_session(user_id="cio_admin", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=rag_agent, session_service=session_service, app_name=APP_NAME)
+        runner = get_runner(rag_agent, APP_NAME)
     
-    yield "🔍 **Step 2:** Querying vector database and augmenting prompt with retrieved context..."
+        yield "🔍 **Step 2:** Querying hybrid (BM25 + vector) index and augmenting prompt with retrieved context..."
     
-    response_text = ""
-    msg = types.Content(role='user', parts=[types.Part(text=user_query)])
+        response_text = ""
+        msg = types.Content(role='user', parts=[types.Part(text=user_query)])
     
-    async for event in runner.run_async(user_id="cio_admin", session_id=SID, new_message=msg):
-        if event.is_final_response():
-            response_text = event.content.parts[0].text
+        async for chunk in stream_agent(runner, "cio_admin", SID, msg, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                response_text = chunk
             
-    yield "✅ **Step 3:** Fact-check complete. Generating grounded response."
-    yield f"### 📖 Grounded Policy Analysis\n\n{response_text}"
+        yield "✅ **Step 3:** Fact-check complete. Generating grounded response."
+        yield f"### 📖 Grounded Policy Analysis\n\n{response_text}"
 
 # --- REQUIRED ENTRY POINT FOR VALIDATOR & DASHBOARD ---
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """The master entry point used by the Validator and Streamlit UI."""
-    return execute_rag(user_query)
+    return execute_rag(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
@@ -0,0 +1,370 @@
+"""
+Policy Retrieval Engine (BM25 Inverted Index)
+Description: Local retrieval subsystem behind search_knowledge_base. Policy
+             documents are ingested from a directory, chunked, and indexed
+             into an inverted index scored with BM25. The index is persisted
+             in a compact binary segment that is loaded via mmap, and file
+             changes are picked up incrementally through an in-memory delta
+             segment until the next compaction.
+
+Run `python policy_index.py` for the query-latency vs corpus-size benchmark.
+"""
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import time
+from array import array
+from collections import Counter, namedtuple
+
+# 1. Configuration
+BM25_K1 = 1.5
+BM25_B = 0.75
+CHUNK_WORDS = 120          # Words per chunk
+CHUNK_OVERLAP = 30         # Words shared between consecutive chunks
+COMPACT_RATIO = 0.25       # Rebuild the on-disk segment once the delta exceeds 25% of it
+DOC_EXTENSIONS = (".txt", ".md")
+
+MAGIC = b"CIOBM25\x01"
+POLICY_ID_RE = re.compile(r"POLICY_\d+")
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or our that the this to was we were will with".split()
+)
+
+Hit = namedtuple("Hit", "score policy_id source chunk text")
+
+
+def tokenize(text: str) -> list:
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def chunk_document(text: str, fallback_id: str, words: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP) -> list:
+    """Splits a document into overlapping word windows, each tagged with its POLICY_ID."""
+    doc_match = POLICY_ID_RE.search(text)
+    doc_id = doc_match.group(0) if doc_match else fallback_id
+    tokens = text.split()
+    step = max(1, words - overlap)
+    chunks = []
+    for start in range(0, max(1, len(tokens)), step):
+        body = " ".join(tokens[start:start + words])
+        if not body:
+            break
+        match = POLICY_ID_RE.search(body)
+        chunks.append((match.group(0) if match else doc_id, body))
+        if start + words >= len(tokens):
+            break
+    return chunks
+
+
+def scan_corpus(corpus_dir: str) -> dict:
+    """Returns {relative_path: (mtime_ns, size)} for every indexable document."""
+    manifest = {}
+    for root, dirs, files in os.walk(corpus_dir):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            if name.endswith(DOC_EXTENSIONS):
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                manifest[os.path.relpath(path, corpus_dir)] = (stat.st_mtime_ns, stat.st_size)
+    return manifest
+
+
+def load_chunks(corpus_dir: str, relpath: str) -> list:
+    with open(os.path.join(corpus_dir, relpath), encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    stem = os.path.splitext(os.path.basename(relpath))[0].upper()
+    return chunk_document(text, fallback_id=stem)
+
+
+# 2. Segments
+class MemorySegment:
+    """Mutable segment holding recently changed documents between compactions."""
+
+    def __init__(self, docs: dict):
+        self.chunks = []        # (source, ordinal, policy_id, text)
+        self.lengths = []
+        self.postings = {}      # term -> [(local_id, tf)]
+        for source, chunks in docs.items():
+            for ordinal, (policy_id, text) in enumerate(chunks):
+                local_id = len(self.chunks)
+                counts = Counter(tokenize(text))
+                self.chunks.append((source, ordinal, policy_id, text))
+                self.lengths.append(sum(counts.values()))
+                for term, tf in counts.items():
+                    self.postings.setdefault(term, []).append((local_id, tf))
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def term_postings(self, term: str):
+        return self.postings.get(term, ())
+
+    def source_of(self, local_id: int) -> str:
+        return self.chunks[local_id][0]
+
+    def hit(self, local_id: int, score: float) -> Hit:
+        source, ordinal, policy_id, text = self.chunks[local_id]
+        return Hit(score, policy_id, source, ordinal, text)
+
+
+class MappedSegment:
+    """
+    Read-only segment backed by an mmap'd index file. Layout (little-endian):
+    MAGIC | u32 header_len | JSON header | u32 postings[(chunk, tf)...] |
+    u32 lengths[] | u32 chunk_table[(source, ordinal, policy, text_off, text_len)...] | utf-8 texts
+    Only the JSON term dictionary is decoded at load; postings and texts are
+    read straight from the mapping on demand.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a policy index segment")
+        (header_len,) = struct.unpack_from("<I", self._map, len(MAGIC))
+        body = len(MAGIC) + 4
+        header = json.loads(self._map[body:body + header_len].decode("utf-8"))
+        view = memoryview(self._map)
+        offset = body + header_len
+
+        self.terms = header["terms"]            # term -> [posting_offset, count]
+        self.sources = header["sources"]
+        self.policies = header["policies"]
+        self.manifest = {k: tuple(v) for k, v in header["manifest"].items()}
+        self.count = header["chunks"]
+
+        self._postings = view[offset:offset + header["postings_bytes"]].cast("I")
+        offset += header["postings_bytes"]
+        self.lengths = view[offset:offset + 4 * self.count].cast("I")
+        offset += 4 * self.count
+        self._table = view[offset:offset + 20 * self.count].cast("I")
+        self._texts = offset + 20 * self.count
+
+    def __len__(self):
+        return self.count
+
+    def term_postings(self, term: str):
+        entry = self.terms.get(term)
+        if not entry:
+            return ()
+        start, count = entry
+        flat = self._postings[start:start + 2 * count]
+        return zip(flat[0::2], flat[1::2])
+
+    def source_of(self, local_id: int) -> str:
+        return self.sources[self._table[5 * local_id]]
+
+    def hit(self, local_id: int, score: float) -> Hit:
+        source, ordinal, policy, text_off, text_len = self._table[5 * local_id:5 * local_id + 5]
+        start = self._texts + text_off
+        text = self._map[start:start + text_len].decode("utf-8")
+        return Hit(score, self.policies[policy], self.sources[source], ordinal, text)
+
+    def close(self):
+        self._postings.release()
+        self.lengths.release()
+        self._table.release()
+        self._map.close()
+        self._file.close()
+
+
+def write_segment(path: str, docs: dict, manifest: dict):
+    """Serializes {source: [(policy_id, text)]} into the compact mmap-able format."""
+    sources, policies, policy_idx = [], [], {}
+    postings, lengths, table = {}, array("I"), array("I")
+    texts = bytearray()
+
+    chunk_id = 0
+    for source in sorted(docs):
+        sources.append(source)
+        for ordinal, (policy_id, text) in enumerate(docs[source]):
+            if policy_id not in policy_idx:
+                policy_idx[policy_id] = len(policies)
+                policies.append(policy_id)
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            encoded = text.encode("utf-8")
+            table.extend((len(sources) - 1, ordinal, policy_idx[policy_id], len(texts), len(encoded)))
+            texts += encoded
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((chunk_id, tf))
+            chunk_id += 1
+
+    flat, terms = array("I"), {}
+    for term in sorted(postings):
+        terms[term] = [len(flat), len(postings[term])]
+        for pair in postings[term]:
+            flat.extend(pair)
+
+    header = json.dumps({
+        "chunks": chunk_id, "terms": terms, "sources": sources, "policies": policies,
+        "manifest": manifest, "postings_bytes": len(flat) * 4,
+    }, separators=(",", ":")).encode("utf-8")
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        f.write(flat.tobytes())
+        f.write(lengths.tobytes())
+        f.write(table.tobytes())
+        f.write(texts)
+    # Atomic swap so readers never observe a half-written segment
+    os.replace(tmp_path, path)
+
+
+# 3. The Index
+class PolicyIndex:
+    """BM25 index over a policy directory: mmap'd base segment + in-memory delta."""
+
+    def __init__(self, corpus_dir: str, index_path: str = None):
+        self.corpus_dir = corpus_dir
+        self.index_path = index_path or os.path.join(corpus_dir, ".index", "policies.bm25")
+        self.base = None
+        self.delta = MemorySegment({})
+        self._delta_docs = {}        # source -> chunks, for files changed since the last compaction
+        self._dead_sources = set()   # base sources superseded by the delta or deleted
+        self._dead_ids = set()       # base chunk ids belonging to those sources
+        self._manifest = {}
+        self._n_docs, self._total_len = 0, 0
+
+    def build(self):
+        """Full (re)build of the on-disk segment from the corpus directory."""
+        manifest = scan_corpus(self.corpus_dir)
+        docs = {source: load_chunks(self.corpus_dir, source) for source in manifest}
+        if self.base:
+            self.base.close()
+        write_segment(self.index_path, docs, manifest)
+        self._load_base()
+
+    def open(self):
+        """Loads the existing segment if present, then applies any changes since it was written."""
+        if os.path.exists(self.index_path):
+            self._load_base()
+            self.refresh()
+        else:
+            self.build()
+        return self
+
+    def _load_base(self):
+        self.base = MappedSegment(self.index_path)
+        self._manifest = dict(self.base.manifest)
+        self._delta_docs, self._dead_sources = {}, set()
+        self.delta = MemorySegment({})
+        self._update_stats()
+
+    def _update_stats(self):
+        """Recomputes live-chunk statistics once per change rather than once per query."""
+        self._dead_ids = {i for i in range(len(self.base)) if self.base.source_of(i) in self._dead_sources} \
+            if self._dead_sources else set()
+        base_len = sum(self.base.lengths) - sum(self.base.lengths[i] for i in self._dead_ids)
+        self._n_docs = len(self.base) - len(self._dead_ids) + len(self.delta)
+        self._total_len = base_len + sum(self.delta.lengths)
+
+    def refresh(self) -> int:
+        """Re-indexes only files that were added, modified or deleted. Returns files changed."""
+        current = scan_corpus(self.corpus_dir)
+        changed = [s for s, sig in current.items() if self._manifest.get(s) != sig]
+        deleted = [s for s in self._manifest if s not in current]
+        if not changed and not deleted:
+            return 0
+
+        for source in deleted:
+            self._dead_sources.add(source)
+            self._delta_docs.pop(source, None)
+        for source in changed:
+            self._dead_sources.add(source)
+            self._delta_docs[source] = load_chunks(self.corpus_dir, source)
+        self._manifest = current
+        self.delta = MemorySegment(self._delta_docs)
+
+        if len(self.delta) > COMPACT_RATIO * max(1, len(self.base)):
+            self.build()
+        else:
+            self._update_stats()
+        return len(changed) + len(deleted)
+
+    def search(self, query: str, k: int = 5) -> list:
+        """Top-k BM25 hits across both segments, skipping superseded base chunks."""
+        terms = set(tokenize(query))
+        if not terms or self._n_docs == 0:
+            return []
+        n_docs, avgdl = self._n_docs, self._total_len / self._n_docs
+        dead = {id(self.base): self._dead_ids, id(self.delta): ()}
+
+        scores = {}
+        for term in terms:
+            matches = []
+            for seg in (self.base, self.delta):
+                skip = dead[id(seg)]
+                matches.extend((seg, i, tf) for i, tf in seg.term_postings(term) if i not in skip)
+            if not matches:
+                continue
+            idf = math.log(1 + (n_docs - len(matches) + 0.5) / (len(matches) + 0.5))
+            for seg, i, tf in matches:
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * seg.lengths[i] / avgdl)
+                scores[(seg, i)] = scores.get((seg, i), 0.0) + idf * tf * (BM25_K1 + 1) / norm
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [seg.hit(i, score) for (seg, i), score in best]
+
+
+# --- BENCHMARK: QUERY LATENCY VS CORPUS SIZE ---
+def _synthetic_corpus(corpus_dir: str, n_chunks: int, chunks_per_file: int = 20, seed: int = 7):
+    import random
+    rng = random.Random(seed)
+    vocab = [f"term{i}" for i in range(20000)] + ["password", "cloud", "remote", "vpn", "rotation", "region"]
+    for file_no in range(max(1, n_chunks // chunks_per_file)):
+        words = [f"POLICY_{100000 + file_no}"]
+        for _ in range(chunks_per_file * (CHUNK_WORDS - CHUNK_OVERLAP)):
+            words.append(vocab[int(rng.paretovariate(1.2)) % len(vocab)])
+        with open(os.path.join(corpus_dir, f"policy_{file_no:06d}.txt"), "w") as f:
+            f.write(" ".join(words))
+
+
+def run_benchmark(sizes=(1_000, 10_000, 50_000), queries: int = 200):
+    import statistics
+    import tempfile
+    print("📚 BM25 Policy Index Benchmark")
+    print("-" * 74)
+    print(f"{'Chunks':>8}{'Build s':>10}{'Load ms':>10}{'Index MB':>10}{'p50 ms':>10}{'p99 ms':>10}{'Refresh ms':>12}")
+    probes = ["password rotation policy", "cloud region compliance", "remote vpn", "term12 term40 term7"]
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            _synthetic_corpus(corpus_dir, size)
+            started = time.perf_counter()
+            index = PolicyIndex(corpus_dir)
+            index.build()
+            build_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            index = PolicyIndex(corpus_dir).open()
+            load_ms = (time.perf_counter() - started) * 1000
+
+            latencies = []
+            for q in range(queries):
+                started = time.perf_counter()
+                index.search(probes[q % len(probes)], k=5)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+            # Touch one file and measure the incremental path
+            target = os.path.join(corpus_dir, "policy_000000.txt")
+            with open(target, "a") as f:
+                f.write(" password rotation addendum")
+            started = time.perf_counter()
+            index.refresh()
+            refresh_ms = (time.perf_counter() - started) * 1000
+
+            cuts = statistics.quantiles(latencies, n=100)
+            size_mb = os.path.getsize(index.index_path) / 1e6
+            print(f"{len(index.base):>8}{build_s:>10.2f}{load_ms:>10.1f}{size_mb:>10.2f}{cuts[49]:>10.2f}{cuts[98]:>10.2f}{refresh_ms:>12.1f}")
+            index.base.close()
+
+
+if __name__ == "__main__":
+    run_benchmark()
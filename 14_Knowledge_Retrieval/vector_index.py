@@ -0,0 +1,413 @@
+"""
+Policy Retrieval Engine (Dense Vectors + Hybrid Fusion)
+Description: Semantic recall for paraphrased policy questions. Chunk
+             embeddings from a pluggable local embedder are stored as a
+             float32 matrix that is memory-mapped at load and scored with
+             batched NumPy dot products (cosine on normalized vectors). Large
+             corpora get an IVF partition: rows are grouped by k-means cluster
+             so only the nprobe closest lists are scanned, with nprobe
+             calibrated at build time to meet a recall target. Each build is
+             written to a fresh version directory and switched to atomically,
+             so readers holding the old memmaps are never disturbed.
+             hybrid_search() fuses dense hits with the BM25 index (RRF or weighted).
+
+Run `python vector_index.py` for the recall@k / QPS benchmark at 10k-1M chunks.
+"""
+import json
+import os
+import shutil
+import time
+import uuid
+import numpy as np
+from local_embedder import get_embedder
+from policy_index import Hit, scan_corpus, load_chunks
+
+# 1. Configuration
+IVF_MIN_CHUNKS = 50_000     # Below this, exact blocked scoring beats IVF on both speed and recall
+RECALL_TARGET = 0.95        # Build-time nprobe calibration aims for this recall@k against exact search
+CALIBRATION_QUERIES = 64    # Synthetic paraphrase queries used during calibration
+CALIBRATION_K = 10
+PARAPHRASE_COSINE = 0.5     # Typical similarity of a user's question to the chunk that answers it
+SCORE_BLOCK_ROWS = 65536    # Rows scored per matmul in exact mode (bounds peak memory)
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 64
+EMBED_BATCH = 256
+COMPACT_RATIO = 0.25
+
+FUSION_MODES = ("lexical", "dense", "rrf", "weighted")
+RRF_K = 60                  # Standard reciprocal-rank-fusion damping constant
+HYBRID_ALPHA = 0.5          # Dense weight in 'weighted' mode
+MIN_RELATIVE_LEXICAL = 0.5  # Lexical hits below half the best BM25 score are generic-term noise
+MIN_DENSE_SCORE = 0.15      # Cosine floor for dense hits
+
+
+# 2. IVF Partitioning
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), SCORE_BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + SCORE_BLOCK_ROWS])
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def train_ivf(vectors: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of rows; returns L2-normalized centroids."""
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), min(len(vectors), nlist * KMEANS_SAMPLE_PER_LIST), replace=False)]
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        labels = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        empty = ~sums.any(axis=1)
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]   # Re-seed empty clusters
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+    return centroids.astype(np.float32)
+
+
+def top_k(row_ids: np.ndarray, scores: np.ndarray, k: int):
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k)[:k]
+        row_ids, scores = row_ids[keep], scores[keep]
+    order = np.argsort(-scores, kind="stable")
+    return row_ids[order], scores[order]
+
+
+def paraphrase_probes(rows: np.ndarray, rng: np.random.Generator, cosine: float = PARAPHRASE_COSINE) -> np.ndarray:
+    """Unit queries at roughly `cosine` similarity to the given unit rows (isotropic noise, renormalized)."""
+    dim = rows.shape[1]
+    sigma = float(np.sqrt((1 / cosine ** 2 - 1) / dim))
+    probes = rows + sigma * rng.standard_normal(rows.shape).astype(np.float32)
+    return (probes / np.linalg.norm(probes, axis=1, keepdims=True)).astype(np.float32)
+
+
+def calibrate_nprobe(store, target: float = RECALL_TARGET, queries: int = CALIBRATION_QUERIES,
+                     k: int = CALIBRATION_K, seed: int = 0) -> int:
+    """
+    Smallest power-of-two nprobe whose recall@k reaches `target`, measured on
+    paraphrase-level queries around sampled stored rows (exact stored rows
+    would sit inside their own list and make any nprobe look good).
+    """
+    nlist = len(store.centroids)
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(store.count, min(queries, store.count), replace=False))
+    probes = paraphrase_probes(np.asarray(store.vectors[sample]), rng)
+    exact = [set(store.search(q, k, nprobe=0)[0].tolist()) for q in probes]
+    nprobe = 1
+    while nprobe < nlist:
+        found = [set(store.search(q, k, nprobe=nprobe)[0].tolist()) for q in probes]
+        if np.mean([len(f & e) / max(len(e), 1) for f, e in zip(found, exact)]) >= target:
+            return nprobe
+        nprobe *= 2
+    return nlist
+
+
+# 3. On-disk Store
+CURRENT_FILE = "CURRENT"   # Names the live version directory inside the store directory
+
+
+def current_store(store_dir: str):
+    """Directory holding the live version's files, or None if nothing has been built yet."""
+    pointer = os.path.join(store_dir, CURRENT_FILE)
+    if os.path.exists(pointer):
+        with open(pointer) as f:
+            return os.path.join(store_dir, f.read().strip())
+    return store_dir if os.path.exists(os.path.join(store_dir, "meta.json")) else None   # Pre-versioning layout
+
+
+def write_store(store_dir: str, vectors: np.ndarray, chunks: list, manifest: dict, embedder_name: str, nlist: int = None):
+    """
+    Writes vectors + chunk metadata into a new version directory, then points
+    CURRENT at it with an atomic rename; older versions are removed afterwards
+    (best effort, since another reader may still have them memory-mapped).
+    With IVF, rows are stored grouped by list so each list is one contiguous
+    slice of the memory-mapped matrix.
+    chunks: [(source, ordinal, policy_id, text)] aligned with `vectors`.
+    """
+    n = len(vectors)
+    dim = vectors.shape[1] if n else 0
+    version = f"v-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    tmp_dir = os.path.join(store_dir, version)
+    os.makedirs(tmp_dir)
+
+    list_offsets = None
+    order = np.arange(n)
+    if n >= IVF_MIN_CHUNKS:
+        nlist = nlist or int(np.sqrt(n))
+        centroids = train_ivf(vectors, nlist)
+        labels = assign_lists(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        list_offsets = np.searchsorted(labels[order], np.arange(nlist + 1)).astype(np.int64)
+        np.save(os.path.join(tmp_dir, "centroids.npy"), centroids)
+        np.save(os.path.join(tmp_dir, "lists.npy"), list_offsets)
+
+    matrix = np.memmap(os.path.join(tmp_dir, "vectors.f32"), dtype=np.float32, mode="w+", shape=(max(n, 1), max(dim, 1)))
+    for start in range(0, n, SCORE_BLOCK_ROWS):
+        matrix[start:start + SCORE_BLOCK_ROWS] = vectors[order[start:start + SCORE_BLOCK_ROWS]]
+    matrix.flush()
+    del matrix
+
+    sources, source_idx, policies, policy_idx = [], {}, [], {}
+    rows = np.zeros((n, 3), dtype=np.uint32)
+    offsets = np.zeros(n + 1, dtype=np.uint64)
+    with open(os.path.join(tmp_dir, "texts.bin"), "wb") as blob:
+        for row, original in enumerate(order):
+            source, ordinal, policy_id, text = chunks[original]
+            rows[row] = (source_idx.setdefault(source, len(source_idx)), ordinal, policy_idx.setdefault(policy_id, len(policy_idx)))
+            encoded = text.encode("utf-8")
+            blob.write(encoded)
+            offsets[row + 1] = offsets[row] + len(encoded)
+    sources = sorted(source_idx, key=source_idx.get)
+    policies = sorted(policy_idx, key=policy_idx.get)
+    np.save(os.path.join(tmp_dir, "rows.npy"), rows)
+    np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+
+    meta = {"count": n, "dim": dim, "embedder": embedder_name, "sources": sources,
+            "policies": policies, "manifest": manifest, "ivf": list_offsets is not None}
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    if list_offsets is not None:
+        staged = DenseStore(tmp_dir)
+        meta["nprobe"] = calibrate_nprobe(staged)
+        del staged
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    pointer = os.path.join(store_dir, CURRENT_FILE)
+    with open(pointer + ".tmp", "w") as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+    for name in os.listdir(store_dir):
+        if name not in (CURRENT_FILE, version):
+            path = os.path.join(store_dir, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+class DenseStore:
+    """Read-only, memory-mapped view of a store written by write_store()."""
+
+    def __init__(self, store_dir: str):
+        store_dir = current_store(store_dir) or store_dir
+        with open(os.path.join(store_dir, "meta.json")) as f:
+            meta = json.load(f)
+        self.count, self.dim, self.embedder = meta["count"], meta["dim"], meta["embedder"]
+        self.sources, self.policies = meta["sources"], meta["policies"]
+        self.manifest = {k: tuple(v) for k, v in meta["manifest"].items()}
+        self.vectors = np.memmap(os.path.join(store_dir, "vectors.f32"), dtype=np.float32, mode="r",
+                                 shape=(max(self.count, 1), max(self.dim, 1)))[:self.count]
+        self.rows = np.load(os.path.join(store_dir, "rows.npy"), mmap_mode="r")
+        self.offsets = np.load(os.path.join(store_dir, "offsets.npy"), mmap_mode="r")
+        texts_path = os.path.join(store_dir, "texts.bin")
+        self.texts = np.memmap(texts_path, dtype=np.uint8, mode="r") if os.path.getsize(texts_path) else np.zeros(0, np.uint8)
+        self.centroids = self.lists = None
+        self.nprobe = meta.get("nprobe", 0)
+        if meta["ivf"]:
+            self.centroids = np.load(os.path.join(store_dir, "centroids.npy"))
+            self.lists = np.load(os.path.join(store_dir, "lists.npy"))
+
+    def __len__(self):
+        return self.count
+
+    def search(self, query: np.ndarray, k: int, nprobe: int = None, dead: np.ndarray = None):
+        """Returns (row_ids, scores). nprobe=None uses the calibrated value; 0 forces exact scoring."""
+        if self.count == 0:
+            return np.zeros(0, np.int64), np.zeros(0, np.float32)
+        nprobe = self.nprobe if nprobe is None else nprobe
+        if self.centroids is not None and nprobe:
+            probe = np.argsort(-(self.centroids @ query))[:nprobe]
+            ranges = [(self.lists[p], self.lists[p + 1]) for p in probe if self.lists[p + 1] > self.lists[p]]
+        else:
+            ranges = [(start, min(start + SCORE_BLOCK_ROWS, self.count)) for start in range(0, self.count, SCORE_BLOCK_ROWS)]
+
+        if not ranges:
+            return np.zeros(0, np.int64), np.zeros(0, np.float32)
+        # IVF lists are small: score them all and select once. Exact blocks are large: select per block.
+        per_block = len(ranges) == 1 or ranges[0][1] - ranges[0][0] >= SCORE_BLOCK_ROWS
+        best_ids, best_scores = [], []
+        for start, end in ranges:
+            scores = self.vectors[start:end] @ query
+            ids = np.arange(start, end)
+            if dead is not None:
+                live = ~dead[start:end]
+                ids, scores = ids[live], scores[live]
+            if per_block:
+                ids, scores = top_k(ids, scores, k)
+            best_ids.append(ids)
+            best_scores.append(scores)
+        return top_k(np.concatenate(best_ids), np.concatenate(best_scores), k)
+
+    def hit(self, row: int, score: float) -> Hit:
+        source, ordinal, policy = (int(x) for x in self.rows[row])
+        text = bytes(self.texts[int(self.offsets[row]):int(self.offsets[row + 1])]).decode("utf-8")
+        return Hit(float(score), self.policies[policy], self.sources[source], ordinal, text)
+
+
+# 4. Corpus-backed Vector Index
+class VectorIndex:
+    """Dense index over the policy directory: mmap'd base store + in-memory delta for changed files."""
+
+    def __init__(self, corpus_dir: str, embedder=None, store_dir: str = None):
+        self.corpus_dir = corpus_dir
+        self.embedder = embedder or get_embedder()
+        self.store_dir = store_dir or os.path.join(corpus_dir, ".index", "dense")
+        self.base = None
+        self._manifest = {}
+        self._delta_chunks, self._delta_vectors = [], np.zeros((0, self.embedder.dim), np.float32)
+        self._dead = None
+
+    def _embed_chunks(self, chunks: list) -> np.ndarray:
+        if not chunks:
+            return np.zeros((0, self.embedder.dim), np.float32)
+        batches = [self.embedder.embed([c[3] for c in chunks[i:i + EMBED_BATCH]]) for i in range(0, len(chunks), EMBED_BATCH)]
+        return np.vstack(batches).astype(np.float32)
+
+    def _chunks_for(self, sources) -> list:
+        return [(source, ordinal, policy_id, text)
+                for source in sources
+                for ordinal, (policy_id, text) in enumerate(load_chunks(self.corpus_dir, source))]
+
+    def build(self):
+        manifest = scan_corpus(self.corpus_dir)
+        chunks = self._chunks_for(sorted(manifest))
+        write_store(self.store_dir, self._embed_chunks(chunks), chunks, manifest, self.embedder.name)
+        self._load_base()
+
+    def open(self):
+        if current_store(self.store_dir):
+            self._load_base()
+            # Vectors from a different embedder are not comparable; re-embed everything
+            if self.base.embedder != self.embedder.name:
+                self.build()
+            else:
+                self.refresh()
+        else:
+            self.build()
+        return self
+
+    def _load_base(self):
+        self.base = DenseStore(self.store_dir)
+        self._manifest = dict(self.base.manifest)
+        self._delta_chunks, self._delta_vectors = [], np.zeros((0, self.embedder.dim), np.float32)
+        self._dead = None
+
+    def refresh(self) -> int:
+        """Re-embeds only added/modified files and masks rows of modified/deleted ones."""
+        current = scan_corpus(self.corpus_dir)
+        changed = [s for s, sig in current.items() if self._manifest.get(s) != sig]
+        deleted = [s for s in self._manifest if s not in current]
+        if not changed and not deleted:
+            return 0
+
+        stale = set(changed) | set(deleted)
+        dead_sources = np.array([s in stale for s in self.base.sources] or [False])
+        newly_dead = dead_sources[self.base.rows[:, 0]] if len(self.base) else np.zeros(0, bool)
+        self._dead = newly_dead if self._dead is None else (self._dead | newly_dead)
+
+        keep = [i for i, c in enumerate(self._delta_chunks) if c[0] not in stale]
+        fresh = self._chunks_for(changed)
+        self._delta_chunks = [self._delta_chunks[i] for i in keep] + fresh
+        self._delta_vectors = np.vstack([self._delta_vectors[keep], self._embed_chunks(fresh)])
+        self._manifest = current
+
+        if len(self._delta_chunks) > COMPACT_RATIO * max(1, len(self.base)):
+            self.build()
+        return len(changed) + len(deleted)
+
+    def search(self, query: str, k: int = 5, nprobe: int = None) -> list:
+        q = self.embedder.embed([query])[0]
+        ids, scores = self.base.search(q, k, nprobe=nprobe, dead=self._dead)
+        hits = [self.base.hit(int(i), s) for i, s in zip(ids, scores)]
+        if len(self._delta_chunks):
+            delta_ids, delta_scores = top_k(np.arange(len(self._delta_chunks)), self._delta_vectors @ q, k)
+            for i, s in zip(delta_ids, delta_scores):
+                source, ordinal, policy_id, text = self._delta_chunks[int(i)]
+                hits.append(Hit(float(s), policy_id, source, ordinal, text))
+        return sorted(hits, key=lambda h: h.score, reverse=True)[:k]
+
+
+# 5. Hybrid Fusion
+def hybrid_search(lexical_index, vector_index, query: str, k: int = 5, mode: str = "rrf", alpha: float = HYBRID_ALPHA) -> list:
+    """
+    Combines BM25 and dense hits for the same chunks.
+    'rrf' sums 1/(RRF_K + rank); 'weighted' blends max-normalized scores with `alpha` on the dense side.
+    """
+    if mode not in FUSION_MODES:
+        raise ValueError(f"Unknown fusion mode '{mode}'. Expected one of {FUSION_MODES}")
+    depth = k * 4
+    lexical = lexical_index.search(query, k=depth) if mode != "dense" else []
+    if lexical:
+        lexical = [h for h in lexical if h.score >= MIN_RELATIVE_LEXICAL * lexical[0].score]
+    dense = [h for h in vector_index.search(query, k=depth) if h.score >= MIN_DENSE_SCORE] if mode != "lexical" else []
+
+    if mode in ("lexical", "dense"):
+        return (lexical or dense)[:k]
+
+    fused, by_key = {}, {}
+    for weight, hits in ((1 - alpha, lexical), (alpha, dense)):
+        top = hits[0].score if hits else 1.0
+        for rank, hit in enumerate(hits):
+            key = (hit.source, hit.chunk)
+            by_key.setdefault(key, hit)
+            contribution = 1.0 / (RRF_K + rank + 1) if mode == "rrf" else weight * hit.score / top
+            fused[key] = fused.get(key, 0.0) + contribution
+
+    best = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+    return [by_key[key]._replace(score=score) for key, score in best]
+
+
+# --- BENCHMARK: RECALL@K AND QPS VS CORPUS SIZE ---
+def _clustered_vectors(n: int, dim: int, rng: np.random.Generator, centers: int = 2000) -> np.ndarray:
+    """Synthetic embeddings with topical structure (Gaussian blobs on the unit sphere)."""
+    means = rng.standard_normal((centers, dim)).astype(np.float32)
+    out = np.empty((n, dim), dtype=np.float32)
+    for start in range(0, n, SCORE_BLOCK_ROWS):
+        size = min(SCORE_BLOCK_ROWS, n - start)
+        block = means[rng.integers(0, centers, size)] + 0.6 * rng.standard_normal((size, dim)).astype(np.float32)
+        out[start:start + size] = block / np.linalg.norm(block, axis=1, keepdims=True)
+    return out
+
+
+def run_benchmark(sizes=(10_000, 100_000, 1_000_000), dim: int = 128, k: int = 10, queries: int = 200, nprobes=(8, 32, 128)):
+    import tempfile
+    print(f"🧭 Dense Vector Index Benchmark (dim={dim}, recall@{k} vs exact search; "
+          f"IVF from {IVF_MIN_CHUNKS:,} chunks, nprobe calibrated for recall ≥ {RECALL_TARGET})")
+    print("-" * 66)
+    print(f"{'Chunks':>9}{'Mode':>14}{'Recall@k':>11}{'QPS':>10}{'Build s':>10}")
+    rng = np.random.default_rng(11)
+    for n in sizes:
+        vectors = _clustered_vectors(n, dim, rng)
+        chunks = [(f"doc_{i // 20}.txt", i % 20, f"POLICY_{i // 20}", "") for i in range(n)]
+        probes = paraphrase_probes(vectors[rng.choice(n, queries, replace=False)], rng)
+        with tempfile.TemporaryDirectory() as tmp:
+            started = time.perf_counter()
+            write_store(os.path.join(tmp, "dense"), vectors, chunks, {}, "synthetic")
+            build_s = time.perf_counter() - started
+            del vectors
+            store = DenseStore(os.path.join(tmp, "dense"))
+
+            started = time.perf_counter()
+            exact = [set(store.search(q, k, nprobe=0)[0].tolist()) for q in probes]
+            qps = queries / (time.perf_counter() - started)
+            print(f"{n:>9}{'exact':>14}{1.0:>11.3f}{qps:>10.0f}{build_s:>10.1f}")
+
+            if store.centroids is None:
+                continue
+            for nprobe in sorted({*nprobes, store.nprobe}):
+                started = time.perf_counter()
+                found = [set(store.search(q, k, nprobe=nprobe)[0].tolist()) for q in probes]
+                qps = queries / (time.perf_counter() - started)
+                recall = np.mean([len(f & e) / k for f, e in zip(found, exact)])
+                label = f"ivf/{nprobe}" + ("*" if nprobe == store.nprobe else "")
+                print(f"{n:>9}{label:>14}{recall:>11.3f}{qps:>10.0f}{'':>10}")
+            del store
+    print("* nprobe chosen by build-time calibration")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -1,11 +1,10 @@
 import asyncio
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
 
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_A2A_Mesh"
 
 # 1. The Service Agent
@@ -18,13 +17,12 @@ compliance_agent = Agent(
 # 2. THE WRAPPER (Fixes BaseToolset Error)
 async def check_compliance(plan_details: str) -> str:
     """Sends a strategic plan to the Compliance Auditor for verification."""
-    session_service = InMemorySessionService()
-    await session_service.create_session(user_id="sys", session_id="tmp_a2a", app_name=APP_NAME)
-    runner = Runner(agent=compliance_agent, session_service=session_service, app_name=APP_NAME)
-    msg = types.Content(role='user', parts=[types.Part(text=plan_details)])
-    async for event in runner.run_async(user_id="sys", session_id="tmp_a2a", new_message=msg):
-        if event.is_final_response():
-            return event.content.parts[0].text
+    async with session_scope(APP_NAME, user_id="sys", prefix="a2a_check") as sid:
+        runner = get_runner(compliance_agent, APP_NAME)
+        msg = types.Content(role='user', parts=[types.Part(text=plan_details)])
+        async for event in runner.run_async(user_id="sys", session_id=sid, new_message=msg):
+            if event.is_final_response():
+                return event.content.parts[0].text
     return "Compliance check unavailable."
 
 # 3. The Lead Agent using the function as a tool
@@ -35,17 +33,18 @@ lead_agent = Agent(
     instruction="Draft an IT strategy. You MUST call check_compliance before finalizing."
 )
 
-async def execute_pattern(user_query: str):
-    session_service = InMemorySessionService()
-    await session_service.create_session(user_id="cio", session_id="a2a_main", app_name=APP_NAME)
-    runner = Runner(agent=lead_agent, session_service=session_service, app_name=APP_NAME)
-    yield "🔗 **Establishing Agent-to-Agent handshake...**"
-    response = ""
-    msg = types.Content(role='user', parts=[types.Part(text=user_query)])
-    async for event in runner.run_async(user_id="cio", session_id="a2a_main", new_message=msg):
-        if event.is_final_response():
-            response = event.content.parts[0].text
-    yield f"### 🛡️ Verified Strategy\n\n{response}"
+async def execute_pattern(user_query: str, stream: bool = False):
+    async with session_scope(APP_NAME, user_id="cio", prefix="a2a_main") as sid:
+        runner = get_runner(lead_agent, APP_NAME)
+        yield "🔗 **Establishing Agent-to-Agent handshake...**"
+        response = ""
+        msg = types.Content(role='user', parts=[types.Part(text=user_query)])
+        async for chunk in stream_agent(runner, "cio", sid, msg, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                response = chunk
+        yield f"### 🛡️ Verified Strategy\n\n{response}"
 
-async def run_pattern(user_query: str):
-    return execute_pattern(user_query)
\ No newline at end of file
+async def run_pattern(user_query: str, stream: bool = False):
+    return execute_pattern(user_query, stream)
\ No newline at end of file
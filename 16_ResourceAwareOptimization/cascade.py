@@ -0,0 +1,225 @@
+"""
+Speculative Cascade (Eco First, Escalate on Low Confidence)
+Description: Instead of committing to a tier before any model runs, the eco
+             model answers first and a cheap confidence check (hedging,
+             length/structure versus what the query asks for, coverage of
+             the query's key terms, truncation) decides whether the premium
+             model is needed. In speculative mode both tiers start together
+             and the premium call is cancelled as soon as the eco answer
+             passes, trading some premium spend for escalation latency. If
+             the premium call fails, the eco answer is kept with the reason.
+
+Run `python cascade.py` to compare static routing, cascade and speculative
+cascade (average latency, premium-call rate, cost) on simulated tiers.
+"""
+import asyncio
+import random
+import re
+import statistics
+import time
+from collections import namedtuple
+from model_router import ECO, PREMIUM, SEED_EXAMPLES, ModelRouter, estimate_tokens
+
+# 1. Configuration
+CONFIDENCE_THRESHOLD = 0.6
+LABEL_MARGIN = 0.25   # Only confidences this far from the threshold become router training labels
+HEDGE_RE = re.compile(r"\bi(?:'m| am) not (?:sure|certain)|\bi (?:can(?:no|')t|am unable to|don't have (?:access|enough))"
+                      r"|\bas an ai\b|\bbeyond (?:my|the scope)|insufficient (?:information|data)|\bit depends\b", re.IGNORECASE)
+NUMERIC_ASK_RE = re.compile(r"\b(?:how (?:much|many)|cost|roi|tco|forecast|estimate|budget|spend|percent)\b|\d", re.IGNORECASE)
+STRUCTURE_ASK_RE = re.compile(r"\b(?:plan|roadmap|steps?|compare|options|trade-?offs?|phased|strategy|sequenc\w*)\b", re.IGNORECASE)
+STRUCTURE_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)]|#{1,4} |\|)", re.MULTILINE)
+TERM_RE = re.compile(r"[a-z][a-z0-9-]{3,}")
+STOPWORDS = {"what", "when", "which", "with", "would", "should", "could", "does", "this", "that", "their", "there",
+             "about", "from", "into", "over", "your", "ours", "have", "give", "tell", "make", "next", "given"}
+
+CascadeResult = namedtuple("CascadeResult", "answer tier escalated confidence reasons eco_answer eco_seconds premium_seconds "
+                                            "wall_seconds premium_started premium_cancelled")
+
+
+# 2. Confidence Check
+def score_confidence(query: str, answer: str, complexity: float) -> tuple:
+    """Returns (score 0..1, reasons). `complexity` is the router's probability that the query needs premium."""
+    if not answer.strip():
+        return 0.0, ["empty answer"]
+    score, reasons = 1.0, []
+    words = len(answer.split())
+    expected = 25 + 250 * complexity   # Substantive questions need substantive answers
+    if words < expected:
+        penalty = 0.4 * (1 - words / expected)
+        score -= penalty
+        reasons.append(f"short answer ({words} words, ~{expected:.0f} expected)")
+    if HEDGE_RE.search(answer):
+        score -= 0.4
+        reasons.append("hedging/refusal language")
+    if NUMERIC_ASK_RE.search(query) and not re.search(r"\d", answer):
+        score -= 0.2
+        reasons.append("query asks for figures, answer has none")
+    if STRUCTURE_ASK_RE.search(query) and not STRUCTURE_RE.search(answer):
+        score -= 0.15
+        reasons.append("query asks for a plan/comparison, answer is unstructured")
+    terms = {t for t in TERM_RE.findall(query.lower()) if t not in STOPWORDS}
+    if terms:
+        lowered = answer.lower()
+        coverage = sum(t in lowered for t in terms) / len(terms)
+        if coverage < 0.5:
+            score -= 0.3 * (1 - coverage / 0.5)
+            reasons.append(f"covers {coverage:.0%} of the query's key terms")
+    if words > 20 and answer.rstrip()[-1] not in ".!?)`*|\"'":
+        score -= 0.1
+        reasons.append("answer looks truncated")
+    return max(score, 0.0), reasons
+
+
+# 3. Cascade Execution
+async def _timed(call) -> tuple:
+    started = time.perf_counter()
+    return await call(), time.perf_counter() - started
+
+
+async def run_cascade(query: str, eco, premium, complexity: float, speculative: bool = False,
+                      allow_premium: bool = True, threshold: float = CONFIDENCE_THRESHOLD) -> CascadeResult:
+    """
+    `eco` and `premium` are zero-argument coroutine functions returning the answer text.
+    With speculative=True the premium call starts alongside eco and is cancelled if eco passes.
+    """
+    started = time.perf_counter()
+    premium_task = asyncio.create_task(_timed(premium)) if speculative and allow_premium else None
+    try:
+        try:
+            eco_answer, eco_seconds = await _timed(eco)
+            confidence, reasons = score_confidence(query, eco_answer, complexity)
+        except Exception as e:   # A failed eco call is just a zero-confidence answer
+            eco_answer, eco_seconds = "", time.perf_counter() - started
+            confidence, reasons = 0.0, [f"eco call failed: {e}"]
+
+        if confidence >= threshold or not allow_premium:
+            cancelled = premium_task is not None and premium_task.cancel()   # False if it already finished
+            if not allow_premium and confidence < threshold:
+                reasons.append("premium budget exhausted; keeping eco answer")
+            return CascadeResult(eco_answer, ECO, False, confidence, reasons, eco_answer, eco_seconds, None,
+                                 time.perf_counter() - started, premium_task is not None, cancelled)
+
+        if premium_task is None:
+            premium_task = asyncio.create_task(_timed(premium))
+        premium_started = time.perf_counter()
+        try:
+            answer, premium_seconds = await premium_task
+        except Exception as e:
+            if not eco_answer.strip():
+                raise   # Neither tier produced anything to fall back on
+            reasons.append(f"premium call failed ({e}); keeping eco answer")
+            return CascadeResult(eco_answer, ECO, False, confidence, reasons, eco_answer, eco_seconds,
+                                 time.perf_counter() - premium_started, time.perf_counter() - started, True, False)
+        return CascadeResult(answer, PREMIUM, True, confidence, reasons, eco_answer, eco_seconds, premium_seconds,
+                             time.perf_counter() - started, True, False)
+    finally:
+        # Always collect the premium task: cancelled if still running (also when eco itself was cancelled),
+        # and its outcome retrieved so a failure never logs "Task exception was never retrieved"
+        if premium_task is not None:
+            premium_task.cancel()
+            await asyncio.gather(premium_task, return_exceptions=True)
+
+
+def outcome_label(result: CascadeResult, threshold: float = CONFIDENCE_THRESHOLD, margin: float = LABEL_MARGIN):
+    """
+    needs_premium label for ModelRouter.add_outcome, or None to skip. The label
+    comes from the cascade's own confidence heuristic, not from user feedback,
+    so only clear-cut scores are kept: borderline ones would just teach the
+    router to imitate the heuristic's noise.
+    """
+    if abs(result.confidence - threshold) < margin:
+        return None
+    return result.confidence < threshold
+
+
+# --- BENCHMARK: STATIC ROUTING VS CASCADE ---
+HELD_OUT = [
+    ("Which team patches the VPN concentrators?", 0), ("What is our Wi-Fi guest password policy?", 0),
+    ("How many monitors can I request?", 0), ("Where do I log a hardware fault?", 0),
+    ("Is Outlook down right now?", 0), ("What is the laptop refresh cycle?", 0),
+    ("How do I enable MFA on my phone?", 0), ("Who approves software purchases under $500?", 0),
+    ("Which browser versions are supported?", 0), ("What is the security training deadline?", 0),
+    ("Explain the budget code for cloud subscriptions.", 0), ("What does our backup architecture look like?", 0),
+    ("Estimate the three-year TCO of replacing our SAN with hyperconverged infrastructure.", 1),
+    ("Build a phased roadmap to retire the mainframe, with risks and budget per phase.", 1),
+    ("Compare SASE vendors for 40 branch offices and recommend one with trade-offs.", 1),
+    ("Forecast GPU capacity and spend needed for our AI programme over 24 months.", 1),
+    ("Assess the regulatory exposure of moving EU customer data to a US region.", 1),
+    ("Plan the consolidation of three ERPs after the acquisition, including sequencing and staffing.", 1),
+    ("Design an incident response strategy for ransomware across OT and IT networks.", 1),
+    ("Analyze whether to renegotiate or exit our outsourcing contract, with cost scenarios.", 1),
+]
+
+
+def _mock_answer(query: str, good: bool, rng: random.Random) -> str:
+    if not good:
+        return rng.choice(["It depends on several factors; I'm not sure without more data.",
+                           "You should review this with your team and vendors.",
+                           "This is a complex topic that requires careful consideration of many aspects"])
+    terms = " ".join(TERM_RE.findall(query.lower()))
+    return (f"Summary for {terms}.\n- Option 1: proceed in 3 phases over 12 months.\n- Option 2: defer, saving 15%.\n"
+            + "Rationale: " + " ".join(["the evidence supports this approach"] * 12) + ".")
+
+
+def simulate(queries: list, mode: str, time_scale: float = 0.01, seed: int = 7) -> dict:
+    """Simulated tiers: eco ~1.5 s and fails on most hard queries, premium ~5 s and always succeeds."""
+    rng = random.Random(seed)
+    router = ModelRouter(log_path=None, budget_usd=1e9)
+    latencies, premium_calls, cost, correct = [], 0, 0.0, 0
+
+    async def run_all():
+        nonlocal premium_calls, cost, correct
+        for query, hard in queries:
+            eco_good = rng.random() < (0.2 if hard else 0.9)
+            eco_latency, premium_latency = rng.lognormvariate(0.4, 0.3), rng.lognormvariate(1.6, 0.25)
+
+            async def eco():
+                await asyncio.sleep(eco_latency * time_scale)
+                return _mock_answer(query, eco_good, rng)
+
+            async def premium():
+                await asyncio.sleep(premium_latency * time_scale)
+                return _mock_answer(query, True, rng)
+
+            tokens = estimate_tokens(query)
+            started = time.perf_counter()
+            if mode == "static routing":
+                tier = router.route(query).tier
+                answer_good = True if tier == PREMIUM else eco_good
+                await (premium() if tier == PREMIUM else eco())
+                premium_calls += tier == PREMIUM
+                cost += router.estimate_cost(tier, tokens, 600)
+            else:
+                result = await run_cascade(query, eco, premium, router.classifier.predict_proba(query),
+                                           speculative=(mode == "speculative cascade"))
+                answer_good = result.tier == PREMIUM or eco_good
+                premium_calls += result.premium_started
+                cost += router.estimate_cost(ECO, tokens, 600)
+                if result.premium_started:
+                    # A cancelled premium call still pays for its prompt and whatever it generated before the cancel
+                    generated = min(1.0, result.eco_seconds / (premium_latency * time_scale)) if result.premium_cancelled else 1.0
+                    cost += router.estimate_cost(PREMIUM, tokens, int(600 * generated))
+            latencies.append((time.perf_counter() - started) / time_scale)
+            correct += answer_good
+
+    asyncio.run(run_all())
+    return {"avg_latency": statistics.mean(latencies), "p95_latency": statistics.quantiles(latencies, n=20)[18],
+            "premium_rate": premium_calls / len(queries), "cost": cost, "quality": correct / len(queries)}
+
+
+if __name__ == "__main__":
+    queries = HELD_OUT * 5
+    print(f"🪜 Static routing vs cascade ({len(queries)} queries, {sum(h for _, h in queries)} hard; "
+          f"router trained on {len(SEED_EXAMPLES)} seed examples)")
+    print("-" * 84)
+    print(f"{'Mode':<22}{'Avg s':>8}{'p95 s':>8}{'Premium calls':>15}{'Cost $':>11}{'Good answers':>14}")
+    for mode in ("static routing", "cascade", "speculative cascade"):
+        r = simulate(queries, mode)
+        print(f"{mode:<22}{r['avg_latency']:>8.2f}{r['p95_latency']:>8.2f}{r['premium_rate']:>15.0%}"
+              f"{r['cost']:>11.4f}{r['quality']:>14.0%}")
+
+    print("\nConfidence check examples:")
+    for query, hard in HELD_OUT[-3:]:
+        for good in (True, False):
+            score, reasons = score_confidence(query, _mock_answer(query, good, random.Random(1)), 0.9)
+            print(f"  {'good' if good else 'weak'} answer -> {score:.2f} {'; '.join(reasons) or 'passes'}")
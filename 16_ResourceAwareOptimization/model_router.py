@@ -0,0 +1,374 @@
+"""
+Model Router (Cost- and Latency-Aware Tier Selection)
+Description: Replaces the keyword/length heuristic of pattern 16. Query
+             complexity is scored by a small local classifier (TF-IDF over
+             hashed word unigrams/bigrams plus a token-count feature,
+             logistic regression on a sparse matrix in NumPy) trained on seed
+             examples and on the most recent outcomes logged by earlier runs.
+             Retraining runs on a background thread and swaps the model in
+             when done, so neither import nor add_outcome() waits for it. The router keeps rolling per-tier
+             latency and cost over a time window, enforces a premium spend
+             budget per window, and returns the rationale for every decision.
+
+Run `python model_router.py` for sample decisions, decision latency and counters.
+"""
+import json
+import math
+import os
+import re
+import statistics
+import threading
+import time
+import zlib
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# 1. Configuration
+ECO, PREMIUM = "eco", "premium"
+TIER_LABELS = {ECO: "⚡ LOCAL EDGE (Llama 3.2)", PREMIUM: "💎 PREMIUM CLOUD (Gemini 2.0)"}
+# USD per 1K tokens (input, output). Eco is local, priced at a nominal power/hardware cost
+TIER_PRICES = {ECO: (0.00001, 0.00001), PREMIUM: (0.0001, 0.0004)}
+WINDOW_SECONDS = 60 * 60
+PREMIUM_BUDGET_USD = float(os.getenv("ROUTER_PREMIUM_BUDGET_USD", "0.50"))   # Premium spend allowed per window
+PREMIUM_LATENCY_SLO_SECONDS = 20.0   # Borderline queries stay on eco while premium's rolling p50 is above this
+THRESHOLD = 0.5                      # Complexity probability above which premium is preferred
+CONFIDENT = 0.8                      # Above this, a slow premium tier is still used
+RETRAIN_EVERY = 10                   # Labelled outcomes between retrains
+MAX_OUTCOMES = int(os.getenv("ROUTER_MAX_OUTCOMES", "5000"))   # Training window: most recent logged outcomes only
+HASH_FEATURES = 2 ** 14              # Hashed term buckets; memory is O(non-zeros), not O(rows x buckets)
+LOG_PATH = os.getenv("ROUTER_LOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "routing_outcomes.jsonl"))
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Bootstrap set so a fresh install routes sensibly before any outcomes are logged (1 = needs premium)
+SEED_EXAMPLES = [
+    ("What is the current time?", 0),
+    ("How do I reset my VPN password?", 0),
+    ("What port does HTTPS use?", 0),
+    ("Who owns the service desk queue for laptops?", 0),
+    ("Convert 2 TB to GB.", 0),
+    ("What does SLA stand for?", 0),
+    ("Is the email server up?", 0),
+    ("List the office printer locations.", 0),
+    ("How do I join the Teams meeting from my phone?", 0),
+    ("When does the licence for Zoom renew?", 0),
+    ("Give me the IT helpdesk phone number.", 0),
+    ("What is the difference between RAM and storage?", 0),
+    ("Analyze the long-term ROI of migrating our legacy ERP to a microservices architecture.", 1),
+    ("Build a three-year cloud investment roadmap with budget scenarios and risks.", 1),
+    ("Forecast infrastructure spend for the next eight quarters given 30% user growth.", 1),
+    ("Compare zero-trust architecture options for our hybrid network and recommend a phased plan.", 1),
+    ("Assess the security implications of consolidating our identity providers after the merger.", 1),
+    ("Design a disaster recovery strategy that meets a 15 minute RPO across two regions.", 1),
+    ("Evaluate build versus buy for a customer data platform, including TCO and vendor lock-in.", 1),
+    ("Model the cost impact of moving 400 VMs to reserved instances versus savings plans.", 1),
+    ("Prioritize our tech debt portfolio against revenue risk and explain the trade-offs.", 1),
+    ("Draft a board-level briefing on AI governance, regulatory exposure and investment needs.", 1),
+    ("Why did our cloud bill rise 40% this quarter and what structural changes would reverse it?", 1),
+    ("Plan the data centre exit: sequencing, dependencies, staffing and budget.", 1),
+]
+
+RouteDecision = namedtuple("RouteDecision", "tier probability tokens estimated_cost reasons")
+
+
+def tokenize(text: str) -> list:
+    words = TOKEN_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)   # ~4 characters per token for English prose
+
+
+def hashed_counts(text: str) -> Counter:
+    """Term frequencies keyed by hash bucket (crc32 is stable across processes, unlike hash())."""
+    return Counter(zlib.crc32(term.encode("utf-8")) % HASH_FEATURES for term in tokenize(text))
+
+
+# 2. Complexity Classifier
+class ComplexityClassifier:
+    """
+    TF-IDF over hashed terms + log token count -> logistic regression, trained by
+    full-batch gradient descent on a CSR-style sparse matrix (column HASH_FEATURES
+    is the token-count feature).
+    """
+
+    def __init__(self, l2: float = 1e-3, epochs: int = 400, learning_rate: float = 2.0):
+        self.l2 = l2
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.idf = np.zeros(HASH_FEATURES)
+        self.weights = np.zeros(HASH_FEATURES + 1)
+        self.bias = 0.0
+
+    def _row(self, counts: Counter, tokens: int) -> tuple:
+        """Column indices and values of one normalized sparse row."""
+        buckets = [b for b in counts if self.idf[b]]   # Buckets never seen in training carry no weight
+        values = np.array([(1 + math.log(counts[b])) * self.idf[b] for b in buckets])
+        norm = np.linalg.norm(values)
+        if norm:
+            values /= norm
+        size = math.log1p(tokens) / math.log1p(512)   # Token-count feature, ~1.0 for a 512-token prompt
+        return np.array(buckets + [HASH_FEATURES], dtype=np.int64), np.append(values, size)
+
+    def fit(self, texts: list, labels: list):
+        documents = [hashed_counts(t) for t in texts]
+        n = len(texts)
+        df = np.bincount([b for counts in documents for b in counts], minlength=HASH_FEATURES)
+        self.idf = np.where(df > 0, np.log((1 + n) / (1 + df)) + 1, 0.0)
+        rows = [self._row(counts, estimate_tokens(text)) for counts, text in zip(documents, texts)]
+        indices = np.concatenate([cols for cols, _ in rows])
+        data = np.concatenate([values for _, values in rows])
+        lengths = np.array([len(cols) for cols, _ in rows])
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))   # Every row holds the token feature, so none is empty
+        y = np.asarray(labels, dtype=float)
+        # Class weights keep a skewed outcome log from collapsing onto the majority tier
+        positives = y.sum()
+        sample_weight = np.where(y == 1, n / (2 * max(positives, 1)), n / (2 * max(n - positives, 1)))
+        self.weights = np.zeros(HASH_FEATURES + 1)
+        self.bias = 0.0
+        for _ in range(self.epochs):
+            p = 1 / (1 + np.exp(-(np.add.reduceat(data * self.weights[indices], starts) + self.bias)))
+            error = (p - y) * sample_weight
+            gradient = np.bincount(indices, weights=data * np.repeat(error, lengths), minlength=HASH_FEATURES + 1)
+            self.weights -= self.learning_rate * (gradient / n + self.l2 * self.weights)
+            self.bias -= self.learning_rate * error.mean()
+        return self
+
+    def predict_proba(self, text: str) -> float:
+        cols, values = self._row(hashed_counts(text), estimate_tokens(text))
+        return float(1 / (1 + math.exp(-(values @ self.weights[cols] + self.bias))))
+
+
+_retrain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="router-retrain")
+
+
+# 3. Router
+class ModelRouter:
+    """Classifier score + rolling tier telemetry + premium budget -> RouteDecision with reasons."""
+
+    def __init__(self, log_path: str = LOG_PATH, budget_usd: float = PREMIUM_BUDGET_USD,
+                 window_seconds: float = WINDOW_SECONDS, threshold: float = THRESHOLD):
+        self.log_path = log_path
+        self.budget_usd = budget_usd
+        self.window_seconds = window_seconds
+        self.threshold = threshold
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._calls = {ECO: deque(), PREMIUM: deque()}   # tier -> (timestamp, latency_seconds, cost_usd)
+        self._outcomes = self._load_outcomes()
+        self._unfitted = 0
+        self._retraining = self._retrain_pending = False
+        self.stats = {"routed": Counter(), "budget_downgrades": 0, "latency_downgrades": 0,
+                      "cost_usd": Counter(), "retrains": 0, "retrain_seconds": 0.0}
+        # Seeds only here (milliseconds); the logged outcomes are folded in off the caller's thread
+        self.classifier = self._train(SEED_EXAMPLES)
+        if self._outcomes:
+            self._schedule_retrain()
+
+    def _load_outcomes(self) -> deque:
+        """Most recent MAX_OUTCOMES labels; the file is compacted when it grows to twice that."""
+        outcomes, lines = deque(maxlen=MAX_OUTCOMES), 0
+        if self.log_path and os.path.exists(self.log_path):
+            with open(self.log_path, encoding="utf-8") as f:
+                for line in f:
+                    lines += 1
+                    try:
+                        record = json.loads(line)
+                        outcomes.append((record["query"], int(record["needs_premium"])))
+                    except (json.JSONDecodeError, KeyError):
+                        continue
+        if lines > 2 * MAX_OUTCOMES:
+            self._compact_log(outcomes)
+        return outcomes
+
+    def _compact_log(self, outcomes):
+        temp_path = self.log_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for query, label in outcomes:
+                f.write(json.dumps({"query": query, "needs_premium": label}) + "\n")
+        os.replace(temp_path, self.log_path)
+
+    @staticmethod
+    def _train(examples: list) -> ComplexityClassifier:
+        return ComplexityClassifier().fit([q for q, _ in examples], [label for _, label in examples])
+
+    def _schedule_retrain(self):
+        """Queues one background retrain; labels arriving meanwhile trigger exactly one more."""
+        with self._lock:
+            if self._retraining:
+                self._retrain_pending = True
+                return
+            self._retraining = True
+        _retrain_executor.submit(self._retrain_loop)
+
+    def _retrain_loop(self):
+        while True:
+            with self._lock:
+                examples = SEED_EXAMPLES + list(self._outcomes)
+                self._retrain_pending = False
+            started = time.perf_counter()
+            try:
+                classifier = self._train(examples)
+            finally:
+                with self._lock:
+                    self.stats["retrain_seconds"] = time.perf_counter() - started
+            with self._lock:
+                self.classifier = classifier   # Readers keep using the old model until this swap
+                self.stats["retrains"] += 1
+                if not self._retrain_pending:
+                    self._retraining = False
+                    return
+
+    def wait_for_retrain(self, timeout: float = 30.0) -> bool:
+        """Blocks until no retrain is queued or running (benchmarks and tests)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if not self._retraining:
+                    return True
+            time.sleep(0.01)
+        return False
+
+    def _prune(self, now: float):
+        for calls in self._calls.values():
+            while calls and now - calls[0][0] > self.window_seconds:
+                calls.popleft()
+
+    def window_spend(self, tier: str = PREMIUM) -> float:
+        with self._lock:
+            self._prune(time.time())
+            return sum(cost for _, _, cost in self._calls[tier])
+
+    def rolling_latency(self, tier: str):
+        """Median latency of the tier over the window, or None before its first call."""
+        with self._lock:
+            self._prune(time.time())
+            latencies = [latency for _, latency, _ in self._calls[tier] if latency is not None]
+        return statistics.median(latencies) if latencies else None
+
+    @staticmethod
+    def estimate_cost(tier: str, prompt_tokens: int, output_tokens: int) -> float:
+        price_in, price_out = TIER_PRICES[tier]
+        return (prompt_tokens * price_in + output_tokens * price_out) / 1000
+
+    def can_afford(self, prompt_tokens: int, expected_output_tokens: int = 600) -> bool:
+        """True while one more premium call fits in this window's budget."""
+        return self.window_spend(PREMIUM) + self.estimate_cost(PREMIUM, prompt_tokens, expected_output_tokens) <= self.budget_usd
+
+    def route(self, query: str, expected_output_tokens: int = 600) -> RouteDecision:
+        probability = self.classifier.predict_proba(query)
+        tokens = estimate_tokens(query)
+        tier = PREMIUM if probability >= self.threshold else ECO
+        reasons = [f"complexity score {probability:.2f} vs threshold {self.threshold:.2f} ({tokens} prompt tokens)"]
+
+        if tier == PREMIUM:
+            cost = self.estimate_cost(PREMIUM, tokens, expected_output_tokens)
+            spent = self.window_spend(PREMIUM)
+            premium_p50 = self.rolling_latency(PREMIUM)
+            if not self.can_afford(tokens, expected_output_tokens):
+                tier = ECO
+                self.stats["budget_downgrades"] += 1
+                reasons.append(f"premium budget exhausted (${spent:.4f} + ${cost:.4f} > ${self.budget_usd:g} "
+                               f"per {self.window_seconds / 60:.0f} min) -> eco")
+            elif premium_p50 and premium_p50 > PREMIUM_LATENCY_SLO_SECONDS and probability < CONFIDENT:
+                tier = ECO
+                self.stats["latency_downgrades"] += 1
+                reasons.append(f"premium p50 {premium_p50:.1f}s above {PREMIUM_LATENCY_SLO_SECONDS:.0f}s SLO "
+                               f"and score below {CONFIDENT:.2f} -> eco")
+            else:
+                reasons.append(f"premium spend ${spent:.4f} of ${self.budget_usd:g} this window")
+
+        self.stats["routed"][tier] += 1
+        return RouteDecision(tier, probability, tokens, self.estimate_cost(tier, tokens, expected_output_tokens), reasons)
+
+    def record(self, decision: RouteDecision, latency_seconds: float, output_text: str) -> float:
+        """
+        Books the real latency and cost of a call; returns its cost. A call
+        cancelled mid-flight passes latency_seconds=None: its prompt is still
+        billed, but it does not count towards the tier's latency.
+        """
+        cost = self.estimate_cost(decision.tier, decision.tokens, estimate_tokens(output_text) if output_text else 0)
+        now = time.time()
+        with self._lock:
+            self._calls[decision.tier].append((now, latency_seconds, cost))
+            self._prune(now)
+            self.stats["cost_usd"][decision.tier] += cost
+        return cost
+
+    def add_outcome(self, query: str, needs_premium: bool):
+        """
+        Logs a labelled outcome (e.g. eco answer rejected -> needs premium). Every
+        RETRAIN_EVERY labels a retrain is queued on a background thread.
+        """
+        with self._lock:
+            self._outcomes.append((query, int(needs_premium)))
+            self._unfitted += 1
+            if self.log_path:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"query": query, "needs_premium": int(needs_premium), "ts": time.time()}) + "\n")
+            retrain = self._unfitted >= RETRAIN_EVERY
+            if retrain:
+                self._unfitted = 0
+        if retrain:
+            self._schedule_retrain()
+
+    def snapshot(self) -> dict:
+        """Eco/premium split, cost per hour and rolling latency per tier."""
+        routed = self.stats["routed"]
+        total = sum(routed.values())
+        hours = max(time.time() - self.started, 60.0) / 3600
+        return {
+            "routed": dict(routed),
+            "premium_share": routed[PREMIUM] / total if total else 0.0,
+            "cost_per_hour": sum(self.stats["cost_usd"].values()) / hours,
+            "window_premium_spend": self.window_spend(PREMIUM),
+            "p50_latency": {tier: self.rolling_latency(tier) for tier in (ECO, PREMIUM)},
+            "budget_downgrades": self.stats["budget_downgrades"],
+            "latency_downgrades": self.stats["latency_downgrades"],
+            "labelled_outcomes": len(self._outcomes),
+            "retrains": self.stats["retrains"],
+        }
+
+
+def format_report(snapshot: dict) -> str:
+    latency = ", ".join(f"{tier} {value:.1f}s" if value is not None else f"{tier} n/a"
+                        for tier, value in snapshot["p50_latency"].items())
+    return (f"- **Split:** {snapshot['routed'].get(ECO, 0)} eco / {snapshot['routed'].get(PREMIUM, 0)} premium "
+            f"({snapshot['premium_share']:.0%} premium)\n"
+            f"- **Cost:** ${snapshot['cost_per_hour']:.4f}/hour, premium ${snapshot['window_premium_spend']:.4f} this window\n"
+            f"- **Rolling p50 latency:** {latency}\n"
+            f"- **Downgrades:** {snapshot['budget_downgrades']} budget, {snapshot['latency_downgrades']} latency\n"
+            f"- **Classifier:** {snapshot['labelled_outcomes']} logged outcomes, {snapshot['retrains']} retrains")
+
+
+if __name__ == "__main__":
+    router = ModelRouter(log_path=None, budget_usd=0.001)
+    samples = [
+        "What is the current time?",
+        "How do I reset my VPN password?",
+        "Analyze the long-term ROI of migrating our legacy ERP to a microservices architecture.",
+        "Forecast our security budget for next year and recommend where to invest.",
+        "Is the wifi down in building 3?",
+        "Design a multi-region architecture for the payments platform with cost and risk trade-offs.",
+    ]
+    print("🧭 Routing decisions")
+    print("-" * 78)
+    for query in samples * 2:
+        decision = router.route(query)
+        router.record(decision, 1.2 if decision.tier == ECO else 6.5, "x" * 2400)
+        print(f"{decision.tier:<8}{decision.probability:>6.2f}  {query[:60]}")
+        for reason in decision.reasons[1:]:
+            print(f"{'':<16}{reason}")
+
+    started = time.perf_counter()
+    for _ in range(2000):
+        router.classifier.predict_proba(samples[2])
+    print(f"\n⏱️ Classifier decision: {(time.perf_counter() - started) / 2000 * 1e6:.0f} µs")
+
+    for size in (300, 3000):
+        outcomes = [(f"{samples[i % len(samples)]} case {i}", int(i % 3 == 0)) for i in range(size)]
+        started = time.perf_counter()
+        ModelRouter._train(SEED_EXAMPLES + outcomes)
+        print(f"⏱️ Retrain on {size} outcomes: {time.perf_counter() - started:.2f}s (background thread)")
+    print(format_report(router.snapshot()))
@@ -1,20 +1,27 @@
 """
 Pattern: Resource-Aware (Strategic Cost Optimization)
 Description: Dynamically routes queries between local 'Eco' models and cloud 'Premium' 
-             models to balance reasoning depth with operational cost.
+             models to balance reasoning depth with operational cost. A local
+             complexity classifier, rolling per-tier latency/cost and a premium
+             budget per window drive the decision (see model_router.py).
+             RESOURCE_MODE=cascade|speculative lets the eco model answer first
+             and escalates only on low confidence (see cascade.py).
 """
 import asyncio
+import os
+import time
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, single_turn, stream_agent, TextDelta
+from model_router import ECO, PREMIUM, TIER_LABELS, ModelRouter, RouteDecision, estimate_tokens, format_report
+from cascade import outcome_label, run_cascade
 
 # 1. Configuration - Tiered Compute Strategy
 # Tier 1: Local / Low Cost / High Speed
-ECO_MODEL = LiteLlm(model="ollama_chat/llama3.2") 
+ECO_MODEL = get_model("ollama_chat/llama3.2") 
 # Tier 2: Cloud / High Reasoning / Premium Cost
-PREMIUM_MODEL = LiteLlm(model="google/gemini-2.0-flash") 
+PREMIUM_MODEL = get_model("google/gemini-2.0-flash") 
 
 APP_NAME = "CIO_Unit_Economics_Engine"
 
@@ -31,40 +38,103 @@ strategic_brain = Agent(
     instruction="You are a high-reasoning strategy consultant. Provide deep analysis, complex math, and long-range planning."
 )
 
-# 3. Generator Logic for Streamlit
-async def execute_resource_aware(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "res_optimize_sess"
-    
-    yield "🔍 **Analyzing Compute Intensity:** Profiling query for cost-effective routing..."
+# 3. Cost- and Latency-Aware Router (shared so rolling telemetry and budget span every run)
+ROUTER = ModelRouter()
+TIER_AGENTS = {ECO: triage_bot, PREMIUM: strategic_brain}
+# routed: decide up front | cascade: eco first, escalate on low confidence | speculative: both start, premium cancelled if eco passes
+EXECUTION_MODE = os.getenv("RESOURCE_MODE", "routed").lower()
+_cascade_stats = {"runs": 0, "premium_calls": 0, "escalations": 0, "premium_cancelled": 0, "wall_seconds": 0.0}
+
+
+async def execute_cascade(user_query: str, speculative: bool):
+    label = "Speculative Cascade" if speculative else "Cascade"
+    yield f"🪜 **{label}:** {TIER_LABELS[ECO]} answers first; a confidence check decides on escalation..."
+    # The classifier score sets how demanding the confidence check is; the tier is chosen by the cascade itself
+    decision = RouteDecision(ECO, ROUTER.classifier.predict_proba(user_query), estimate_tokens(user_query), 0.0, [])
+
+    result = await run_cascade(
+        user_query,
+        # Each tier answers in its own session, so cascade tiers never see each other's drafts
+        eco=lambda: single_turn(TIER_AGENTS[ECO], APP_NAME, "cio_admin", f"res_{ECO}", user_query),
+        premium=lambda: single_turn(TIER_AGENTS[PREMIUM], APP_NAME, "cio_admin", f"res_{PREMIUM}", user_query),
+        complexity=decision.probability,
+        speculative=speculative,
+        allow_premium=ROUTER.can_afford(decision.tokens),
+    )
+
+    # Book every call that ran; a cancelled premium call is still billed for its prompt
+    cost = ROUTER.record(decision, result.eco_seconds, result.eco_answer)
+    if result.premium_started:
+        cost += ROUTER.record(decision._replace(tier=PREMIUM), result.premium_seconds, result.answer if result.escalated else "")
+    ROUTER.stats["routed"][result.tier] += 1
+    needs_premium = outcome_label(result)   # Heuristic self-labels, so borderline confidences are not fed back
+    if needs_premium is not None:
+        ROUTER.add_outcome(user_query, needs_premium=needs_premium)
+
+    _cascade_stats["runs"] += 1
+    _cascade_stats["premium_calls"] += result.premium_started
+    _cascade_stats["escalations"] += result.escalated
+    _cascade_stats["premium_cancelled"] += result.premium_cancelled
+    _cascade_stats["wall_seconds"] += result.wall_seconds
+    runs = _cascade_stats["runs"]
+
+    verdict = "escalated" if result.escalated else "accepted"
+    checks = "; ".join(result.reasons) or "all checks passed"
+    yield f"🔎 **Confidence {result.confidence:.2f}:** eco answer {verdict} ({checks})"
+    yield (f"### ⚖️ Compute Resource Allocation: {TIER_LABELS[result.tier]} ({label})\n\n{result.answer}\n\n"
+           f"---\n**Cascade:** eco {result.eco_seconds:.1f}s"
+           + (f", premium {result.premium_seconds:.1f}s" if result.premium_seconds is not None else "")
+           + (", premium cancelled" if result.premium_cancelled else "")
+           + f", wall {result.wall_seconds:.1f}s, ~${cost:.5f}\n\n"
+           f"- **Avg latency:** {_cascade_stats['wall_seconds'] / runs:.1f}s over {runs} runs\n"
+           f"- **Premium-call rate:** {_cascade_stats['premium_calls'] / runs:.0%} "
+           f"({_cascade_stats['escalations']} escalations, {_cascade_stats['premium_cancelled']} cancelled)\n"
+           f"{format_report(ROUTER.snapshot())}")
+
+
+# 4. Generator Logic for Streamlit
+async def execute_resource_aware(user_query: str, stream: bool = False):
+    if EXECUTION_MODE in ("cascade", "speculative"):
+        # Drafts may be discarded on escalation, so cascade answers are buffered rather than token-streamed
+        async for update in execute_cascade(user_query, speculative=EXECUTION_MODE == "speculative"):
+            yield update
+        return
+
+    async with session_scope(APP_NAME, user_id="cio_admin", prefix="res_optimize") as SID:
     
-    # --- STRATEGIC CLASSIFICATION LOGIC ---
-    # Heuristic: Complex strategic requests get the 'Brain', routine requests get the 'Edge'
-    strategic_keywords = ["roadmap", "investment", "architecture", "security", "analyze", "budget", "forecast"]
-    is_premium_req = any(k in user_query.lower() for k in strategic_keywords) or len(user_query) > 200
+        yield "🔍 **Analyzing Compute Intensity:** Profiling query for cost-effective routing..."
     
-    selected_agent = strategic_brain if is_premium_req else triage_bot
-    tier_label = "💎 PREMIUM CLOUD (Gemini 2.0)" if is_premium_req else "⚡ LOCAL EDGE (Llama 3.2)"
+        # --- STRATEGIC CLASSIFICATION LOGIC ---
+        # Local classifier score, then budget and latency guards; every step is kept as rationale
+        decision = ROUTER.route(user_query)
+        tier_label = TIER_LABELS[decision.tier]
+        rationale = "\n".join(f"- {reason}" for reason in decision.reasons)
     
-    yield f"🚀 **Routing Decision:** Assigning task to **{tier_label}**..."
-    await asyncio.sleep(0.8) 
+        yield f"🚀 **Routing Decision:** Assigning task to **{tier_label}**..."
     
-    await session_service.create_session(user_id="cio_admin", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=selected_agent, session_service=session_service, app_name=APP_NAME)
+        runner = get_runner(TIER_AGENTS[decision.tier], APP_NAME)
     
-    response = ""
-    msg = types.Content(role='user', parts=[types.Part(text=user_query)])
+        response = ""
+        msg = types.Content(role='user', parts=[types.Part(text=user_query)])
+        started = time.perf_counter()
     
-    async for event in runner.run_async(user_id="cio_admin", session_id=SID, new_message=msg):
-        if event.is_final_response():
-            response = event.content.parts[0].text
+        async for chunk in stream_agent(runner, "cio_admin", SID, msg, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                response = chunk
+
+        latency = time.perf_counter() - started
+        cost = ROUTER.record(decision, latency, response)
             
-    yield f"### ⚖️ Compute Resource Allocation: {tier_label}\n\n{response}"
+        yield (f"### ⚖️ Compute Resource Allocation: {tier_label}\n\n{response}\n\n"
+               f"---\n**Routing Rationale** ({latency:.1f}s, ~${cost:.5f}):\n{rationale}\n\n"
+               f"**Router Counters:**\n{format_report(ROUTER.snapshot())}")
 
-# 4. Universal Entry Point
-async def run_pattern(user_query: str):
+# 5. Universal Entry Point
+async def run_pattern(user_query: str, stream: bool = False):
     """Entry point for Streamlit dashboard."""
-    return execute_resource_aware(user_query)
+    return execute_resource_aware(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
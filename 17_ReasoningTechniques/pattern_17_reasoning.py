@@ -5,13 +5,12 @@ Description: Forces the agent to perform an 'Inner Monologue' to de-risk complex
 """
 import asyncio
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_Logic_Engine"
 
 # 2. Define the Reasoning Agent
@@ -30,30 +29,30 @@ reasoning_agent = Agent(
 )
 
 # 3. Generator Logic for Streamlit
-async def execute_reasoning(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "logic_sess_99"
+async def execute_reasoning(user_query: str, stream: bool = False):
+    async with session_scope(APP_NAME, user_id="cio_lead", prefix="logic") as SID:
     
-    yield "🧠 Engaging high-reasoning 'Inner Monologue' (Chain-of-Thought)..."
+        yield "🧠 Engaging high-reasoning 'Inner Monologue' (Chain-of-Thought)..."
     
-    await session_service.create_session(user_id="cio_lead", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=reasoning_agent, session_service=session_service, app_name=APP_NAME)
+        runner = get_runner(reasoning_agent, APP_NAME)
     
-    msg = types.Content(role='user', parts=[types.Part(text=user_query)])
+        msg = types.Content(role='user', parts=[types.Part(text=user_query)])
     
-    response = ""
-    # The async stream allows the UI to show progress while the 'Deep Thinking' happens
-    async for event in runner.run_async(user_id="cio_lead", session_id=SID, new_message=msg):
-        if event.is_final_response():
-            response = event.content.parts[0].text
+        response = ""
+        # The async stream allows the UI to show progress while the 'Deep Thinking' happens
+        async for chunk in stream_agent(runner, "cio_lead", SID, msg, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                response = chunk
             
-    yield "✅ Strategic deduction complete. Logic trail established."
-    yield f"{response}"
+        yield "✅ Strategic deduction complete. Logic trail established."
+        yield f"{response}"
 
 # 4. Universal Entry Point
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """Entry point for Streamlit dashboard."""
-    return execute_reasoning(user_query)
+    return execute_reasoning(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
@@ -2,17 +2,26 @@
 Pattern: Strategic Guardrails (Governance & Compliance)
 Description: An independent auditor agent validates strategy outputs against 
              corporate risk, security, and financial policies before display.
+             In streaming audit mode the analyst draft is scanned while it is
+             generated and aborted on the first hard violation.
 """
 import asyncio
+import os
+import time
+from contextlib import aclosing
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
+from guardrail_rules import GuardrailRules, StreamAuditor, REJECTED, APPROVED
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_Governance_Shield"
+RULES = GuardrailRules()
+AUDIT_MODE = os.getenv("GUARDRAIL_AUDIT_MODE", "streaming")   # streaming | post
+LLM_CALLS_PER_REQUEST = 2   # Analyst + ComplianceShield without the fast-path
+_fast_path = {"requests": 0, "llm_calls": 0, "llm_calls_avoided": 0}
 
 # 2. Define the Agents
 primary_analyst = Agent(
@@ -37,54 +46,112 @@ compliance_guard = Agent(
     )
 )
 
-# 3. Generator Logic for Streamlit
-async def execute_guardrails(user_query: str):
-    session_service = InMemorySessionService()
-    
+# 3. Fast-Path Accounting
+def fast_path_report() -> str:
+    """Share of LLM calls the rule engine has saved so far in this process."""
+    baseline = _fast_path["requests"] * LLM_CALLS_PER_REQUEST
+    avoided = _fast_path["llm_calls_avoided"] / baseline if baseline else 0.0
+    return f"⚡ Fast-path: {_fast_path['llm_calls_avoided']}/{baseline} LLM calls avoided ({avoided:.0%}) across {_fast_path['requests']} request(s)."
+
+def reject_timing(started: float, stage: str) -> str:
+    return f"⏱️ Time-to-reject: {(time.perf_counter() - started) * 1000:.0f} ms ({stage})."
+
+def block_report(guard_status: str) -> str:
+    return (
+        f"## ⚠️ Security & Compliance Block\n\n"
+        f"**Status:** {guard_status}\n\n"
+        "**Action:** The generated content has been intercepted by the Governance Shield. "
+        "Strategy recommendations must align with 'Sanctioned Tools' and 'Financial Authority' lists."
+    )
+
+# 4. Generator Logic for Streamlit
+async def execute_guardrails(user_query: str, stream: bool = False):
+    # Analyst text must never reach the UI before it is audited, so `stream` is
+    # accepted for contract uniformity but the analyst draft is never streamed.
+    _fast_path["requests"] += 1
+    started = time.perf_counter()
+
+    # --- STEP 0: DETERMINISTIC PRE-SCREEN OF THE REQUEST ---
+    verdict = RULES.screen_input(user_query)
+    if verdict.decision == REJECTED:
+        _fast_path["llm_calls_avoided"] += LLM_CALLS_PER_REQUEST
+        yield "⚡ **Step 0:** Rule engine rejected the request before any model call."
+        yield "❌ **Corporate Policy Violation Detected.**"
+        yield f"{block_report('REJECTED: ' + '; '.join(verdict.reasons))}\n\n_{reject_timing(started, 'input pre-screen')}_\n\n_{fast_path_report()}_"
+        return
+    # Evasion-style phrasing can be legitimate ("disable the legacy firewall after migrating"),
+    # so it never blocks here; it forces the LLM audit below and is shown to the judge
+    input_flags = verdict.reasons
+    if input_flags:
+        yield f"🔎 **Step 0:** Request flagged for review ({'; '.join(input_flags)}); the Compliance Shield will decide."
+
     # --- STEP 1: GENERATE STRATEGY ---
     yield "🤖 **Step 1:** Strategy Analyst is drafting the technical recommendation..."
-    
-    await session_service.create_session(user_id="cio_staff", session_id="analyst_sess", app_name=APP_NAME)
-    runner_p = Runner(agent=primary_analyst, session_service=session_service, app_name=APP_NAME)
+    _fast_path["llm_calls"] += 1
     
     raw_response = ""
-    msg_p = types.Content(role='user', parts=[types.Part(text=user_query)])
-    async for event in runner_p.run_async(user_id="cio_staff", session_id="analyst_sess", new_message=msg_p):
-        if event.is_final_response():
-            raw_response = event.content.parts[0].text
+    stream_reasons = []
+    auditor = StreamAuditor(RULES) if AUDIT_MODE == "streaming" else None
+    async with session_scope(APP_NAME, user_id="cio_staff", prefix="analyst") as analyst_sid:
+        runner_p = get_runner(primary_analyst, APP_NAME)
+        msg_p = types.Content(role='user', parts=[types.Part(text=user_query)])
+        # Deltas feed the auditor only; they never reach the UI
+        async with aclosing(stream_agent(runner_p, "cio_staff", analyst_sid, msg_p, stream=auditor is not None)) as chunks:
+            async for chunk in chunks:
+                if isinstance(chunk, TextDelta):
+                    stream_reasons = auditor.feed(chunk)
+                    if stream_reasons:
+                        break   # Closing the stream stops generation; the rest of the draft is never produced
+                else:
+                    raw_response = chunk
+
+    if stream_reasons:
+        _fast_path["llm_calls_avoided"] += 1
+        yield f"✂️ **Step 2:** Streaming audit aborted the draft after {auditor.chars_seen} characters."
+        yield "❌ **Corporate Policy Violation Detected.**"
+        yield f"{block_report('REJECTED: ' + '; '.join(stream_reasons))}\n\n_{reject_timing(started, 'streaming audit')}_\n\n_{fast_path_report()}_"
+        return
 
     # --- STEP 2: APPLY COMPLIANCE GUARDRAIL ---
-    yield "🛡️ **Step 2:** Compliance Shield is auditing the output for policy alignment..."
-    
-    await session_service.create_session(user_id="cio_staff", session_id="audit_sess", app_name=APP_NAME)
-    runner_g = Runner(agent=compliance_guard, session_service=session_service, app_name=APP_NAME)
-    
-    guard_status = ""
-    # We feed the analyst's output into the guard agent
-    guard_msg = f"Auditing the following technical recommendation: {raw_response}"
-    msg_g = types.Content(role='user', parts=[types.Part(text=guard_msg)])
-    
-    async for event in runner_g.run_async(user_id="cio_staff", session_id="audit_sess", new_message=msg_g):
-        if event.is_final_response():
-            guard_status = event.content.parts[0].text
+    verdict = RULES.screen_output(raw_response)
+    if verdict.decision == REJECTED:
+        _fast_path["llm_calls_avoided"] += 1
+        guard_status = "REJECTED: " + "; ".join(verdict.reasons)
+        yield "⚡ **Step 2:** Rule engine found a definite violation; LLM audit skipped."
+    elif verdict.decision == APPROVED and not input_flags:
+        _fast_path["llm_calls_avoided"] += 1
+        guard_status = "APPROVED"
+        yield "⚡ **Step 2:** Short, rule-free answer on the allowlist; LLM audit skipped."
+    else:
+        yield "🛡️ **Step 2:** Compliance Shield is auditing the output for policy alignment..."
+        _fast_path["llm_calls"] += 1
+
+        guard_status = ""
+        # We feed the analyst's output into the guard agent
+        guard_msg = f"Auditing the following technical recommendation: {raw_response}"
+        flags = input_flags + verdict.reasons
+        if flags:
+            guard_msg += f"\n\nRule engine flags (not verdicts): {'; '.join(flags)}. Original request: {user_query}"
+        msg_g = types.Content(role='user', parts=[types.Part(text=guard_msg)])
+
+        async with session_scope(APP_NAME, user_id="cio_staff", prefix="audit") as audit_sid:
+            runner_g = get_runner(compliance_guard, APP_NAME)
+            async for event in runner_g.run_async(user_id="cio_staff", session_id=audit_sid, new_message=msg_g):
+                if event.is_final_response():
+                    guard_status = event.content.parts[0].text
 
     # --- STEP 3: FINAL POLICY DECISION ---
     if "REJECTED" in guard_status.upper():
         yield "❌ **Corporate Policy Violation Detected.**"
-        yield (
-            f"## ⚠️ Security & Compliance Block\n\n"
-            f"**Status:** {guard_status}\n\n"
-            "**Action:** The generated content has been intercepted by the Governance Shield. "
-            "Strategy recommendations must align with 'Sanctioned Tools' and 'Financial Authority' lists."
-        )
+        yield f"{block_report(guard_status)}\n\n_{reject_timing(started, 'post-generation audit')}_\n\n_{fast_path_report()}_"
     else:
         yield "✅ **Compliance Verification Passed.** Output is cleared for executive review."
-        yield f"### 🟢 Strategy Brief (Verified)\n\n{raw_response}"
+        yield f"### 🟢 Strategy Brief (Verified)\n\n{raw_response}\n\n_{fast_path_report()}_"
 
-# 4. Universal Entry Point
-async def run_pattern(user_query: str):
+# 5. Universal Entry Point
+async def run_pattern(user_query: str, stream: bool = False):
     """Entry point for Streamlit dashboard."""
-    return execute_guardrails(user_query)
+    return execute_guardrails(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
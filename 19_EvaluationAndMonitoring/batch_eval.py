@@ -0,0 +1,197 @@
+"""
+Batch Evaluation Harness (LLM-as-a-Judge at Scale)
+Description: Scores a JSONL dataset of proposal prompts with the pattern 19
+             writer/judge pair. Pairs run with bounded concurrency, rubric
+             scores are parsed into numbers, every finished item is appended
+             to a checkpoint so an interrupted run resumes where it stopped,
+             and the final table is written as Parquet.
+
+Usage (from the repo root; the shared root modules are put on sys.path either way):
+    python 19_EvaluationAndMonitoring/batch_eval.py --dataset requests.jsonl --output eval_results.parquet --concurrency 4
+    python 19_EvaluationAndMonitoring/batch_eval.py --dataset requests.jsonl --bench 1 2 4 8 --limit 16
+
+Parquet output uses pandas + pyarrow (installed with streamlit); without them
+the table is written as CSV next to the requested path.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)   # Running the script puts only this folder on sys.path; model_client etc. live at the root
+
+from response_cache import get_response_cache
+from pattern_19_evaluation import RUBRIC, grade_proposal
+
+# 1. Configuration
+DEFAULT_CONCURRENCY = 4
+PROMPT_FIELDS = ("prompt", "query", "proposal", "body", "title")   # First non-empty field is graded
+ID_FIELDS = ("id", "request_id")
+
+
+# 2. Dataset & Checkpoint
+def load_dataset(path: str, prompt_field: str = None, limit: int = None) -> list:
+    """Returns [(item_id, prompt)] from a JSONL file; ids fall back to the line number."""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            fields = (prompt_field,) if prompt_field else PROMPT_FIELDS
+            prompt = next((record[k] for k in fields if record.get(k)), None)
+            if prompt is None:
+                continue
+            if not prompt_field and record.get("title") and record.get("body"):
+                prompt = f"{record['title']}\n\n{record['body']}"
+            item_id = str(next((record[k] for k in ID_FIELDS if record.get(k)), line_no))
+            items.append((item_id, prompt))
+    return items[:limit] if limit else items
+
+
+def load_checkpoint(path: str) -> dict:
+    """item_id -> result row for every item already finished by a previous run."""
+    done = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue   # A torn line from a killed run; that item is simply re-graded
+                done[row["id"]] = row
+    return done
+
+
+def trim_torn_tail(path: str):
+    """Cuts a checkpoint back to its last complete line, so appended rows never stick to a torn fragment."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - 4096)
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            f.truncate(position)
+
+
+def to_row(item_id: str, prompt: str, graded: dict) -> dict:
+    row = {"id": item_id, "prompt": prompt, "proposal": graded["proposal"], "audit_report": graded["audit_report"],
+           "writer_seconds": round(graded["writer_seconds"], 3), "judge_seconds": round(graded["judge_seconds"], 3)}
+    for criterion, score in graded["scores"].items():
+        row[criterion.lower().replace(" ", "_")] = score
+    parsed = [s for s in graded["scores"].values() if s is not None]
+    row["mean_score"] = round(sum(parsed) / len(parsed), 2) if parsed else None
+    return row
+
+
+def write_table(rows: list, output: str) -> str:
+    try:
+        import pandas as pd
+        pd.DataFrame(rows).to_parquet(output, index=False)
+        return output
+    except ImportError:
+        fallback = os.path.splitext(output)[0] + ".csv"
+        import csv
+        with open(fallback, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["id"])
+            writer.writeheader()
+            writer.writerows(rows)
+        print("⚠️ pandas/pyarrow not installed; wrote CSV instead of Parquet.")
+        return fallback
+
+
+# 3. Bounded-Concurrency Runner
+async def run_batch(items: list, concurrency: int, checkpoint_path: str = None, grade=grade_proposal) -> dict:
+    """Grades every item not yet in the checkpoint; returns item_id -> row (checkpointed + new)."""
+    done = load_checkpoint(checkpoint_path) if checkpoint_path else {}
+    todo = [(i, p) for i, p in items if i not in done]
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+    if checkpoint_path:
+        trim_torn_tail(checkpoint_path)
+    checkpoint = open(checkpoint_path, "a", encoding="utf-8") if checkpoint_path else None
+
+    async def grade_one(item_id: str, prompt: str):
+        async with semaphore:
+            return item_id, prompt, await grade(prompt)
+
+    try:
+        tasks = [asyncio.create_task(grade_one(i, p)) for i, p in todo]
+        for finished in asyncio.as_completed(tasks):
+            try:
+                item_id, prompt, graded = await finished
+            except Exception as e:   # One failed pair must not sink a nightly run; it is retried on resume
+                failures += 1
+                print(f"   ❌ grading failed: {e}")
+                continue
+            row = to_row(item_id, prompt, graded)
+            done[item_id] = row
+            if checkpoint:
+                checkpoint.write(json.dumps(row) + "\n")
+                checkpoint.flush()
+            print(f"   ✅ [{len(done)}/{len(items)}] {item_id}: mean {row['mean_score']}")
+    finally:
+        if checkpoint:
+            checkpoint.close()
+    if failures:
+        print(f"⚠️ {failures} item(s) failed and will be retried on the next run.")
+    return done
+
+
+async def run_throughput(items: list, levels: list):
+    """Proposals per minute at each concurrency level, with the response cache off so every call hits the model."""
+    get_response_cache().enabled = False
+    print(f"📈 Throughput over {len(items)} proposals (response cache disabled)")
+    print(f"{'Concurrency':>12}{'Wall s':>10}{'Proposals/min':>16}{'Scaling':>10}")
+    baseline = None
+    for level in levels:
+        started = time.perf_counter()
+        graded = await run_batch(items, level)
+        wall = time.perf_counter() - started
+        rate = len(graded) / wall * 60
+        baseline = baseline or rate
+        print(f"{level:>12}{wall:>10.1f}{rate:>16.1f}{rate / baseline:>9.2f}x")
+
+
+# 4. CLI
+def main():
+    parser = argparse.ArgumentParser(description="Batch LLM-as-a-Judge evaluation over a JSONL dataset.")
+    parser.add_argument("--dataset", required=True, help="JSONL file, one proposal prompt per line")
+    parser.add_argument("--output", default="eval_results.parquet")
+    parser.add_argument("--checkpoint", help="Progress file (default: <output>.checkpoint.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--field", help="JSON field holding the prompt (default: first of %s)" % ", ".join(PROMPT_FIELDS))
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--bench", type=int, nargs="+", metavar="N", help="Report throughput at these concurrency levels instead")
+    args = parser.parse_args()
+
+    items = load_dataset(args.dataset, args.field, args.limit)
+    if args.bench:
+        asyncio.run(run_throughput(items, args.bench))
+        return
+
+    checkpoint_path = args.checkpoint or args.output + ".checkpoint.jsonl"
+    started = time.perf_counter()
+    print(f"⚖️ Grading {len(items)} proposals (concurrency {args.concurrency}, rubric: {', '.join(RUBRIC)})")
+    results = asyncio.run(run_batch(items, args.concurrency, checkpoint_path))
+    rows = [results[i] for i, _ in items if i in results]
+    path = write_table(rows, args.output)
+    wall = time.perf_counter() - started
+    print(f"📦 {len(rows)}/{len(items)} results written to {path} in {wall:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,17 @@ Pattern: Evaluation (LLM-as-a-Judge)
 Strategic Value: Automated Quality Assurance for Executive Reports.
 """
 import asyncio
+import re
+import time
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_Quality_Control"
+RUBRIC = ("Strategic Alignment", "Technical Feasibility", "Financial Logic")
 
 # 2. Define the Agents
 strategy_lead = Agent(
@@ -25,44 +27,74 @@ qa_judge = Agent(
     model=OLLAMA_MODEL, 
     instruction=(
         "You are a Quality Assurance Judge. Rate the provided strategy 1-5 on: "
-        "1. Strategic Alignment, 2. Technical Feasibility, 3. Financial Logic."
+        "1. Strategic Alignment, 2. Technical Feasibility, 3. Financial Logic. "
+        "Give each score on its own line as '<Criterion>: <score>/5', then a short justification."
     )
 )
 
-# 3. The Core Logic Function
-async def execute_evaluation(user_query: str):
-    session_service = InMemorySessionService()
-    
+# 3. Rubric Parsing
+def parse_scores(audit_report: str) -> dict:
+    """Extracts the 1-5 score per rubric criterion; criteria the judge skipped map to None."""
+    scores = {}
+    for position, criterion in enumerate(RUBRIC, 1):
+        # Accepts 'Strategic Alignment: 4/5', '**Strategic Alignment** - Score: 4' and '1. ... 4/5'
+        match = (re.search(rf"{criterion}\W{{0,6}}(?:score\W{{0,3}})?([1-5])(?:\.\d)?\s*(?:/\s*5|out of 5)?", audit_report, re.IGNORECASE)
+                 or re.search(rf"^\W*{position}\.[^\n]{{0,60}}?\b([1-5])\s*(?:/\s*5|out of 5)", audit_report, re.IGNORECASE | re.MULTILINE))
+        scores[criterion] = int(match.group(1)) if match else None
+    return scores
+
+async def grade_proposal(user_query: str) -> dict:
+    """Non-streaming writer/judge pair used by the batch harness."""
+    started = time.perf_counter()
+    async with session_scope(APP_NAME, user_id="cio", prefix="eval_w") as writer_sid:
+        msg_w = types.Content(role='user', parts=[types.Part(text=user_query)])
+        async for proposal_out in stream_agent(get_runner(strategy_lead, APP_NAME), "cio", writer_sid, msg_w):
+            pass
+    writer_seconds = time.perf_counter() - started
+
+    msg_e = types.Content(role='user', parts=[types.Part(text=f"--- PROPOSAL ---\n{proposal_out}\nEvaluate against 1-5 rubric.")])
+    async with session_scope(APP_NAME, user_id="cio", prefix="eval_e") as judge_sid:
+        async for audit_report in stream_agent(get_runner(qa_judge, APP_NAME), "cio", judge_sid, msg_e):
+            pass
+    return {"proposal": proposal_out, "audit_report": audit_report, "scores": parse_scores(audit_report),
+            "writer_seconds": writer_seconds, "judge_seconds": time.perf_counter() - started - writer_seconds}
+
+# 4. The Core Logic Function
+async def execute_evaluation(user_query: str, stream: bool = False):
     yield "🛠️ **Step 1:** Drafting technical proposal..."
     
-    await session_service.create_session(user_id="cio", session_id="eval_w", app_name=APP_NAME)
-    runner_w = Runner(agent=strategy_lead, session_service=session_service, app_name=APP_NAME)
-    
     proposal_out = ""
-    msg_w = types.Content(role='user', parts=[types.Part(text=user_query)])
-    async for event in runner_w.run_async(user_id="cio", session_id="eval_w", new_message=msg_w):
-        if event.is_final_response():
-            proposal_out = event.content.parts[0].text
+    async with session_scope(APP_NAME, user_id="cio", prefix="eval_w") as writer_sid:
+        runner_w = get_runner(strategy_lead, APP_NAME)
+        msg_w = types.Content(role='user', parts=[types.Part(text=user_query)])
+        async for chunk in stream_agent(runner_w, "cio", writer_sid, msg_w, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                proposal_out = chunk
 
     yield "⚖️ **Step 2:** Scoring proposal against CIO rubric..."
     
-    await session_service.create_session(user_id="cio", session_id="eval_e", app_name=APP_NAME)
-    runner_e = Runner(agent=qa_judge, session_service=session_service, app_name=APP_NAME)
-    
     eval_context = f"--- PROPOSAL ---\n{proposal_out}\nEvaluate against 1-5 rubric."
     msg_e = types.Content(role='user', parts=[types.Part(text=eval_context)])
     
     audit_report = ""
-    async for event in runner_e.run_async(user_id="cio", session_id="eval_e", new_message=msg_e):
-        if event.is_final_response():
-            audit_report = event.content.parts[0].text
+    async with session_scope(APP_NAME, user_id="cio", prefix="eval_e") as judge_sid:
+        runner_e = get_runner(qa_judge, APP_NAME)
+        async for chunk in stream_agent(runner_e, "cio", judge_sid, msg_e, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                audit_report = chunk
 
-    yield f"### 📋 Strategic Proposal\n{proposal_out}\n\n---\n### ⭐ Auditor Scorecard\n{audit_report}"
+    scores = parse_scores(audit_report)
+    parsed = " | ".join(f"{name}: {score if score is not None else '?'}" for name, score in scores.items())
+    yield f"### 📋 Strategic Proposal\n{proposal_out}\n\n---\n### ⭐ Auditor Scorecard\n{audit_report}\n\n**Parsed scores:** {parsed}"
 
-# 4. REQUIRED ENTRY POINT FOR VALIDATOR & DASHBOARD
-async def run_pattern(user_query: str):
+# 5. REQUIRED ENTRY POINT FOR VALIDATOR & DASHBOARD
+async def run_pattern(user_query: str, stream: bool = False):
     """Entry point used by the Master Validator and Streamlit UI."""
-    return execute_evaluation(user_query)
+    return execute_evaluation(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
@@ -5,13 +5,12 @@ Description: Uses structured prompting to force the agent to reason through
 """
 import asyncio
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_Prompt_Chain"
 
 # 2. Define the Agent with Reasoning Instruction
@@ -28,40 +27,40 @@ reasoning_agent = Agent(
 )
 
 # 3. Execution Logic
-async def execute_prompting(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "prompt_session_02"
+async def execute_prompting(user_query: str, stream: bool = False):
+    async with session_scope(APP_NAME, user_id="cio_lead", prefix="prompt") as SID:
     
-    yield "🧠 **Step 1:** Initializing Chain-of-Thought reasoning protocols..."
+        yield "🧠 **Step 1:** Initializing Chain-of-Thought reasoning protocols..."
     
-    await session_service.create_session(user_id="cio_lead", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=reasoning_agent, session_service=session_service, app_name=APP_NAME)
+        runner = get_runner(reasoning_agent, APP_NAME)
     
-    # We wrap the user query in a 'Prompt Template' to ensure high-quality output
-    structured_prompt = (
-        f"Please perform a deep-dive analysis on the following: {user_query}. "
-        "Remember to think step-by-step and identify hidden risks."
-    )
+        # We wrap the user query in a 'Prompt Template' to ensure high-quality output
+        structured_prompt = (
+            f"Please perform a deep-dive analysis on the following: {user_query}. "
+            "Remember to think step-by-step and identify hidden risks."
+        )
     
-    yield "📝 **Step 2:** Deconstructing the query into logical business segments..."
+        yield "📝 **Step 2:** Deconstructing the query into logical business segments..."
     
-    response_text = ""
-    msg = types.Content(role='user', parts=[types.Part(text=structured_prompt)])
+        response_text = ""
+        msg = types.Content(role='user', parts=[types.Part(text=structured_prompt)])
     
-    async for event in runner.run_async(user_id="cio_lead", session_id=SID, new_message=msg):
-        if event.is_final_response():
-            response_text = event.content.parts[0].text
+        async for chunk in stream_agent(runner, "cio_lead", SID, msg, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                response_text = chunk
             
-    yield "✅ **Step 3:** Reasoning complete. Formatting final executive report."
-    yield f"### 💡 Logic-Based Strategic Analysis\n\n{response_text}"
+        yield "✅ **Step 3:** Reasoning complete. Formatting final executive report."
+        yield f"### 💡 Logic-Based Strategic Analysis\n\n{response_text}"
 
 # --- REQUIRED ENTRY POINT FOR VALIDATOR & DASHBOARD ---
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """
     The master entry point used by the Master Validator and Streamlit UI.
     This function MUST be named 'run_pattern' and be async.
     """
-    return execute_prompting(user_query)
+    return execute_prompting(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
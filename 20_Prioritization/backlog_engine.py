@@ -0,0 +1,280 @@
+"""
+Backlog Engine (Rule-First Triage + WSJF Priority Queue)
+Description: Deterministic replacement for "sort this list" prompts. Raw
+             backlog text is parsed into records, each record is classified
+             P0-P3 independently (compiled keyword rules first, an async LLM
+             fallback only for ambiguous items, run concurrently), scored with
+             WSJF and pushed onto a heap. New incidents are inserted in
+             O(log n) without re-ranking the rest of the queue.
+
+Run `python backlog_engine.py` for the 10k-item benchmark.
+"""
+import asyncio
+import heapq
+import itertools
+import random
+import re
+import time
+from collections import namedtuple
+
+# 1. Rule Tables
+PRIORITIES = ("P0", "P1", "P2", "P3")
+PRIORITY_RULES = {
+    "P0": r"\bdown\b|outage|breach|ransomware|unauthori[sz]ed access|data loss|data leak|cannot process|unable to"
+          r"|production (?:is )?(?:down|halted)|sev[- ]?1|global(?:ly)? (?:down|outage)|payments? failing",
+    "P1": r"security alert|cybersecurity|vulnerabilit|exploit|degraded|intermittent|failing|compliance audit"
+          r"|deadline|regulator|customer[- ]facing|expir(?:es|ing|ed)|certificate|backup fail",
+    "P2": r"upgrade|migrat|performance|slow|integration|feature request|enhancement|capacity|refactor|bug",
+    "P3": r"typo|footer|cosmetic|logo|whitepaper|draft|documentation|battery|wallpaper|font|ideas|nice to have"
+          r"|privacy policy text|newsletter",
+}
+# Patterns are matched against lower-cased text; re.IGNORECASE is several times slower on long alternations
+PRIORITY_RES = {p: re.compile(pattern) for p, pattern in PRIORITY_RULES.items()}
+USERS_RE = re.compile(r"(\d[\d,]*)\s*(?:\+\s*)?(?:users|employees|customers|staff)")
+SECURITY_RE = re.compile(r"security|breach|unauthori[sz]ed|vulnerab|exploit|ransomware|phishing|payroll")
+LARGE_JOB_RE = re.compile(r"strategy|whitepaper|migrat|re-?architect|programme|program|roadmap|platform")
+SMALL_JOB_RE = re.compile(r"replace|reset|update the|typo|footer|battery|restart|renew|text")
+# Markers count at the start of a line, or inline after a list separator ("1. a, 2. b; 3. c"),
+# never after a plain space: "Windows 11. Budget 2.5M for 3. phases" is one item
+ITEM_MARKER_RE = re.compile(r"(?:^[ \t]*(?:[-*•]|\d{1,5}[.)])|(?<=[,;:])[ \t]*\d{1,5}[.)])\s+", re.MULTILINE)
+# "not down", "no outage", "isn't failing": a severity phrase right after a negation is not evidence
+NEGATION_RE = re.compile(r"\b(?:not|no|never|without|isn't|wasn't|aren't|weren't|no longer)\b[\w\s'-]{0,20}$")
+
+# WSJF components per priority: (business value, time criticality)
+PRIORITY_WEIGHTS = {"P0": (10, 10), "P1": (7, 6), "P2": (4, 3), "P3": (1, 1)}
+
+BacklogItem = namedtuple("BacklogItem", "seq text priority source wsjf value criticality risk size")
+
+
+# 2. Parsing & Classification
+def parse_backlog(text: str) -> list:
+    """
+    Splits numbered/bulleted lists (one per line or inline) into item texts. Text
+    before the first marker is an item too, unless it is a preamble ending in ':'.
+    """
+    markers = list(ITEM_MARKER_RE.finditer(text))
+    if markers:
+        bounds = [m.end() for m in markers]
+        pieces = [text[start:nxt.start()] for start, nxt in zip(bounds, markers[1:])] + [text[bounds[-1]:]]
+        leading = text[:markers[0].start()].strip(" \t\r\n,;")
+        if leading and not leading.endswith(":"):
+            pieces.insert(0, leading)
+    else:
+        pieces = text.splitlines()
+    return [p.strip(" \t\r\n,;") for p in pieces if p.strip(" \t\r\n,;")]
+
+
+def classify_rules(text: str) -> tuple:
+    """
+    Returns (priority, confident). The most severe matching tier wins; it is
+    confident unless nothing matched or it conflicts with a tier two or more
+    levels away (e.g. 'draft' + 'breach'); those are left to the LLM. A tier
+    whose every match is negated ('no outage') is not evidence: the result is
+    then the most severe tier that is not negated (or None), never confident.
+    """
+    text = text.lower()
+    tiers = [p for p in PRIORITIES if PRIORITY_RES[p].search(text)]
+    if not tiers:
+        return None, False
+    if _fully_negated(text, tiers[0]):
+        live = [p for p in tiers[1:] if not _fully_negated(text, p)]
+        return (live[0] if live else None), False
+    spread = PRIORITIES.index(tiers[-1]) - PRIORITIES.index(tiers[0])
+    return tiers[0], spread < 2
+
+
+def _fully_negated(text: str, priority: str) -> bool:
+    return all(NEGATION_RE.search(text, max(0, m.start() - 30), m.start())
+               for m in PRIORITY_RES[priority].finditer(text))
+
+
+def wsjf_components(text: str, priority: str) -> tuple:
+    """Cost of Delay = value + time criticality + risk reduction; WSJF = CoD / job size."""
+    text = text.lower()
+    value, criticality = PRIORITY_WEIGHTS[priority]
+    users = USERS_RE.search(text)
+    if users:
+        value += min(5, len(users.group(1).replace(",", "")) - 1)   # +1 per order of magnitude, capped
+    risk = 8 if SECURITY_RE.search(text) else 1
+    size = 8 if LARGE_JOB_RE.search(text) else 1 if SMALL_JOB_RE.search(text) else 3
+    return value, criticality, risk, size
+
+
+# 3. Priority Queue
+class BacklogQueue:
+    """
+    Min-heap keyed on (priority tier, -WSJF, insertion seq). The sequence number
+    makes ordering stable: equal-scoring items leave in arrival order.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def make_item(self, text: str, priority: str, source: str) -> BacklogItem:
+        value, criticality, risk, size = wsjf_components(text, priority)
+        wsjf = round((value + criticality + risk) / size, 3)
+        return BacklogItem(next(self._seq), text, priority, source, wsjf, value, criticality, risk, size)
+
+    def push(self, item: BacklogItem):
+        heapq.heappush(self._heap, (PRIORITIES.index(item.priority), -item.wsjf, item.seq, item))
+
+    def extend(self, items: list):
+        """Bulk load: O(n) heapify when the queue is empty, per-item pushes otherwise."""
+        entries = [(PRIORITIES.index(i.priority), -i.wsjf, i.seq, i) for i in items]
+        if self._heap:
+            for entry in entries:
+                heapq.heappush(self._heap, entry)
+        else:
+            self._heap = entries
+            heapq.heapify(self._heap)
+
+    def pop(self) -> BacklogItem:
+        return heapq.heappop(self._heap)[-1]
+
+    def top(self, k: int) -> list:
+        """The k most urgent items without disturbing the queue: walks the heap tree in O(k log k)."""
+        found, frontier = [], [(self._heap[0], 0)] if self._heap else []
+        while frontier and len(found) < k:
+            entry, index = heapq.heappop(frontier)
+            found.append(entry[-1])
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(self._heap):
+                    heapq.heappush(frontier, (self._heap[child], child))
+        return found
+
+    def ranked(self) -> list:
+        return [entry[-1] for entry in sorted(self._heap)]
+
+
+# 4. Engine
+class BacklogEngine:
+    """Classifies items concurrently (rules first, LLM fallback) and keeps them in a BacklogQueue."""
+
+    def __init__(self, llm_classify=None, concurrency: int = 8, default_priority: str = "P2"):
+        self.llm_classify = llm_classify          # async (text) -> 'P0'..'P3'
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.default_priority = default_priority
+        self.queue = BacklogQueue()
+        self.stats = {"items": 0, "rule_decisions": 0, "llm_fallbacks": 0, "llm_errors": 0}
+
+    async def classify(self, text: str, rule_result: tuple = None) -> tuple:
+        priority, confident = rule_result or classify_rules(text)
+        if confident:
+            self.stats["rule_decisions"] += 1
+            return priority, "rules"
+        if self.llm_classify is None:
+            self.stats["rule_decisions"] += 1
+            return priority or self.default_priority, "rules"
+        async with self.semaphore:
+            self.stats["llm_fallbacks"] += 1
+            try:
+                answer = await self.llm_classify(text)
+            except Exception:
+                self.stats["llm_errors"] += 1
+                return priority or self.default_priority, "rules"
+        match = re.search(r"P[0-3]", answer or "")
+        return (match.group(0) if match else priority or self.default_priority), "llm"
+
+    async def add_many(self, texts: list) -> list:
+        """Classifies all items in parallel and bulk-loads them; input order breaks WSJF ties."""
+        rule_results = [classify_rules(t) for t in texts]
+        results = [(p, "rules") if confident else None for p, confident in rule_results]
+        self.stats["rule_decisions"] += sum(r is not None for r in results)
+        # Only ambiguous items become tasks; they all wait on the LLM concurrently
+        pending = [i for i, r in enumerate(results) if r is None]
+        fallbacks = await asyncio.gather(*(self.classify(texts[i], rule_results[i]) for i in pending))
+        for i, result in zip(pending, fallbacks):
+            results[i] = result
+        items = [self.queue.make_item(t, p, s) for t, (p, s) in zip(texts, results)]
+        self.queue.extend(items)
+        self.stats["items"] += len(items)
+        return items
+
+    async def add(self, text: str) -> BacklogItem:
+        """Incremental insertion of one new incident; existing items are not re-ranked."""
+        priority, source = await self.classify(text)
+        item = self.queue.make_item(text, priority, source)
+        self.queue.push(item)
+        self.stats["items"] += 1
+        return item
+
+
+# --- BENCHMARK: 10K-ITEM BACKLOGS ---
+SYNTHETIC_TEMPLATES = [
+    "ERP system down in {region} - {n} users unable to process orders",
+    "Security alert: unauthorized access attempt on the {system} database",
+    "TLS certificate for {system} expiring next week",
+    "Upgrade {system} to the latest LTS release",
+    "Performance of {system} reports is slow for {n} employees",
+    "Fix typo in the {system} footer",
+    "Draft a whitepaper on the {region} hybrid work strategy",
+    "Replace laptop battery for the VP of {region}",
+    "Investigate {system} behaviour reported by finance",        # No rule fires -> LLM fallback
+    "Draft incident notes after the {system} breach",            # Conflicting tiers -> LLM fallback
+]
+
+
+def synthetic_backlog(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    regions = ["EMEA", "APAC", "LATAM", "North America"]
+    systems = ["Payroll", "CRM", "Data Lake", "HR portal", "Billing", "Warehouse"]
+    return [rng.choice(SYNTHETIC_TEMPLATES).format(region=rng.choice(regions), system=rng.choice(systems),
+                                                   n=rng.choice([12, 150, 2000, 35000])) for _ in range(n)]
+
+
+async def run_benchmark(n: int = 10_000, inserts: int = 1_000, llm_latency: float = 0.05, concurrency: int = 32):
+    async def mock_llm(text: str) -> str:
+        await asyncio.sleep(llm_latency)
+        return "P1" if "breach" in text.lower() else "P2"
+
+    texts = synthetic_backlog(n + inserts)
+    backlog, incoming = texts[:n], texts[n:]
+    print(f"🗂️ Backlog Engine Benchmark ({n} items, mock LLM fallback {llm_latency * 1000:.0f} ms, concurrency {concurrency})")
+    print("-" * 72)
+
+    started = time.perf_counter()
+    raw = "\n".join(f"{i + 1}. {t}" for i, t in enumerate(backlog))
+    parsed = parse_backlog(raw)
+    parse_s = time.perf_counter() - started
+
+    engine = BacklogEngine(llm_classify=mock_llm, concurrency=concurrency)
+    started = time.perf_counter()
+    await engine.add_many(parsed)
+    load_s = time.perf_counter() - started
+    print(f"Parse:                {parse_s * 1000:9.1f} ms")
+    print(f"Classify + heapify:   {load_s * 1000:9.1f} ms   ({engine.stats['rule_decisions']} by rules, "
+          f"{engine.stats['llm_fallbacks']} LLM fallbacks)")
+    sequential_s = engine.stats["llm_fallbacks"] * llm_latency
+    print(f"  (sequential LLM fallbacks alone would take {sequential_s:.1f} s)")
+
+    rule_only = BacklogEngine()
+    started = time.perf_counter()
+    await rule_only.add_many(parsed)
+    print(f"Rules only (no LLM):  {(time.perf_counter() - started) * 1000:9.1f} ms")
+
+    started = time.perf_counter()
+    for text in incoming:
+        priority, _ = classify_rules(text)
+        rule_only.queue.push(rule_only.queue.make_item(text, priority or "P2", "rules"))
+    heap_us = (time.perf_counter() - started) / inserts * 1e6
+
+    ranked = sorted(rule_only.queue.ranked(), key=lambda i: i.seq)
+    started = time.perf_counter()
+    for _ in range(50):
+        ranked.append(ranked[0])
+        ranked.sort(key=lambda i: (PRIORITIES.index(i.priority), -i.wsjf, i.seq))
+    resort_us = (time.perf_counter() - started) / 50 * 1e6
+
+    started = time.perf_counter()
+    top = rule_only.queue.top(10)
+    top_us = (time.perf_counter() - started) * 1e6
+    print(f"Incremental insert:   {heap_us:9.1f} µs/item (heap)  vs {resort_us:9.1f} µs/item (full re-sort)")
+    print(f"Top-10 peek:          {top_us:9.1f} µs   → first: [{top[0].priority} WSJF {top[0].wsjf}] {top[0].text}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
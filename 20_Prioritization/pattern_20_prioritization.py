@@ -1,58 +1,89 @@
 """
 Pattern: Prioritization (The IT Governance Engine)
 Description: Dynamically triages multiple IT requests by analyzing business impact, 
-             operational risk, and executive urgency.
+             operational risk, and executive urgency. Ranking is deterministic
+             (rule-first P0-P3 classification + WSJF heap); the LLM classifies
+             only ambiguous items and writes the CIO brief.
 """
 import asyncio
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
+from backlog_engine import BacklogEngine, parse_backlog
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_Triage_System"
+CLASSIFY_CONCURRENCY = 8     # Parallel LLM fallbacks for items the rules cannot place
+BRIEF_TOP_N = 15             # Items the CIO brief covers; the full ranking is still shown
+
+# 2. Define the Governance Agents
+priority_classifier = Agent(
+    name="PriorityClassifier",
+    model=OLLAMA_MODEL,
+    instruction=(
+        "You classify a single IT request or incident as P0 (Critical/Outage), P1 (High Impact), "
+        "P2 (Medium) or P3 (Routine). Reply with the label only."
+    )
+)
 
-# 2. Define the Governance Agent
 triage_agent = Agent(
     name="GovernanceOrchestrator",
     model=OLLAMA_MODEL,
     instruction=(
-        "You are a Senior IT Governance Manager. Given a list of IT requests or incidents: "
-        "1. Categorize each into: P0 (Critical/Outage), P1 (High Impact), P2 (Medium), or P3 (Routine).\n"
-        "2. Sort the list by Priority (P0 first).\n"
-        "3. Provide a 'CIO Brief' for each: One sentence explaining the business risk of delaying the task.\n"
-        "4. Format the output as an Executive Dashboard table."
+        "You are a Senior IT Governance Manager. You receive an IT backlog that is ALREADY prioritized "
+        "and ranked (P0 first, then by WSJF score). Do not re-order or re-label it.\n"
+        "1. Provide a 'CIO Brief' for each item: One sentence explaining the business risk of delaying the task.\n"
+        "2. Format the output as an Executive Dashboard table with columns Rank, Priority, Item, CIO Brief."
     )
 )
 
+async def classify_with_llm(item_text: str) -> str:
+    """LLM fallback for one ambiguous item; each call gets its own session so calls run in parallel."""
+    async with session_scope(APP_NAME, user_id="cio_staff", prefix="priority_classify") as sid:
+        msg = types.Content(role='user', parts=[types.Part(text=item_text)])
+        async for label in stream_agent(get_runner(priority_classifier, APP_NAME), "cio_staff", sid, msg):
+            pass
+    return label
+
 # 3. Generator Logic for Streamlit
-async def execute_prioritization(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "priority_triage_sess"
-    
-    yield "📋 **Step 1:** Ingesting IT request backlog and incident logs..."
-    
-    await session_service.create_session(user_id="cio_staff", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=triage_agent, session_service=session_service, app_name=APP_NAME)
+async def execute_prioritization(user_query: str, stream: bool = False):
+    async with session_scope(APP_NAME, user_id="cio_staff", prefix="priority_triage") as SID:
     
-    yield "⚖️ **Step 2:** Running Risk-Impact Analysis (WSJF Framework)..."
+        yield "📋 **Step 1:** Ingesting IT request backlog and incident logs..."
+        items = parse_backlog(user_query)
     
-    response = ""
-    msg = types.Content(role='user', parts=[types.Part(text=user_query)])
+        yield f"⚖️ **Step 2:** Running Risk-Impact Analysis (WSJF Framework) on {len(items)} item(s)..."
+        engine = BacklogEngine(llm_classify=classify_with_llm, concurrency=CLASSIFY_CONCURRENCY)
+        await engine.add_many(items)
+        ranked = engine.queue.ranked()
+        yield (f"🧮 Classified {engine.stats['rule_decisions']} item(s) by rules and "
+               f"{engine.stats['llm_fallbacks']} via LLM fallback; ranked with WSJF.")
+
+        table = "\n".join(
+            f"| {rank} | {item.priority} | {item.wsjf:g} | {item.text} |" for rank, item in enumerate(ranked, 1)
+        )
+        ranking = f"| Rank | Priority | WSJF | Item |\n|---|---|---|---|\n{table}"
+
+        runner = get_runner(triage_agent, APP_NAME)
+        response = ""
+        brief_input = "\n".join(f"{rank}. [{item.priority}] {item.text}" for rank, item in enumerate(ranked[:BRIEF_TOP_N], 1))
+        msg = types.Content(role='user', parts=[types.Part(text=brief_input)])
     
-    async for event in runner.run_async(user_id="cio_staff", session_id=SID, new_message=msg):
-        if event.is_final_response():
-            response = event.content.parts[0].text
+        async for chunk in stream_agent(runner, "cio_staff", SID, msg, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                response = chunk
             
-    yield "✅ **Step 3:** Dynamic Triage complete. Queue optimized for business continuity."
-    yield f"### 📊 CIO Incident & Request Priority Matrix\n\n{response}"
+        yield "✅ **Step 3:** Dynamic Triage complete. Queue optimized for business continuity."
+        yield f"### 📊 CIO Incident & Request Priority Matrix\n\n{ranking}\n\n#### 🗒️ CIO Brief\n\n{response}"
 
 # 4. Universal Entry Point
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """Entry point for Streamlit dashboard."""
-    return execute_prioritization(user_query)
+    return execute_prioritization(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
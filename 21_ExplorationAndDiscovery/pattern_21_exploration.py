@@ -5,16 +5,12 @@ Description: Performs recursive discovery to identify institutional 'knowns'
 """
 import asyncio
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
-
-import nest_asyncio
-nest_asyncio.apply()
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_Exploration_Suite"
 
 # 2. Define the Agent
@@ -33,32 +29,32 @@ explorer_agent = Agent(
     )
 )
 
-async def execute_exploration(user_query: str):
+async def execute_exploration(user_query: str, stream: bool = False):
     """Asynchronous generator for Streamlit status updates and roadmap generation."""
-    session_service = InMemorySessionService()
-    SID = "discovery_sess_001"
+    async with session_scope(APP_NAME, user_id="cio_staff", prefix="discovery") as SID:
     
-    # --- Step 1: Initialization ---
-    yield "🔍 Scanning internal and industry trends for context..."
-    await session_service.create_session(user_id="cio_staff", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=explorer_agent, session_service=session_service, app_name=APP_NAME)
+        # --- Step 1: Initialization ---
+        yield "🔍 Scanning internal and industry trends for context..."
+        runner = get_runner(explorer_agent, APP_NAME)
     
-    # --- Step 2: Recursive Discovery ---
-    yield "🧠 Categorizing institutional knowns vs. strategic blind spots..."
+        # --- Step 2: Recursive Discovery ---
+        yield "🧠 Categorizing institutional knowns vs. strategic blind spots..."
     
-    response_text = ""
-    msg = types.Content(role='user', parts=[types.Part(text=user_query)])
+        response_text = ""
+        msg = types.Content(role='user', parts=[types.Part(text=user_query)])
     
-    async for event in runner.run_async(user_id="cio_staff", session_id=SID, new_message=msg):
-        if event.is_final_response():
-            response_text = event.content.parts[0].text
+        async for chunk in stream_agent(runner, "cio_staff", SID, msg, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                response_text = chunk
             
-    # --- Step 3: Final Yield ---
-    yield f"### 🧭 CIO Exploration & Discovery Roadmap\n{response_text}"
+        # --- Step 3: Final Yield ---
+        yield f"### 🧭 CIO Exploration & Discovery Roadmap\n{response_text}"
 
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """Entry point for the Streamlit dashboard."""
-    return execute_exploration(user_query)
+    return execute_exploration(user_query, stream)
 
 if __name__ == "__main__":
     async def main():
@@ -0,0 +1,334 @@
+"""
+Intent Router (Embedding Centroids)
+Description: Replaces the five-keyword security check of pattern 02. Each
+             specialist's description and labelled examples are embedded
+             once with the local embedder (content words only, IDF-weighted
+             over that corpus, so "the", "is" and "on" carry no weight),
+             centered on the corpus mean and averaged into a normalized
+             centroid; all centroids live in one float32 matrix, so a query
+             is classified with a single matrix-vector product. Recent query
+             embeddings are kept in a small in-process LRU, and multi-label
+             mode returns every specialist whose score is close to the best,
+             plus the best specialist of each clause.
+             split() breaks a multi-intent query into sub-requests, one per
+             specialist, so each can be dispatched on its own.
+
+Run `python intent_router.py` for the accuracy / latency benchmark.
+"""
+import os
+import re
+import statistics
+import threading
+import time
+from collections import OrderedDict, namedtuple
+import numpy as np
+from local_embedder import STOPWORDS, WORD_RE, get_embedder
+
+# 1. Configuration
+EMBEDDER_SPEC = os.getenv("ROUTER_EMBEDDER", "content:4096")   # Wider than the RAG default: fewer hash collisions on short queries
+MIN_SCORE = 0.04           # Below this cosine, the query goes to the fallback specialist
+MULTI_RATIO = 0.8          # Multi-label: also route to specialists scoring within 80% of the best
+MAX_LABELS = 3
+QUERY_CACHE_SIZE = 1024    # Hot query embeddings kept in process
+MIN_CLAUSE_WORDS = 3       # Shorter fragments are folded into the clause before them
+# Sentence ends, semicolons, and joiners that start a new subject or question
+# ("..., and the HR portal ...", "..., and what are the risks?"), but not lists inside one intent ("ROI and TCO")
+CLAUSE_RE = re.compile(r"(?<=[.!?;])\s+|,?\s+(?:and also|and|also|plus|while|as well as)\s+"
+                       r"(?=(?:the|our|we|my|i|a|an|there|it|they|some|all|also"
+                       r"|what|how|why|when|where|who|which|can|could|should|is|are|do|does)\b)", re.IGNORECASE)
+LEADING_JOINER_RE = re.compile(r"^(?:and also|and|also|plus|while|but)\b[\s,]*", re.IGNORECASE)
+QUOTED_REQUEST_RE = re.compile(r"^[^:\n]{0,40}:\s*[\"'“‘](.+)[\"'”’]\s*$", re.DOTALL)   # "Triage this: '...'"
+
+Specialist = namedtuple("Specialist", "key label instruction description examples")
+RouteDecision = namedtuple("RouteDecision", "keys scores fallback seconds cached")
+SubRequest = namedtuple("SubRequest", "key text score")
+
+# The CIO organisation. Adding a specialist is one entry here; pattern 02 builds an agent per entry
+SPECIALISTS = [
+    Specialist("security", "Cyber Security Division",
+               "You are a CISO. Provide deep technical analysis on risks, firewalls, and compliance.",
+               "Cyber security: threats, attacks, hacking, malware, phishing, ransomware, zero-day vulnerabilities, CVE patching, "
+               "penetration tests, firewalls, encryption, suspicious logins, identity, MFA, ISO 27001 and compliance audits.",
+               ["What are the risks of using outdated SSL certificates?",
+                "We detected a phishing campaign targeting finance staff.",
+                "Is our firewall configuration compliant with PCI DSS?",
+                "A critical CVE was published for our VPN appliance, how exposed are we?",
+                "Ransomware hit a partner company, should we worry about our backups?",
+                "Review our MFA and privileged access controls.",
+                "Someone tried to hack the admin portal with brute force logins."]),
+    Specialist("finance", "IT Financial Operations",
+               "You are an IT Financial Controller. Provide analysis on ROI, TCO, and budget impact.",
+               "IT finance: budget, cost, spend, savings, ROI, payback, TCO, licences and true-ups, invoices, chargeback, "
+               "vendor pricing, procurement, forecasts and business cases.",
+               ["What is the ROI of replacing our on-prem storage?",
+                "Our software licence renewal costs went up 30%, how do we negotiate?",
+                "Build a TCO comparison for leasing versus buying laptops.",
+                "How much of the IT budget is left this quarter?",
+                "The vendor invoice for support contracts looks too high.",
+                "How should we charge back IT costs to business units?",
+                "Why are our cloud bills and egress fees spiking this month?"]),
+    Specialist("cloud", "Cloud Platform Engineering",
+               "You are a Cloud Platform Lead. Advise on cloud architecture, scaling, Kubernetes and reliability.",
+               "Cloud platform: AWS, Azure, GCP, Kubernetes clusters, containers, deployments, autoscaling, quotas, "
+               "VMs, Terraform, cloud outages, crash loops and cloud migrations.",
+               ["Our Kubernetes pods keep getting OOM killed in production.",
+                "Should we migrate the data warehouse from on-prem to Azure?",
+                "The AWS load balancer is returning intermittent 502 errors.",
+                "How do we set up autoscaling for the order service?",
+                "Plan a multi-region failover for our cloud workloads.",
+                "Terraform state drift broke our staging environment.",
+                "EC2 instances in us-east-1 are running out of capacity."]),
+    Specialist("hr_systems", "HR & Business Applications",
+               "You are the Business Applications Manager for HR and payroll systems. Diagnose and fix application issues.",
+               "HR and business applications: payroll runs, salaries and payslips, employee self-service portal, Workday, SAP, benefits, "
+               "timesheets and approvals, onboarding new hires, integration and application errors.",
+               ["The HR payroll portal is throwing 404 errors.",
+                "Employees cannot submit timesheets in Workday.",
+                "New hires are missing from the onboarding system.",
+                "Payroll export to the bank failed last night.",
+                "The SAP HR module is very slow after the upgrade.",
+                "Leave requests are not reaching managers for approval.",
+                "Benefits enrolment page shows a blank screen."]),
+    Specialist("network", "Network Operations",
+               "You are a Network Operations Manager. Diagnose connectivity, WAN, Wi-Fi and DNS issues.",
+               "Networking: internet connectivity, network down, VPN tunnels, WAN links, LAN, Wi-Fi access points, DNS records, slow latency, packet loss, "
+               "bandwidth, routers, switches, firmware, branch offices and SD-WAN.",
+               ["The Wi-Fi in the London office keeps dropping.",
+                "Latency between our branches and the data centre doubled.",
+                "DNS resolution is failing for internal hostnames.",
+                "Should we move from MPLS to SD-WAN?",
+                "A core switch in building B is showing packet loss.",
+                "We need more bandwidth for the video conferencing rooms.",
+                "Private 5G network for the manufacturing plant floor."]),
+    Specialist("service_desk", "Service Desk & End-User Computing",
+               "You are the Service Desk Lead. Resolve end-user device, account and access problems quickly.",
+               "Service desk: end-user support, laptops, keyboards, monitors, password resets, sign in problems, accounts, "
+               "email, Outlook, printers, Teams audio and video, Office, hardware orders and helpdesk tickets.",
+               ["I forgot my password and I am locked out.",
+                "My laptop will not boot after the Windows update.",
+                "Outlook is not syncing my calendar.",
+                "The printer on floor 3 is jammed again.",
+                "How do I get access to the shared drive?",
+                "Teams crashes when I share my screen.",
+                "A new starter needs a laptop and email account by Monday."]),
+    Specialist("data", "Data & AI Platform",
+               "You are the Head of Data and AI. Advise on data platforms, analytics, data quality and AI adoption.",
+               "Data and AI: data platform, analytics reports, dashboards, data quality, duplicates, data warehouse loads, ETL, "
+               "CRM data, machine learning and prediction models, LLMs, AI policy and governance.",
+               ["Our sales dashboard shows different numbers than finance reports.",
+                "How do we roll out generative AI safely across the company?",
+                "The nightly ETL job into Snowflake failed.",
+                "Set up a feature store for our machine learning models.",
+                "Customer records are duplicated across the CRM and the data lake.",
+                "What governance do we need for AI models in production?",
+                "Power BI reports are taking minutes to refresh."]),
+]
+FALLBACK_KEY = "service_desk"   # Unclassifiable requests go to triage, not to a random expert
+
+# Held-out queries (not in the examples above) for the benchmark
+LABELLED_QUERIES = [
+    ("Is our VPN appliance exposed to the new zero-day?", "security"),
+    ("Run a penetration test on the customer portal before launch.", "security"),
+    ("An employee clicked a malicious link in an email.", "security"),
+    ("Do we meet ISO 27001 controls for encryption at rest?", "security"),
+    ("Suspicious logins from abroad on the admin accounts.", "security"),
+    ("What budget do we need for next year's hardware refresh?", "finance"),
+    ("Compare the cost of three ERP vendors over five years.", "finance"),
+    ("Our Microsoft licence true-up is due, what will it cost?", "finance"),
+    ("Reduce IT spend by ten percent without cutting services.", "finance"),
+    ("Calculate payback on the RPA automation program.", "finance"),
+    ("The checkout service in Kubernetes is crash looping.", "cloud"),
+    ("Move our legacy VMs to AWS with minimal downtime.", "cloud"),
+    ("GCP quota limits are blocking new deployments.", "cloud"),
+    ("Design container autoscaling for Black Friday traffic.", "cloud"),
+    ("Azure outage took down our staging cluster.", "cloud"),
+    ("Payroll ran twice for some employees this month.", "hr_systems"),
+    ("Workday integration with the benefits provider is failing.", "hr_systems"),
+    ("The employee self-service portal returns error 500.", "hr_systems"),
+    ("Onboarding tasks for new hires are not being created.", "hr_systems"),
+    ("Timesheet approvals are stuck in the HR system.", "hr_systems"),
+    ("Branch office internet is very slow since this morning.", "network"),
+    ("Packet loss on the WAN link to Singapore.", "network"),
+    ("Replace the ageing Wi-Fi access points in the warehouse.", "network"),
+    ("Internal DNS records are not propagating.", "network"),
+    ("Our routers need a firmware upgrade plan.", "network"),
+    ("My keyboard stopped working on my laptop.", "service_desk"),
+    ("I need my password reset for the email account.", "service_desk"),
+    ("Outlook keeps asking me to sign in again.", "service_desk"),
+    ("Order a new monitor for the design team.", "service_desk"),
+    ("Teams audio does not work in meetings.", "service_desk"),
+    ("Revenue dashboards are out of date since Monday.", "data"),
+    ("Build a churn prediction model from CRM data.", "data"),
+    ("The data warehouse load job is duplicating rows.", "data"),
+    ("Create an AI usage policy for large language models.", "data"),
+    ("Analytics reports disagree on active customer counts.", "data"),
+]
+# Plain sentences as users write them, with few of the vocabulary words the descriptions use
+SENTENCE_PROBES = [
+    ("The ransomware alert on the file server needs triage.", "security"),
+    ("The VPN is down.", "network"),
+    ("We think someone stole the credentials of a domain admin.", "security"),
+    ("Our auditors want evidence that laptops are encrypted.", "security"),
+    ("The board wants to know how much we spent on consultants last year.", "finance"),
+    ("Can we get a discount if we sign a three-year deal with the vendor?", "finance"),
+    ("The pods in the production cluster are restarting every few minutes.", "cloud"),
+    ("We want to move the reporting servers into Azure next quarter.", "cloud"),
+    ("The salary of a few people was wrong on this month's payslip.", "hr_systems"),
+    ("Managers cannot see the holiday requests of their team.", "hr_systems"),
+    ("The internet in the Paris office is really slow today.", "network"),
+    ("People on the third floor lose the wireless connection all the time.", "network"),
+    ("My screen stays black when I plug in the docking station.", "service_desk"),
+    ("I can't log in to my email since this morning.", "service_desk"),
+    ("The numbers in the weekly sales report look wrong.", "data"),
+    ("Is it safe to let staff paste customer data into ChatGPT?", "data"),
+]
+LABELLED_QUERIES = LABELLED_QUERIES + SENTENCE_PROBES
+
+
+# 2. Router
+class IntentRouter:
+    """Nearest-centroid intent classifier over a table of specialists."""
+
+    def __init__(self, specialists: list, fallback: str, embedder=None, cache_size: int = QUERY_CACHE_SIZE):
+        self.specialists = list(specialists)
+        self.keys = [s.key for s in self.specialists]
+        self.fallback = fallback
+        self.embedder = embedder or get_embedder(EMBEDDER_SPEC)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()   # normalized query text -> embedding
+        self._lock = threading.Lock()
+        self.stats = {"decisions": 0, "cache_hits": 0, "fallbacks": 0, "multi_label": 0}
+        self.centroids = self._build_centroids()
+
+    def _build_centroids(self) -> np.ndarray:
+        documents = [[spec.description, *spec.examples] for spec in self.specialists]
+        if hasattr(self.embedder, "fit"):   # IDF weights come from the specialist corpus itself
+            self.embedder.fit([text for texts in documents for text in texts])
+        groups = [self.embedder.embed(texts) for texts in documents]
+        self.mean = np.vstack(groups).mean(axis=0)
+        rows = []
+        for vectors in groups:
+            centroid = (vectors - self.mean).mean(axis=0)
+            rows.append(centroid / max(np.linalg.norm(centroid), 1e-12))
+        return np.vstack(rows).astype(np.float32)
+
+    def _embed(self, query: str) -> tuple:
+        key = " ".join(query.lower().split())
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                return vector, True
+        vector = self.embedder.embed([key])[0] - self.mean
+        vector = (vector / max(np.linalg.norm(vector), 1e-12)).astype(np.float32)
+        with self._lock:
+            self._cache[key] = vector
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return vector, False
+
+    def scores(self, query: str) -> np.ndarray:
+        return self.centroids @ self._embed(query)[0]
+
+    def route(self, query: str, multi: bool = False) -> RouteDecision:
+        """Best specialist (or several, in multi-label mode), with per-specialist scores."""
+        started = time.perf_counter()
+        vector, cached = self._embed(query)
+        scores = self.centroids @ vector
+        order = np.argsort(-scores)
+        best = float(scores[order[0]])
+
+        if best < MIN_SCORE:
+            keys, fallback = [self.fallback], True
+        elif multi:
+            keys = [self.keys[i] for i in order[:MAX_LABELS] if scores[i] >= max(MIN_SCORE, best * MULTI_RATIO)]
+            # One clause can dominate the whole-query vector; every clause's own best counts too
+            clauses = self._clauses(query)
+            for clause in clauses if len(clauses) > 1 else []:
+                clause_scores = self.centroids @ self._embed(clause)[0]
+                top = int(np.argmax(clause_scores))
+                if clause_scores[top] >= MIN_SCORE and self.keys[top] not in keys:
+                    keys.append(self.keys[top])
+            keys, fallback = keys[:MAX_LABELS], False
+        else:
+            keys, fallback = [self.keys[order[0]]], False
+
+        self.stats["decisions"] += 1
+        self.stats["cache_hits"] += cached
+        self.stats["fallbacks"] += fallback
+        self.stats["multi_label"] += len(keys) > 1
+        return RouteDecision(keys, dict(zip(self.keys, scores.round(3).tolist())), fallback,
+                             time.perf_counter() - started, cached)
+
+    @staticmethod
+    def _clauses(query: str) -> list:
+        """The query cut at sentence ends and subject-changing joiners; short fragments join the clause before."""
+        quoted = QUOTED_REQUEST_RE.match(query.strip())
+        clauses = []
+        for clause in (LEADING_JOINER_RE.sub("", c.strip(" ,;")) for c in CLAUSE_RE.split(quoted.group(1) if quoted else query)):
+            if not clause:
+                continue
+            clause = clause[0].upper() + clause[1:]
+            if clauses and len(clause.split()) < MIN_CLAUSE_WORDS:
+                clauses[-1] = f"{clauses[-1]} {clause}"
+            else:
+                clauses.append(clause)
+        return clauses
+
+    def split(self, query: str) -> list:
+        """
+        One SubRequest per intent, in query order. Clauses routed to the same
+        specialist are merged, so a single-intent query comes back as one item.
+        """
+        clauses = self._clauses(query)
+        merged = {}   # key -> [texts, best score]; dicts keep first-seen order
+        for clause in clauses:
+            decision = self.route(clause)
+            key = decision.keys[0]
+            entry = merged.setdefault(key, [[], 0.0])
+            entry[0].append(clause)
+            entry[1] = max(entry[1], decision.scores[key])
+        if len(merged) <= 1:
+            decision = self.route(query)
+            return [SubRequest(decision.keys[0], query, decision.scores[decision.keys[0]])]
+        return [SubRequest(key, " ".join(t if t.endswith((".", "?", "!")) else f"{t}." for t in texts), score)
+                for key, (texts, score) in merged.items()]
+
+
+# 3. Benchmark
+def benchmark(router: IntentRouter, labelled: list, repeats: int = 5) -> dict:
+    """Top-1 accuracy and per-decision latency (cold = first sight of a query, warm = cache hit)."""
+    correct, cold, warm = 0, [], []
+    for query, expected in labelled:
+        decision = router.route(query)
+        cold.append(decision.seconds)
+        correct += decision.keys[0] == expected
+        for _ in range(repeats):
+            warm.append(router.route(query).seconds)
+    ms = lambda xs, q: statistics.quantiles(xs, n=100)[q - 1] * 1000
+    return {"accuracy": correct / len(labelled), "cold_p50_ms": ms(cold, 50), "cold_p99_ms": ms(cold, 99),
+            "warm_p50_ms": ms(warm, 50), "warm_p99_ms": ms(warm, 99)}
+
+
+if __name__ == "__main__":
+    def keyword_route(query: str) -> str:
+        """Keyword-table baseline: the specialist whose description shares the most content words with the query."""
+        words = set(WORD_RE.findall(query.lower())) - STOPWORDS
+        hits = {s.key: len(words & set(WORD_RE.findall(s.description.lower()))) for s in SPECIALISTS}
+        best = max(hits, key=hits.get)
+        return best if hits[best] else FALLBACK_KEY
+
+    router = IntentRouter(SPECIALISTS, FALLBACK_KEY)
+    curated = LABELLED_QUERIES[:-len(SENTENCE_PROBES)]
+    result = benchmark(router, LABELLED_QUERIES)
+    print(f"🎯 Routing benchmark: {len(LABELLED_QUERIES)} labelled queries ({len(SENTENCE_PROBES)} plain-sentence probes), "
+          f"{len(SPECIALISTS)} specialists\n")
+    print(f"  {'accuracy':<26}{'all':>6}{'curated':>9}{'sentences':>11}")
+    for label, route in (("keyword table baseline", keyword_route), ("centroid router", lambda q: router.route(q).keys[0])):
+        rates = [sum(route(q) == key for q, key in subset) / len(subset) for subset in (LABELLED_QUERIES, curated, SENTENCE_PROBES)]
+        print(f"  {label:<26}" + "".join(f"{rate:>{width}.0%}" for rate, width in zip(rates, (6, 9, 11))))
+    print(f"  decision latency cold p50/p99: {result['cold_p50_ms']:.3f} / {result['cold_p99_ms']:.3f} ms")
+    print(f"  decision latency warm p50/p99: {result['warm_p50_ms']:.3f} / {result['warm_p99_ms']:.3f} ms")
+    sample = "Our cloud egress fees are spiking in AWS, and the HR payroll portal is throwing 404 errors."
+    print(f"\n  multi-label '{sample[:40]}...': {router.route(sample, multi=True).keys}")
+    print(f"  split: {[(r.key, r.text) for r in router.split(sample)]}")
@@ -2,72 +2,124 @@
 Pattern: Routing (The Intent Orchestrator)
 Description: Classifies user intent and routes the query to 
              the most qualified specialized agent.
+             Intent is scored against precomputed specialist centroids
+             (see intent_router.py). ROUTING_MODE=split (default) breaks a
+             multi-intent query into sub-requests and dispatches each to its
+             specialist in parallel (shared fan-out engine, see fan_out.py:
+             per-branch timeout, a failed branch is reported, not fatal),
+             streaming answers as they complete;
+             multi sends the whole query to every specialist scoring close to
+             the best; single always picks one specialist.
 """
 import asyncio
+import os
+import time
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, single_turn, stream_agent, TextDelta
+from fan_out import Branch, fan_out
+from intent_router import SPECIALISTS, FALLBACK_KEY, IntentRouter
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_Router_App"
+ROUTING_MODE = os.getenv("ROUTING_MODE", "split").lower()   # split | multi | single
+BRANCH_TIMEOUT_SECONDS = float(os.getenv("ROUTING_BRANCH_TIMEOUT", "120"))   # Per specialist; a slow one is reported, not awaited
 
 # 2. Define Specialized Expert Agents
 # Note: Use underscores in names to pass Pydantic validation
-security_expert = Agent(
-    name="Security_Specialist",
-    model=OLLAMA_MODEL,
-    instruction="You are a CISO. Provide deep technical analysis on risks, firewalls, and compliance."
-)
-
-finance_expert = Agent(
-    name="Finance_Specialist",
-    model=OLLAMA_MODEL,
-    instruction="You are an IT Financial Controller. Provide analysis on ROI, TCO, and budget impact."
-)
+EXPERTS = {
+    spec.key: Agent(name=f"{spec.key.title()}_Specialist", model=OLLAMA_MODEL, instruction=spec.instruction)
+    for spec in SPECIALISTS
+}
+LABELS = {spec.key: spec.label for spec in SPECIALISTS}
+router = IntentRouter(SPECIALISTS, FALLBACK_KEY)   # Centroids are built once, at import
 
 # 3. Routing Execution Logic
-async def execute_routing(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "routing_session_01"
-    
+def dispatch(requests: list):
+    """
+    Runs (key, text) sub-requests concurrently, each specialist in its own session,
+    and yields a BranchResult per request as it completes (status ok | timeout | error).
+    """
+    branches = [Branch(key, LABELS[key], lambda key=key, text=text: single_turn(
+                    EXPERTS[key], APP_NAME, "cio_admin", f"routing_{key}", text))
+                for key, text in requests]
+    return fan_out(branches, concurrency=len(branches), timeout=BRANCH_TIMEOUT_SECONDS)
+
+
+def branch_heading(result) -> str:
+    if result.status == "ok":
+        return f"#### ✔️ {result.title} ({result.seconds:.1f}s)"
+    return f"#### ⚠️ {result.title} ({result.status} after {result.seconds:.1f}s)"
+
+
+async def execute_routing(user_query: str, stream: bool = False):
     yield "🎯 **Step 1:** Analyzing query intent for specialized routing..."
-    
-    # Simple keyword-based router logic
-    query_text = user_query.lower()
-    if any(word in query_text for word in ["security", "risk", "hack", "cyber", "vulnerability"]):
-        selected_agent = security_expert
-        route_label = "Cyber Security Division"
-    else:
-        # Default to Finance for ROI/Budget related queries
-        selected_agent = finance_expert
-        route_label = "IT Financial Operations"
 
-    yield f"🧠 **Step 2:** Routing request to the **{route_label}**..."
+    if ROUTING_MODE == "split":
+        requests = [(sub.key, sub.text) for sub in router.split(user_query)]
+        if len(requests) > 1:
+            plan = "\n".join(f"- **{LABELS[key]}:** {text}" for key, text in requests)
+            yield f"🧩 **Step 2:** Split into {len(requests)} sub-requests, dispatching in parallel:\n{plan}"
+
+            started, answers = time.perf_counter(), {}
+            async for result in dispatch(requests):
+                answers[result.name] = result
+                yield f"{branch_heading(result)}\n{result.text}"
+            wall = time.perf_counter() - started
 
-    await session_service.create_session(user_id="cio_admin", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=selected_agent, session_service=session_service, app_name=APP_NAME)
+            slowest = max(r.seconds for r in answers.values())
+            total = sum(r.seconds for r in answers.values())
+            failed = [r.title for r in answers.values() if r.status != "ok"]
+            yield "✅ **Step 3:** Specialist analyses complete. Synthesizing final report."
+            sections = "\n\n".join(f"#### {LABELS[key]}\n> {text}\n\n{answers[key].text}" for key, text in requests)
+            missing = f"\n\n_Not answered (timed out or failed): {', '.join(failed)}_" if failed else ""
+            yield (f"### 🗺️ Routed Specialist Responses ({len(requests)} intents)\n\n{sections}{missing}\n\n---\n"
+                   f"**Wall clock:** {wall:.1f}s (slowest branch {slowest:.1f}s; sequential would be ~{total:.1f}s)")
+            return
+
+    decision = router.route(user_query, multi=ROUTING_MODE == "multi")
+    ranked = sorted(decision.scores.items(), key=lambda kv: kv[1], reverse=True)[:3]
+    scores = ", ".join(f"{LABELS[k]} {s:.2f}" for k, s in ranked)
+    route_label = " + ".join(LABELS[k] for k in decision.keys)
+    note = " (low confidence, sent to triage)" if decision.fallback else ""
+    yield f"🧠 **Step 2:** Routing request to the **{route_label}**{note}... `[{scores}; {decision.seconds * 1000:.2f} ms]`"
+
+    if len(decision.keys) == 1:
+        async with session_scope(APP_NAME, user_id="cio_admin", prefix="routing") as SID:
+            runner = get_runner(EXPERTS[decision.keys[0]], APP_NAME)
     
-    response_text = ""
-    msg = types.Content(role='user', parts=[types.Part(text=user_query)])
+            response_text = ""
+            msg = types.Content(role='user', parts=[types.Part(text=user_query)])
     
-    # Run the selected specialist agent
-    async for event in runner.run_async(user_id="cio_admin", session_id=SID, new_message=msg):
-        if event.is_final_response():
-            response_text = event.content.parts[0].text
+            # Run the selected specialist agent
+            async for chunk in stream_agent(runner, "cio_admin", SID, msg, stream):
+                if isinstance(chunk, TextDelta):
+                    yield chunk
+                else:
+                    response_text = chunk
             
-    yield "✅ **Step 3:** Specialist analysis complete. Synthesizing final report."
-    yield f"### 🗺️ Routed Specialist Response ({route_label})\n\n{response_text}"
+        yield "✅ **Step 3:** Specialist analysis complete. Synthesizing final report."
+        yield f"### 🗺️ Routed Specialist Response ({route_label})\n\n{response_text}"
+        return
+
+    # Multi-label: every selected specialist answers the full query in parallel
+    answers = {}
+    async for result in dispatch([(key, user_query) for key in decision.keys]):
+        answers[result.name] = result.text
+        yield f"{branch_heading(result)}\n{result.text}"
+    yield "✅ **Step 3:** Specialist analyses complete. Synthesizing final report."
+    sections = "\n\n".join(f"#### {LABELS[key]}\n{answers[key]}" for key in decision.keys)
+    yield f"### 🗺️ Routed Specialist Responses ({route_label})\n\n{sections}"
 
 # --- REQUIRED ENTRY POINT FOR MASTER VALIDATOR ---
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """
     The master entry point used by the Master Validator and Streamlit UI.
     This function MUST be named 'run_pattern' and be async.
     """
-    return execute_routing(user_query)
+    return execute_routing(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
@@ -2,81 +2,111 @@
 Pattern: Parallelization (Multi-Agent Consensus)
 Description: Executes multiple agentic queries simultaneously to compare 
              different perspectives (e.g., Risk vs. Growth) in real-time.
+             Any number of perspectives fan out under a concurrency limit
+             and per-branch timeouts, stream in as they complete, and are
+             merged by an LLM synthesizer (rule-based fallback).
 """
 import asyncio
+import os
+import time
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
-from google.genai import types
+from model_client import OLLAMA_NUM_PARALLEL, get_model
+from agent_runtime import single_turn
+from fan_out import Branch, fan_out, rule_reduce
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_Parallel_App"
 
 # 2. Define specialized agents for parallel analysis
-# Names use underscores to pass Pydantic validation
-risk_agent = Agent(
-    name="Risk_Assessor",
-    model=OLLAMA_MODEL,
-    instruction="Analyze the query strictly from a security, compliance, and risk perspective."
-)
+# Names use underscores to pass Pydantic validation. Add a row to fan out to another perspective.
+PERSPECTIVES = [
+    ("Risk_Assessor", "🛡️ Risk & Compliance", "Analyze the query strictly from a security, compliance, and risk perspective."),
+    ("Growth_Strategist", "📈 Growth & ROI", "Analyze the query strictly from a business growth, ROI, and efficiency perspective."),
+    ("Operations_Lead", "⚙️ Operations & Reliability",
+     "Analyze the query strictly from an operations perspective: reliability, support load, skills and run costs."),
+    ("Finance_Controller", "💰 Finance & TCO",
+     "Analyze the query strictly from a financial perspective: total cost of ownership, cash flow and payback."),
+]
+perspective_agents = [
+    (Agent(name=name, model=OLLAMA_MODEL, instruction=instruction), title) for name, title, instruction in PERSPECTIVES
+]
 
-growth_agent = Agent(
-    name="Growth_Strategist",
+consensus_agent = Agent(
+    name="Consensus_Synthesizer",
     model=OLLAMA_MODEL,
-    instruction="Analyze the query strictly from a business growth, ROI, and efficiency perspective."
+    instruction=(
+        "You merge several expert perspectives into one executive recommendation. "
+        "State the recommendation first (proceed / proceed in phases / defer), then the points where the "
+        "perspectives agree, the tensions between them and how to resolve each, and the conditions for success. "
+        "Use only what the perspectives say."
+    ),
 )
 
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", str(OLLAMA_NUM_PARALLEL)))   # Extra branches only queue in Ollama
+BRANCH_TIMEOUT_SECONDS = float(os.getenv("FANOUT_BRANCH_TIMEOUT", "120"))
+REDUCER = os.getenv("FANOUT_REDUCER", "llm").lower()   # llm | rules
+
 # 3. Parallel Execution Logic
-async def execute_parallel(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "parallel_session_03"
-    
-    yield "⚡ **Step 1:** Initializing parallel workstreams for Risk and Growth analysis..."
-    
-    await session_service.create_session(user_id="cio_lead", session_id=SID, app_name=APP_NAME)
-    
-    # Helper function to run a single agent and return its final string
-    async def run_single_agent(agent, query):
-        runner = Runner(agent=agent, session_service=session_service, app_name=APP_NAME)
-        msg = types.Content(role='user', parts=[types.Part(text=query)])
-        final_text = ""
-        async for event in runner.run_async(user_id="cio_lead", session_id=SID, new_message=msg):
-            if event.is_final_response():
-                final_text = event.content.parts[0].text
-        return final_text
+async def reduce_perspectives(user_query: str, results: list) -> tuple:
+    """LLM synthesis of the finished perspectives; falls back to the rule-based merge. Returns (text, reducer_used)."""
+    answered = [r for r in results if r.status == "ok"]
+    if REDUCER == "llm" and len(answered) > 1:
+        briefing = "\n\n".join(f"## {r.title}\n{r.text}" for r in answered)
+        try:
+            merged = await asyncio.wait_for(
+                single_turn(consensus_agent, APP_NAME, "cio_lead", "consensus",
+                            f"Question: {user_query}\n\nPerspectives:\n{briefing}"),
+                BRANCH_TIMEOUT_SECONDS,
+            )
+            if merged.strip():
+                return f"**Strategic Consensus:**\n{merged}", "LLM synthesizer"
+        except Exception:
+            pass   # A failed or slow synthesis must not lose the perspectives already gathered
+    return rule_reduce(user_query, results), "rule-based merge"
+
+
+async def execute_parallel(user_query: str, stream: bool = False):
+    # All perspectives generate at once, so deltas would interleave; `stream` only
+    # keeps the run_pattern contract uniform and each perspective arrives whole.
+    yield (f"⚡ **Step 1:** Initializing {len(perspective_agents)} parallel workstreams "
+           f"(up to {FANOUT_CONCURRENCY} at once, {BRANCH_TIMEOUT_SECONDS:.0f}s per branch)...")
+
+    branches = [
+        Branch(agent.name, title, lambda agent=agent: single_turn(agent, APP_NAME, "cio_lead", f"parallel_{agent.name.lower()}", user_query))
+        for agent, title in perspective_agents
+    ]
+    started = time.perf_counter()
+    results, sections = [], []
+
+    yield "🚦 **Step 2:** Launching concurrent agentic evaluations (results stream in as each one completes)..."
 
-    yield "🚦 **Step 2:** Launching concurrent agentic evaluations (Asynchronous Gathering)..."
+    # CORE PARALLEL LOGIC: bounded fan-out, each perspective rendered the moment it finishes
+    async for result in fan_out(branches, FANOUT_CONCURRENCY, BRANCH_TIMEOUT_SECONDS):
+        results.append(result)
+        marker = "" if result.status == "ok" else f" ({result.status})"
+        sections.append(f"### {result.title} Perspective{marker}\n{result.text}\n\n_{result.seconds:.1f}s_")
+        yield f"✅ **{result.title}** finished in {result.seconds:.1f}s ({len(results)}/{len(branches)})"
+        yield "\n\n".join(sections)
 
-    # CORE PARALLEL LOGIC
-    # asyncio.gather fires both tasks at once
-    risk_task = run_single_agent(risk_agent, user_query)
-    growth_task = run_single_agent(growth_agent, user_query)
-    
-    # Wait for both to finish
-    results = await asyncio.gather(risk_task, growth_task)
-    risk_output, growth_output = results
+    fan_out_seconds = time.perf_counter() - started
+    yield "🧩 **Step 3:** Merging divergent perspectives into a unified Executive Consensus."
+    consensus, reducer_used = await reduce_perspectives(user_query, results)
 
-    yield "✅ **Step 3:** Merging divergent perspectives into a unified Executive Consensus."
-    
     # Final Structured Output for the Dashboard
-    summary = (
-        f"### 🛡️ Risk & Compliance Perspective\n{risk_output}\n\n"
-        f"### 📈 Growth & ROI Perspective\n{growth_output}\n\n"
-        f"---\n"
-        f"**Strategic Consensus:** By balancing these parallel insights, we recommend "
-        f"proceeding with caution under the specified risk mitigations."
+    yield (
+        "\n\n".join(sections) + "\n\n---\n" + consensus
+        + f"\n\n_Fan-out: {len(branches)} branches in {fan_out_seconds:.1f}s "
+        f"(sum of branches {sum(r.seconds for r in results):.1f}s); merged by {reducer_used}._"
     )
-    yield summary
 
 # --- REQUIRED ENTRY POINT FOR MASTER VALIDATOR ---
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """
     The master entry point used by the Master Validator and Streamlit UI.
     This function MUST be named 'run_pattern' and be async.
     """
-    return execute_parallel(user_query)
+    return execute_parallel(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
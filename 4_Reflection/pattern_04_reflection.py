@@ -5,13 +5,12 @@ Description: The agent generates an initial strategy, critiques it for
 """
 import asyncio
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_Reflection_App"
 
 # 2. Define the Agent
@@ -28,40 +27,40 @@ reflection_agent = Agent(
 )
 
 # 3. Execution Logic
-async def execute_reflection(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "reflection_session_04"
+async def execute_reflection(user_query: str, stream: bool = False):
+    async with session_scope(APP_NAME, user_id="cio_lead", prefix="reflection") as SID:
     
-    yield "✍️ **Step 1:** Drafting the initial strategic recommendation..."
+        yield "✍️ **Step 1:** Drafting the initial strategic recommendation..."
     
-    await session_service.create_session(user_id="cio_lead", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=reflection_agent, session_service=session_service, app_name=APP_NAME)
+        runner = get_runner(reflection_agent, APP_NAME)
     
-    # We explicitly prompt for the reflection cycle to ensure the model executes it
-    reflection_prompt = (
-        f"Perform a reflection cycle on the following request: {user_query}. "
-        "Show your draft, your self-critique, and your final refined recommendation."
-    )
+        # We explicitly prompt for the reflection cycle to ensure the model executes it
+        reflection_prompt = (
+            f"Perform a reflection cycle on the following request: {user_query}. "
+            "Show your draft, your self-critique, and your final refined recommendation."
+        )
     
-    yield "🧐 **Step 2:** Agent is performing self-critique to identify hidden risks..."
+        yield "🧐 **Step 2:** Agent is performing self-critique to identify hidden risks..."
     
-    response_text = ""
-    msg = types.Content(role='user', parts=[types.Part(text=reflection_prompt)])
+        response_text = ""
+        msg = types.Content(role='user', parts=[types.Part(text=reflection_prompt)])
     
-    async for event in runner.run_async(user_id="cio_lead", session_id=SID, new_message=msg):
-        if event.is_final_response():
-            response_text = event.content.parts[0].text
+        async for chunk in stream_agent(runner, "cio_lead", SID, msg, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                response_text = chunk
             
-    yield "✅ **Step 3:** Reflection complete. Presenting the refined strategy."
-    yield f"### 🪞 Strategic Reflection & Refinement\n\n{response_text}"
+        yield "✅ **Step 3:** Reflection complete. Presenting the refined strategy."
+        yield f"### 🪞 Strategic Reflection & Refinement\n\n{response_text}"
 
 # --- REQUIRED ENTRY POINT FOR VALIDATOR & DASHBOARD ---
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """
     The master entry point used by the Master Validator and Streamlit UI.
     This function MUST be named 'run_pattern' and be async.
     """
-    return execute_reflection(user_query)
+    return execute_reflection(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
@@ -2,19 +2,29 @@
 Pattern: Tool Use (The Executive Assistant)
 Description: Demonstrates an agent's ability to selectively call 
              external functions to retrieve live IT infrastructure data.
+             Tools run through tool_runtime.py: TTL-cached on normalized
+             arguments, identical in-flight calls coalesced, and sync
+             backends kept off the event loop. ADK runs several calls from
+             one model turn (e.g. three regions) concurrently; each is
+             bounded by a timeout so one hung backend cannot stall the turn
+             (tool_timeout.py).
 """
 import asyncio
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
+from tool_runtime import cached_tool, metrics_report
+from tool_timeout import timed_tool, timeout_summary
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_Tool_App"
 
 # 2. THE TOOLS (Must be standard functions with docstrings for the validator)
+# Spend is a month-to-date figure, so minutes of staleness are fine; latency is "real-time" and kept short
+@timed_tool()
+@cached_tool(ttl_seconds=300)
 def get_cloud_spend_report(department: str) -> str:
     """Retrieves the current month's cloud expenditure for a specific department."""
     # Mock data for demonstration
@@ -26,6 +36,8 @@ def get_cloud_spend_report(department: str) -> str:
     result = spend_data.get(department.lower(), "Department not found in financial database.")
     return f"FINANCIAL_REPORT: {department.upper()} spend is {result}."
 
+@timed_tool()
+@cached_tool(ttl_seconds=15)
 def check_system_latency(region: str) -> str:
     """Checks real-time network latency for global data center regions."""
     # Mock latency data
@@ -42,39 +54,42 @@ it_assistant = Agent(
     instruction=(
         "You are an IT Operations Assistant. Use the provided tools to answer "
         "questions about cloud spending or network latency. Do not guess; "
-        "if the tool doesn't provide data, say you don't know."
+        "if the tool doesn't provide data, say you don't know. When a question covers "
+        "several departments or regions, request all of the tool calls in the same turn."
     )
 )
 
 # 4. Tool-Use Execution Logic
-async def execute_tool_use(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "tool_session_05"
+async def execute_tool_use(user_query: str, stream: bool = False):
+    async with session_scope(APP_NAME, user_id="cio_lead", prefix="tool") as SID:
     
-    yield "🔧 **Step 1:** Parsing request to identify required system tools..."
+        yield "🔧 **Step 1:** Parsing request to identify required system tools..."
     
-    await session_service.create_session(user_id="cio_lead", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=it_assistant, session_service=session_service, app_name=APP_NAME)
+        runner = get_runner(it_assistant, APP_NAME)
     
-    yield "📡 **Step 2:** Executing external function calls and retrieving live data..."
+        yield "📡 **Step 2:** Executing external function calls and retrieving live data..."
     
-    response_text = ""
-    msg = types.Content(role='user', parts=[types.Part(text=user_query)])
+        response_text = ""
+        msg = types.Content(role='user', parts=[types.Part(text=user_query)])
     
-    async for event in runner.run_async(user_id="cio_lead", session_id=SID, new_message=msg):
-        if event.is_final_response():
-            response_text = event.content.parts[0].text
+        async for chunk in stream_agent(runner, "cio_lead", SID, msg, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                response_text = chunk
             
-    yield "✅ **Step 3:** Data retrieval complete. Synthesizing IT status report."
-    yield f"### 🛠️ Live IT Operations Report\n\n{response_text}"
+        yield "✅ **Step 3:** Data retrieval complete. Synthesizing IT status report."
+        yield (f"### 🛠️ Live IT Operations Report\n\n{response_text}\n\n---\n#### 📊 Tool Cache\n"
+               f"{metrics_report([get_cloud_spend_report, check_system_latency])}\n\n"
+               f"{timeout_summary([get_cloud_spend_report, check_system_latency])}")
 
 # --- REQUIRED ENTRY POINT FOR VALIDATOR & DASHBOARD ---
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """
     The master entry point used by the Master Validator and Streamlit UI.
     This function MUST be named 'run_pattern' and be async.
     """
-    return execute_tool_use(user_query)
+    return execute_tool_use(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
@@ -5,13 +5,12 @@ Description: Deconstructs a high-level CIO goal into a phased
 """
 import asyncio
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_Roadmap_App"
 
 # 2. Define the Agent
@@ -29,38 +28,38 @@ planner_agent = Agent(
 )
 
 # 3. Planning Execution Logic
-async def execute_planning(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "planning_session_06"
+async def execute_planning(user_query: str, stream: bool = False):
+    async with session_scope(APP_NAME, user_id="cio_admin", prefix="planning") as SID:
     
-    yield "🗺️ **Step 1:** Initializing Roadmap Architect and deconstructing goal..."
+        yield "🗺️ **Step 1:** Initializing Roadmap Architect and deconstructing goal..."
     
-    # Establish session state
-    await session_service.create_session(user_id="cio_admin", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=planner_agent, session_service=session_service, app_name=APP_NAME)
+        # Establish session state
+        runner = get_runner(planner_agent, APP_NAME)
     
-    yield "🧠 **Step 2:** Generating phased milestones and resource dependencies..."
+        yield "🧠 **Step 2:** Generating phased milestones and resource dependencies..."
     
-    response_text = ""
-    msg = types.Content(role='user', parts=[types.Part(text=user_query)])
+        response_text = ""
+        msg = types.Content(role='user', parts=[types.Part(text=user_query)])
     
-    # Run the agentic workflow
-    async for event in runner.run_async(user_id="cio_admin", session_id=SID, new_message=msg):
-        if event.is_final_response():
-            response_text = event.content.parts[0].text
+        # Run the agentic workflow
+        async for chunk in stream_agent(runner, "cio_admin", SID, msg, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                response_text = chunk
             
-    yield "✅ **Step 3:** Roadmap synthesis complete. Formatting for Executive review."
+        yield "✅ **Step 3:** Roadmap synthesis complete. Formatting for Executive review."
     
-    # Final Structured Output
-    yield f"### 🚀 Multi-Phase IT Strategic Roadmap\n\n{response_text}"
+        # Final Structured Output
+        yield f"### 🚀 Multi-Phase IT Strategic Roadmap\n\n{response_text}"
 
 # --- REQUIRED ENTRY POINT FOR VALIDATOR & DASHBOARD ---
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """
     The master entry point used by the Master Validator and Streamlit UI.
     This function MUST be named 'run_pattern' and be async.
     """
-    return execute_planning(user_query)
+    return execute_planning(user_query, stream)
 
 # Local test block
 if __name__ == "__main__":
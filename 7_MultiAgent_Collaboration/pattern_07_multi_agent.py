@@ -2,16 +2,21 @@
 Pattern: Multi-Agent Collaboration
 Description: Demonstrates two specialized agents (Architect and Security) 
              collaborating on a single CIO request to ensure a balanced response.
+             In pipeline mode (default) Security reviews each section while the
+             Architect is still writing the rest (see review_pipeline.py);
+             COLLAB_MODE=sequential keeps the original draft-then-review flow.
 """
 import asyncio
+import os
+import time
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import OLLAMA_NUM_PARALLEL, get_model
+from agent_runtime import session_scope, get_runner, single_turn, stream_agent, TextDelta
+from review_pipeline import merge_reviews, run_pipeline
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_MultiAgent_App"
 
 # 2. Define specialized agents
@@ -28,51 +33,154 @@ security_agent = Agent(
     instruction="You are a Chief Information Security Officer. Focus on vulnerabilities, encryption, and compliance."
 )
 
+COLLAB_MODE = os.getenv("COLLAB_MODE", "pipeline").lower()            # pipeline | sequential
+DEBATE_ROUNDS = int(os.getenv("COLLAB_DEBATE_ROUNDS", "1"))             # 1 = review only; more adds revise/re-check rounds
+REVIEW_CONCURRENCY = max(1, OLLAMA_NUM_PARALLEL - 1)                    # One slot stays with the streaming architect
+_latency_log = {"sequential": [], "pipeline": []}
+
+
+def latency_report() -> str:
+    runs = {mode: sum(v) / len(v) for mode, v in _latency_log.items() if v}
+    line = ", ".join(f"{mode} {avg:.1f}s avg over {len(_latency_log[mode])} run(s)" for mode, avg in runs.items())
+    if len(runs) == 2:
+        line += f" ({1 - runs['pipeline'] / runs['sequential']:.0%} faster pipelined)"
+    return line
+
+
 # 3. Execution Logic (Collaboration)
-async def execute_multiagent(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "multiagent_session_07"
-    
-    yield "🤝 **Step 1:** Initializing collaborative session between Architect and Security..."
-    
-    await session_service.create_session(user_id="cio_lead", session_id=SID, app_name=APP_NAME)
-    
-    # Helper to run an agent
-    async def get_agent_response(agent, prompt):
-        runner = Runner(agent=agent, session_service=session_service, app_name=APP_NAME)
-        msg = types.Content(role='user', parts=[types.Part(text=prompt)])
-        final_text = ""
-        async for event in runner.run_async(user_id="cio_lead", session_id=SID, new_message=msg):
-            if event.is_final_response():
-                final_text = event.content.parts[0].text
-        return final_text
-
-    # Phase 1: Architect Drafts
+# Each review/revise/re-check is a buffered turn in a private session: concurrent sections never share history
+async def review_section(title: str, section: str) -> str:
+    return await single_turn(security_agent, APP_NAME, "cio_lead", "multiagent_review", (
+        f"Review this section ('{title}') of an architecture blueprint. List up to 2 concrete risks, each with a "
+        f"mitigation. If the section has no material risk, reply exactly 'NO MATERIAL RISKS'.\n\n{section}"
+    ))
+
+
+async def revise_section(title: str, section: str, review: str) -> str:
+    return await single_turn(architect_agent, APP_NAME, "cio_lead", "multiagent_revise", (
+        f"Revise the '{title}' section of your blueprint to address this security review. "
+        f"Reply with the revised section only.\n\nSection:\n{section}\n\nReview:\n{review}"
+    ))
+
+
+async def recheck_section(title: str, section: str, review: str) -> str:
+    return await single_turn(security_agent, APP_NAME, "cio_lead", "multiagent_recheck", (
+        f"You previously raised these risks on the '{title}' section:\n{review}\n\nHere is the revision:\n{section}\n\n"
+        f"If every risk is addressed reply exactly 'RESOLVED'; otherwise list only the risks that remain."
+    ))
+
+
+async def execute_pipeline(user_query: str, stream: bool = False):
+    started = time.perf_counter()
+    yield (f"🤝 **Step 1:** Pipelined collaboration: sections go to Security as the Architect writes them "
+           f"({REVIEW_CONCURRENCY} concurrent reviews, up to {DEBATE_ROUNDS} debate round(s))...")
+
+    async def architect_stream():
+        async with session_scope(APP_NAME, user_id="cio_lead", prefix="multiagent_architect") as SID:
+            msg = types.Content(role='user', parts=[types.Part(text=(
+                f"Draft a technical architecture for: {user_query}\n"
+                "Structure it as sections, each starting with a '## ' markdown heading."
+            ))])
+            # Always streamed internally: sections are cut from the deltas
+            seen_delta = False
+            async for chunk in stream_agent(get_runner(architect_agent, APP_NAME), "cio_lead", SID, msg, True):
+                if isinstance(chunk, TextDelta):
+                    seen_delta = True
+                    yield chunk
+                elif not seen_delta and chunk:
+                    # A response-cache hit (or a provider without partials) only delivers the final text
+                    yield TextDelta(chunk)
+
     yield "🏗️ **Step 2:** System Architect is drafting the technical blueprint..."
-    architect_draft = await get_agent_response(architect_agent, f"Draft a technical architecture for: {user_query}")
+    architect_draft, reviews = "", []
+    async for event in run_pipeline(architect_stream(), review_section, revise_section, recheck_section,
+                                    rounds=DEBATE_ROUNDS, concurrency=REVIEW_CONCURRENCY):
+        if event[0] == "delta":
+            architect_draft += event[1]
+            if stream:
+                yield TextDelta(event[1])
+        elif event[0] == "reviewed":
+            reviews.append(event[1])
+        # A status line would reset the live draft view, so per-section progress only shows when buffered
+        if stream or event[0] == "delta":
+            continue
+        if event[0] == "section":
+            yield f"🛡️ **Step 3:** Section {event[1] + 1} ('{event[2]}') handed to the Security Officer..."
+        else:
+            yield f"✅ Section {event[1].index + 1} reviewed in {event[1].seconds:.1f}s ({event[1].rounds} round(s))"
 
-    # Phase 2: Security Reviews
-    yield "🛡️ **Step 3:** Security Officer is reviewing the blueprint for vulnerabilities..."
-    security_review = await get_agent_response(security_agent, f"Review this architecture and find 3 risks: {architect_draft}")
+    elapsed = time.perf_counter() - started
+    _latency_log["pipeline"].append(elapsed)
+    revised = [r for r in sorted(reviews, key=lambda r: r.index) if r.rounds > 1]
+    revisions = "".join(f"\n\n#### Revised: {r.title}\n{r.text}" for r in revised)
+    signed_off = sum(r.converged for r in reviews)
 
     yield "✅ **Step 4:** Collaboration complete. Merging insights."
-    
-    final_report = (
+    yield (
         f"## 🏛️ Collaborative IT Report\n\n"
-        f"### 📐 Architect's Blueprint\n{architect_draft}\n\n"
-        f"### 🔐 Security Review\n{security_review}\n\n"
+        f"### 📐 Architect's Blueprint\n{architect_draft}{revisions}\n\n"
+        f"### 🔐 Security Review (by section)\n{merge_reviews(reviews)}\n\n"
         f"---\n"
-        f"**CIO Summary:** The architecture is sound but requires the 3 security mitigations listed above."
+        f"**CIO Summary:** {len(reviews)} sections reviewed while the blueprint was being written; "
+        f"{signed_off} signed off by Security.\n\n"
+        f"_End-to-end: {elapsed:.1f}s. {latency_report()}_"
     )
-    yield final_report
+
+
+async def execute_multiagent(user_query: str, stream: bool = False):
+    if COLLAB_MODE == "pipeline":
+        async for update in execute_pipeline(user_query, stream):
+            yield update
+        return
+
+    started = time.perf_counter()
+    async with session_scope(APP_NAME, user_id="cio_lead", prefix="multiagent") as SID:
+    
+        yield "🤝 **Step 1:** Initializing collaborative session between Architect and Security..."
+    
+        # Helper to run an agent (token deltas are forwarded when streaming)
+        def agent_turn(agent, prompt):
+            msg = types.Content(role='user', parts=[types.Part(text=prompt)])
+            return stream_agent(get_runner(agent, APP_NAME), "cio_lead", SID, msg, stream)
+
+        # Phase 1: Architect Drafts
+        yield "🏗️ **Step 2:** System Architect is drafting the technical blueprint..."
+        architect_draft = ""
+        async for chunk in agent_turn(architect_agent, f"Draft a technical architecture for: {user_query}"):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                architect_draft = chunk
+
+        # Phase 2: Security Reviews
+        yield "🛡️ **Step 3:** Security Officer is reviewing the blueprint for vulnerabilities..."
+        security_review = ""
+        async for chunk in agent_turn(security_agent, f"Review this architecture and find 3 risks: {architect_draft}"):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                security_review = chunk
+
+        yield "✅ **Step 4:** Collaboration complete. Merging insights."
+        _latency_log["sequential"].append(time.perf_counter() - started)
+    
+        final_report = (
+            f"## 🏛️ Collaborative IT Report\n\n"
+            f"### 📐 Architect's Blueprint\n{architect_draft}\n\n"
+            f"### 🔐 Security Review\n{security_review}\n\n"
+            f"---\n"
+            f"**CIO Summary:** The architecture is sound but requires the 3 security mitigations listed above.\n\n"
+            f"_{latency_report()}_"
+        )
+        yield final_report
 
 # --- REQUIRED ENTRY POINT FOR VALIDATOR & DASHBOARD ---
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """
     The master entry point used by the Master Validator and Streamlit UI.
     This function MUST be named 'run_pattern' and be async.
     """
-    return execute_multiagent(user_query)
+    return execute_multiagent(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
@@ -0,0 +1,198 @@
+"""
+Review Pipeline (Section-Streamed Architect -> Security Review)
+Description: Overlaps the two stages of pattern 07. The architect's draft is
+             cut into sections while it streams; every completed section is
+             handed to the security reviewer at once (bounded concurrency),
+             so reviews run while the architect is still writing. Each
+             section can go through several debate rounds (review ->
+             revision -> re-check), stopping early once the reviewer
+             signs off or repeats itself. Reviews are merged back in
+             section order.
+
+Run `python review_pipeline.py` for end-to-end latency, sequential vs pipelined.
+"""
+import asyncio
+import re
+import time
+from collections import namedtuple
+
+# 1. Configuration
+DEFAULT_CONCURRENCY = 3
+DEFAULT_ROUNDS = 1                 # 1 = review only; each extra round is revision + re-check
+CONVERGENCE_SIMILARITY = 0.8       # A re-check this similar to the previous review adds nothing new
+SIGN_OFF_RE = re.compile(r"\b(?:RESOLVED|NO MATERIAL RISKS?)\b")
+# A section starts at a markdown heading, a bold-only line ("**Data Layer**") or a numbered bold heading ("2. **Data**")
+HEADING_RE = re.compile(r"^(?:#{1,4}\s+\S.*|\*\*[^*\n]{2,80}\*\*:?\s*|\d{1,2}[.)]\s+\*\*[^*\n]{2,80}\*\*.*)$", re.MULTILINE)
+MIN_SECTION_WORDS = 25             # Shorter fragments (e.g. a preamble line) are merged into the next section
+WORD_RE = re.compile(r"[a-z0-9]{3,}")
+
+SectionReview = namedtuple("SectionReview", "index title text review rounds converged seconds")
+
+
+# 2. Streaming Segmentation
+class SectionSplitter:
+    """Feed streamed text; get back each section as soon as the heading of the next one arrives."""
+
+    def __init__(self, min_words: int = MIN_SECTION_WORDS):
+        self.min_words = min_words
+        self._buffer = ""
+
+    def _cut(self, final: bool) -> list:
+        starts = [m.start() for m in HEADING_RE.finditer(self._buffer)]
+        if not final:
+            # A heading is only trusted once its line is complete
+            starts = [s for s in starts if "\n" in self._buffer[s:]]
+        bounds = [0] + [s for s in starts if s > 0]
+        sections, begin = [], 0
+        for end in bounds[1:] + ([len(self._buffer)] if final else []):
+            chunk = self._buffer[begin:end]
+            if len(chunk.split()) >= self.min_words or (final and end == len(self._buffer) and chunk.strip()):
+                sections.append(chunk.strip())
+                begin = end
+        self._buffer = self._buffer[begin:]
+        return sections
+
+    def feed(self, delta: str) -> list:
+        self._buffer += delta
+        return self._cut(final=False)
+
+    def flush(self) -> list:
+        return self._cut(final=True)
+
+
+def section_title(section: str) -> str:
+    """The section's heading (a merged preamble comes first), else its first line."""
+    heading = HEADING_RE.search(section)
+    first = heading.group(0) if heading else section.strip().splitlines()[0]
+    return re.sub(r"^(?:#+\s*|\d{1,2}[.)]\s*)", "", first).strip("*: ")[:80] or "Overview"
+
+
+def similarity(a: str, b: str) -> float:
+    words_a, words_b = set(WORD_RE.findall(a.lower())), set(WORD_RE.findall(b.lower()))
+    return len(words_a & words_b) / len(words_a | words_b) if words_a and words_b else 0.0
+
+
+# 3. Debate & Pipeline
+async def debate_section(index: int, section: str, review, revise, recheck, rounds: int) -> SectionReview:
+    """Review, then up to rounds-1 revision/re-check rounds; stops once the reviewer signs off or repeats itself."""
+    started = time.perf_counter()
+    title = section_title(section)
+    current, latest = section, await review(title, section)
+    transcript, converged = [latest], bool(SIGN_OFF_RE.search(latest))
+    for _ in range(rounds - 1):
+        if converged:
+            break
+        current = await revise(title, current, latest)
+        follow_up = await recheck(title, current, latest)
+        converged = bool(SIGN_OFF_RE.search(follow_up)) or similarity(latest, follow_up) >= CONVERGENCE_SIMILARITY
+        latest = follow_up
+        transcript.append(latest)
+    return SectionReview(index, title, current, latest, len(transcript), converged, time.perf_counter() - started)
+
+
+async def run_pipeline(draft_deltas, review, revise=None, recheck=None, rounds: int = DEFAULT_ROUNDS,
+                       concurrency: int = DEFAULT_CONCURRENCY):
+    """
+    Async generator over ("delta", text), ("section", index, title) and ("reviewed", SectionReview) events.
+    `draft_deltas` is the architect's streamed text; review/revise/recheck are coroutine functions.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    splitter = SectionSplitter()
+    tasks, done = [], asyncio.Queue()
+    debate_rounds = rounds if revise and recheck else 1
+
+    async def reviewed(index, section):
+        started = time.perf_counter()
+        try:
+            async with semaphore:
+                result = await debate_section(index, section, review, revise, recheck, debate_rounds)
+        except Exception as e:   # One failed review must not stall the merge
+            result = SectionReview(index, section_title(section), section, f"Review failed: {e}", 0, False,
+                                   time.perf_counter() - started)
+        done.put_nowait(result)
+
+    def launch(sections):
+        for section in sections:
+            tasks.append(asyncio.create_task(reviewed(len(tasks), section)))
+            yield ("section", len(tasks) - 1, section_title(section))
+
+    yielded = 0
+    try:
+        async for delta in draft_deltas:
+            yield ("delta", delta)
+            for event in launch(splitter.feed(delta)):
+                yield event
+            while not done.empty():
+                yield ("reviewed", done.get_nowait())
+                yielded += 1
+        for event in launch(splitter.flush()):
+            yield event
+        while yielded < len(tasks):
+            yield ("reviewed", await done.get())
+            yielded += 1
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def merge_reviews(results: list) -> str:
+    """Section reviews in blueprint order, whatever order they finished in."""
+    parts = []
+    for r in sorted(results, key=lambda r: r.index):
+        status = "signed off" if r.converged else f"{r.rounds} round(s)"
+        parts.append(f"#### {r.index + 1}. {r.title} ({status})\n{r.review}")
+    return "\n\n".join(parts)
+
+
+# --- BENCHMARK: SEQUENTIAL VS PIPELINED ---
+def run_benchmark(sections: int = 6, section_tokens: int = 150, tokens_per_second: float = 30.0,
+                  review_tokens: int = 90, full_review_tokens: int = 300, rounds=(1, 2), time_scale: float = 0.02):
+    """
+    Mock agents generating at `tokens_per_second`. Sequential = full draft, then one review of the whole draft
+    (the current flow); pipelined = per-section reviews overlapping the draft. Times in simulated seconds.
+    """
+    words = " ".join(["scalable service tier with caching and autoscaling"] * (section_tokens // 7))
+    draft = "".join(f"## Component {i + 1}\n{words}.\n\n" for i in range(sections))
+
+    async def stream_draft():
+        tokens = re.findall(r"\S+\s*", draft)
+        for i in range(0, len(tokens), 10):   # Deltas of ~10 tokens, like a batched SSE stream
+            await asyncio.sleep(10 / tokens_per_second * time_scale)
+            yield "".join(tokens[i:i + 10])
+
+    def generation(tokens):
+        async def call(*_):
+            await asyncio.sleep(tokens / tokens_per_second * time_scale)
+            return "RESOLVED" if _ and len(_) == 3 and "revised" in _[1] else "Risk: missing mTLS between tiers."
+        return call
+
+    async def revise(title, section, _review):
+        await asyncio.sleep(section_tokens / tokens_per_second * time_scale)
+        return section + " revised"
+
+    async def sequential():
+        async for _ in stream_draft():
+            pass
+        await generation(full_review_tokens)()
+
+    async def pipelined(n_rounds):
+        async for _ in run_pipeline(stream_draft(), generation(review_tokens), revise, generation(review_tokens // 2),
+                                    rounds=n_rounds, concurrency=sections):
+            pass
+
+    print(f"🔀 Architect -> Security, {sections} sections x {section_tokens} tokens at {tokens_per_second:.0f} tok/s")
+    print("-" * 64)
+    for label, run in [("sequential (current)", sequential)] + [(f"pipelined, {n} round(s)", lambda n=n: pipelined(n)) for n in rounds]:
+        started = time.perf_counter()
+        asyncio.run(run())
+        print(f"{label:<28}{(time.perf_counter() - started) / time_scale:>8.1f} s end-to-end")
+    print("(Mock agents do not contend for the GPU; with OLLAMA_NUM_PARALLEL slots shared, overlap gains shrink.)")
+
+
+if __name__ == "__main__":
+    splitter = SectionSplitter(min_words=3)
+    sample = "Intro line.\n## API Gateway\nRate limits and auth at the edge.\n**Data Layer**\nPostgres with replicas.\n"
+    found = [s for i in range(0, len(sample), 7) for s in splitter.feed(sample[i:i + 7])] + splitter.flush()
+    print("Sections:", [section_title(s) for s in found], "\n")
+    run_benchmark()
@@ -5,13 +5,12 @@ Description: Uses the Session Service to retain and recall information
 """
 import asyncio
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import acquire_runner, session_lock, stream_agent, TextDelta
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_Memory_Vault"
 
 # 2. Define the Agent
@@ -26,30 +25,32 @@ memory_agent = Agent(
 )
 
 # 3. Execution Logic
-async def execute_memory(user_query: str):
-    session_service = InMemorySessionService()
-    # Using a consistent session ID to demonstrate memory retrieval
-    SID = "persistent_cio_session" 
+async def execute_memory(user_query: str, stream: bool = False):
+    # Using a consistent session ID to demonstrate memory retrieval.
+    # Memory is shared on purpose, so concurrent turns are serialized rather than interleaved.
+    SID = "persistent_cio_session"
     
     yield "🧠 **Step 1:** Accessing the CIO Memory Vault for historical context..."
     
-    await session_service.create_session(user_id="cio_admin", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=memory_agent, session_service=session_service, app_name=APP_NAME)
+    runner = await acquire_runner(memory_agent, APP_NAME, user_id="cio_admin", session_id=SID, persistent=True)
     
     response_text = ""
     msg = types.Content(role='user', parts=[types.Part(text=user_query)])
     
-    async for event in runner.run_async(user_id="cio_admin", session_id=SID, new_message=msg):
-        if event.is_final_response():
-            response_text = event.content.parts[0].text
+    async with session_lock(APP_NAME, "cio_admin", SID):
+        async for chunk in stream_agent(runner, "cio_admin", SID, msg, stream):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                response_text = chunk
             
     yield "✅ **Step 2:** Context retrieved and synthesized into strategy."
     yield f"### 📜 Context-Aware Strategic Response\n\n{response_text}"
 
 # --- REQUIRED ENTRY POINT FOR VALIDATOR & DASHBOARD ---
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """The master entry point used by the Validator and Streamlit UI."""
-    return execute_memory(user_query)
+    return execute_memory(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
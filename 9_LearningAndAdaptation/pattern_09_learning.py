@@ -2,80 +2,161 @@
 Pattern: Learning (Self-Correction & Feedback Loop)
 Description: Demonstrates an agent's ability to ingest human feedback and 
              adapt its internal logic/output during a multi-turn interaction.
+             The conversation history is owned by a ContextWindow (see
+             context_budget.py): the latest draft is already in the rendered
+             history, so feedback never pastes it again; older rounds are
+             summarized past a token budget, and the
+             loop runs up to LEARNING_FEEDBACK_ROUNDS rounds under a total
+             prompt-token cap. Real feedback, given inline as
+             "<request> FEEDBACK: <critique>", is distilled once into durable
+             per-user preferences (see preference_store.py) that are injected
+             into the instruction on later runs; the rewrite is skipped only
+             when the first draft passes a check against them. The simulated
+             CIO critique used without real feedback is never stored.
 """
 import asyncio
+import os
 from google.adk.agents import Agent
-from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
-from google.adk.models.lite_llm import LiteLlm
 from google.genai import types
+from model_client import get_model
+from agent_runtime import session_scope, get_runner, stream_agent, TextDelta
+from context_budget import ContextWindow
+from preference_store import get_preference_store
 
 # 1. Configuration
-OLLAMA_MODEL = LiteLlm(model="ollama_chat/llama3.2")
+OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
 APP_NAME = "CIO_Learning_System"
+USER_ID = "cio_lead"
+FEEDBACK_ROUNDS = int(os.getenv("LEARNING_FEEDBACK_ROUNDS", "1"))
+CONTEXT_BUDGET_TOKENS = int(os.getenv("LEARNING_CONTEXT_BUDGET", "1500"))     # Per prompt; older turns are summarized above it
+TOTAL_TOKEN_CAP = int(os.getenv("LEARNING_TOKEN_CAP", "12000"))               # Prompt tokens across all rounds
+
+FEEDBACK_SCRIPT = [
+    "This is too technical. Rewrite it for a Board of Directors. Focus on ROI and remove the jargon.",
+    "Good direction. Now cut it to one page and lead with the payback period.",
+    "Add the top three delivery risks, one line each, without reintroducing jargon.",
+]
 
 # 2. Define the Agent
 # Note: Using underscores in the name to pass Pydantic validation
+# include_contents="none": the ContextWindow renders the (compacted) history into each prompt,
+# so the session must not replay its own verbatim copy alongside it.
 adaptive_agent = Agent(
     name="Adaptive_Strategy_Agent",
     model=OLLAMA_MODEL,
+    include_contents="none",
     instruction=(
         "You are an AI that learns from user feedback. If the user criticizes "
-        "your style or depth, acknowledge it and apply the correction to the final output."
+        "your style or depth, acknowledge it and apply the correction to the final output.\n\n"
+        "{learned_preferences?}"   # Filled from session state by ADK
     )
 )
 
 # 3. Learning Logic
-async def execute_learning(user_query: str):
-    session_service = InMemorySessionService()
-    SID = "learning_session_09"
-    
-    await session_service.create_session(user_id="cio_lead", session_id=SID, app_name=APP_NAME)
-    runner = Runner(agent=adaptive_agent, session_service=session_service, app_name=APP_NAME)
+async def execute_learning(user_query: str, stream: bool = False, rounds: int = FEEDBACK_ROUNDS):
+    store = get_preference_store()
+    user_query, _, live_feedback = (part.strip() for part in user_query.partition("FEEDBACK:"))
+    learned = store.instruction_block(USER_ID)
+    rounds = max(1, rounds)
 
-    # --- PHASE 1: INITIAL ATTEMPT ---
-    yield "🎓 **Step 1:** Generating initial proposal based on general standards..."
+    async with session_scope(APP_NAME, user_id=USER_ID, prefix="learning",
+                             state={"learned_preferences": learned}) as SID:
     
-    initial_res = ""
-    msg_1 = types.Content(role='user', parts=[types.Part(text=f"Draft an IT strategy for: {user_query}")])
-    async for event in runner.run_async(user_id="cio_lead", session_id=SID, new_message=msg_1):
-        if event.is_final_response():
-            initial_res = event.content.parts[0].text
+        runner = get_runner(adaptive_agent, APP_NAME)
+        window = ContextWindow(budget_tokens=CONTEXT_BUDGET_TOKENS)
+
+        async def turn(message: str, round_label: int) -> str:
+            prompt = await window.render(message, round_label)
+            msg = types.Content(role='user', parts=[types.Part(text=prompt)])
+            final_text = ""
+            async for chunk in stream_agent(runner, USER_ID, SID, msg, stream):
+                if isinstance(chunk, TextDelta):
+                    yield chunk
+                else:
+                    final_text = chunk
+            window.add("assistant", final_text)
+            yield final_text
 
-    # --- PHASE 2: SIMULATED FEEDBACK LOOP ---
-    # In a real app, this would be a second user input. 
-    # Here, we simulate the "Learning" step where the system applies a feedback constraint.
-    yield "🔄 **Step 2:** Applying 'CIO Preference' learning (e.g., 'Be more concise and focus on ROI')..."
+        # --- PHASE 1: INITIAL ATTEMPT ---
+        if learned:
+            yield f"🎓 **Step 1:** Generating proposal with {len(store.preferences(USER_ID))} learned preference(s) applied up front..."
+        else:
+            yield "🎓 **Step 1:** Generating initial proposal based on general standards..."
     
-    feedback_context = (
-        f"Your previous response was: {initial_res}\n\n"
-        "FEEDBACK: This is too technical. Rewrite it for a Board of Directors. "
-        "Focus on ROI and remove the jargon."
-    )
+        current_res = ""
+        async for chunk in turn(f"Draft an IT strategy for: {user_query}", 0):
+            if isinstance(chunk, TextDelta):
+                yield chunk
+            else:
+                current_res = chunk
+
+        # --- PHASE 2: FEEDBACK LOOP ---
+        # Real feedback comes inline with the request. Without it, a draft that passes the check
+        # against the learned preferences needs no rewrite; one that misses some is corrected
+        # against exactly those, and a user with nothing learned gets the simulated CIO critique.
+        completed = 0
+        missed = store.unmet(USER_ID, current_res) if learned and not live_feedback else []
+        skip_rewrite = bool(learned) and not live_feedback and not missed
+        if skip_rewrite:
+            yield "⏭️ **Step 2:** Draft already meets the learned preferences; skipping the rewrite pass."
+        elif missed:
+            yield f"🔄 **Step 2:** Draft misses {len(missed)} learned preference(s) ({', '.join(p.slot for p in missed)}); correcting..."
+        else:
+            yield "🔄 **Step 2:** Applying 'CIO Preference' learning (e.g., 'Be more concise and focus on ROI')..."
+
+        for r in range(1, 0 if skip_rewrite else rounds + 1):
+            spent = sum(s.sent_tokens for s in window.stats)
+            if spent + window.budget_tokens > TOTAL_TOKEN_CAP:
+                yield f"⛔ Token cap reached ({spent:,}/{TOTAL_TOKEN_CAP:,} prompt tokens); stopping before round {r}."
+                break
+
+            # The window keeps the latest draft verbatim (a recent turn), so feedback points at it instead of pasting it
+            if r == 1 and live_feedback:
+                feedback = live_feedback
+            elif r == 1 and missed:
+                feedback = "Apply these preferences the draft missed: " + " ".join(p.instruction for p in missed)
+            else:
+                feedback = FEEDBACK_SCRIPT[(r - 1) % len(FEEDBACK_SCRIPT)]
+            feedback_context = (
+                f"FEEDBACK on your previous response (turn {len(window.turns)} above): {feedback}\n\n"
+                "Reply with the complete revised response."
+            )
     
-    yield "📈 **Step 3:** Adapting logic and refining strategy based on feedback..."
+            yield f"📈 **Step 3.{r}:** Adapting logic and refining strategy based on feedback..."
     
-    final_res = ""
-    msg_2 = types.Content(role='user', parts=[types.Part(text=feedback_context)])
-    async for event in runner.run_async(user_id="cio_lead", session_id=SID, new_message=msg_2):
-        if event.is_final_response():
-            final_res = event.content.parts[0].text
+            async for chunk in turn(feedback_context, r):
+                if isinstance(chunk, TextDelta):
+                    yield chunk
+                else:
+                    current_res = chunk
+            completed = r
+            if r == 1 and live_feedback:
+                store.learn(USER_ID, feedback)   # Only real feedback; extracted once, repeats are a no-op
 
-    yield "✅ **Learning Loop Complete.**"
+        # Rounds are booked as avoided only when the draft passed the preference check
+        store.record_run(USER_ID, rewrites=completed, avoided=rounds if skip_rewrite else 0)
+        stats = store.snapshot(USER_ID)
+        preferences = store.preferences(USER_ID)
+
+        yield "✅ **Learning Loop Complete.**"
     
-    report = (
-        f"### 🎯 Final Adaptive Strategy (Learned)\n{final_res}\n\n"
-        f"---\n"
-        f"### 🎓 Learning Metadata\n"
-        f"**Initial Style:** Technical/Detailed\n"
-        f"**Learned Preference:** Executive/ROI-Focused"
-    )
-    yield report
+        report = (
+            f"### 🎯 Final Adaptive Strategy (Learned)\n{current_res}\n\n"
+            f"---\n"
+            f"### 🎓 Learning Metadata\n"
+            f"**Initial Style:** {'Learned preferences applied' if learned else 'Technical/Detailed'}\n"
+            f"**Learned Preferences:** {', '.join(f'{p.slot}={p.value}' for p in preferences) or 'none yet'}\n"
+            f"**Feedback Rounds:** {completed}\n"
+            f"**Rewrites Avoided:** {stats['rewrites_avoided']} of {stats['rewrites'] + stats['rewrites_avoided']} "
+            f"({stats['avoided_rate']:.0%}) over {stats['runs']} run(s)\n\n"
+            f"### 🧮 Prompt Tokens per Round\n{window.report()}"
+        )
+        yield report
 
 # --- REQUIRED ENTRY POINT FOR VALIDATOR & DASHBOARD ---
-async def run_pattern(user_query: str):
+async def run_pattern(user_query: str, stream: bool = False):
     """The master entry point used by the Validator and Streamlit UI."""
-    return execute_learning(user_query)
+    return execute_learning(user_query, stream)
 
 if __name__ == "__main__":
     async def local_test():
@@ -84,4 +165,4 @@ if __name__ == "__main__":
         async for update in gen:
             print(f"\n{update}")
             
-    asyncio.run(local_test())
\ No newline at end of file
+    asyncio.run(local_test())
@@ -0,0 +1,194 @@
+"""
+Preference Store (Durable, Learned Style Constraints)
+Description: Replaces the throwaway feedback of pattern 09 with preferences
+             that survive the session. Feedback is parsed once (hashed, so
+             repeating it costs nothing) into compact constraints keyed per
+             user and slot - e.g. audience=board, focus=roi - and kept in
+             SQLite with a write-ahead log. Later runs render the constraints
+             into the agent instruction, so the first draft already follows
+             them; a draft that passes a local check against the stored
+             constraints skips the second "rewrite" call. Counters record
+             how many rewrites were paid for versus avoided.
+
+Run `python preference_store.py` to see extraction and the rewrite counters.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+# 1. Configuration
+STORE_PATH = os.getenv("PREFERENCE_STORE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".preferences.sqlite3"))
+MAX_CUSTOM_CHARS = 160   # Feedback no rule understands is kept verbatim, truncated to this
+
+# (slot, value, pattern, instruction). One value per slot: newer feedback overrides older feedback on the same slot
+RULES = [
+    ("audience", "board", r"\bboard\b|\bexecutive|\bc-?suite|\bnon-?technical", "Write for a Board of Directors, not engineers."),
+    ("audience", "engineering", r"\bmore technical\b|\bengineers?\b|\bdeep dive\b", "Write for an engineering audience with technical depth."),
+    ("jargon", "none", r"\bjargon\b|\btoo technical\b|\bplain (?:english|language)\b", "Avoid technical jargon; explain terms in plain business language."),
+    ("focus", "roi", r"\broi\b|\breturn on investment\b|\bpayback\b|\bbusiness value\b", "Lead with ROI: cost, payback period and business value."),
+    ("focus", "risk", r"\bfocus on risks?\b|\brisk-first\b", "Lead with the key risks and their mitigations."),
+    ("length", "concise", r"\bconcise\b|\bshorter\b|\bone page\b|\bbrief\b|\bcut it\b", "Keep it concise: one page or less."),
+    ("length", "detailed", r"\bmore detail\b|\blonger\b|\bexpand\b", "Go into full detail on each section."),
+    ("format", "bullets", r"\bbullets?\b|\bbullet points\b", "Use bullet points rather than long paragraphs."),
+    ("risks", "top3", r"\b(?:top|three|3)\b[^.]{0,20}\brisks?\b", "Include the top three delivery risks, one line each."),
+]
+_COMPILED = [(slot, value, re.compile(pattern, re.IGNORECASE), text) for slot, value, pattern, text in RULES]
+
+JARGON_RE = re.compile(r"\b(?:api|sdn|vlan|mpls|qos|kubernetes|microservices?|containeri[sz]ed|orchestration|"
+                       r"throughput|latency|ci/cd|iac|5g nr|urllc|mec|edge compute)\b", re.IGNORECASE)
+BULLET_RE = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+", re.MULTILINE)
+
+
+def _words(draft: str) -> int:
+    return len(draft.split())
+
+
+# (slot, value) -> predicate on a draft. Slots without a check (audience, custom) never fail it
+CHECKS = {
+    ("jargon", "none"): lambda d: len(JARGON_RE.findall(d)) * 100 <= max(_words(d), 1),   # At most 1 per 100 words
+    ("focus", "roi"): lambda d: re.search(r"\broi\b|return on investment|payback|business value", d, re.IGNORECASE) is not None,
+    ("focus", "risk"): lambda d: re.search(r"\brisks?\b", d[:len(d) // 3 + 1], re.IGNORECASE) is not None,
+    ("length", "concise"): lambda d: _words(d) <= 450,   # Roughly one page
+    ("length", "detailed"): lambda d: _words(d) >= 600,
+    ("format", "bullets"): lambda d: len(BULLET_RE.findall(d)) >= 3,
+    ("risks", "top3"): lambda d: len(re.findall(r"\brisks?\b", d, re.IGNORECASE)) >= 1,
+}
+
+Preference = namedtuple("Preference", "slot value instruction hits updated_at")
+
+
+def extract_constraints(feedback: str) -> list:
+    """Returns (slot, value, instruction) triples. Unmatched feedback becomes one 'custom' constraint."""
+    found, slots = [], set()
+    for slot, value, pattern, text in _COMPILED:
+        if slot not in slots and pattern.search(feedback):
+            found.append((slot, value, text))
+            slots.add(slot)
+    if not found and feedback.strip():
+        text = " ".join(feedback.split())[:MAX_CUSTOM_CHARS]
+        found.append((f"custom:{_digest(text)[:8]}", "text", text))
+    return found
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).lower().encode("utf-8")).hexdigest()
+
+
+# 2. Store
+class PreferenceStore:
+    """Per-user preferences, seen-feedback hashes and rewrite counters in one SQLite file."""
+
+    def __init__(self, path: str = STORE_PATH):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS preferences ("
+            "user_id TEXT NOT NULL, slot TEXT NOT NULL, value TEXT NOT NULL, instruction TEXT NOT NULL, "
+            "hits INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL, PRIMARY KEY (user_id, slot));"
+            "CREATE TABLE IF NOT EXISTS feedback_seen ("
+            "user_id TEXT NOT NULL, digest TEXT NOT NULL, seen_at REAL NOT NULL, PRIMARY KEY (user_id, digest));"
+            "CREATE TABLE IF NOT EXISTS rewrite_stats ("
+            "user_id TEXT PRIMARY KEY, runs INTEGER NOT NULL DEFAULT 0, "
+            "rewrites INTEGER NOT NULL DEFAULT 0, avoided INTEGER NOT NULL DEFAULT 0);"
+        )
+        self._db.commit()
+
+    def learn(self, user_id: str, feedback: str) -> list:
+        """Extracts and stores constraints from feedback not seen before. Returns the slots written."""
+        digest = _digest(feedback)
+        now = time.time()
+        with self._lock:
+            seen = self._db.execute("SELECT 1 FROM feedback_seen WHERE user_id = ? AND digest = ?",
+                                    (user_id, digest)).fetchone()
+            if seen:
+                return []
+            constraints = extract_constraints(feedback)
+            self._db.executemany(
+                "INSERT INTO preferences (user_id, slot, value, instruction, hits, updated_at) VALUES (?, ?, ?, ?, 0, ?) "
+                "ON CONFLICT(user_id, slot) DO UPDATE SET value = excluded.value, "
+                "instruction = excluded.instruction, updated_at = excluded.updated_at",
+                [(user_id, slot, value, text, now) for slot, value, text in constraints],
+            )
+            self._db.execute("INSERT INTO feedback_seen (user_id, digest, seen_at) VALUES (?, ?, ?)", (user_id, digest, now))
+            self._db.commit()
+            return [slot for slot, _, _ in constraints]
+
+    def preferences(self, user_id: str) -> list:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT slot, value, instruction, hits, updated_at FROM preferences WHERE user_id = ? ORDER BY slot",
+                (user_id,)).fetchall()
+        return [Preference(*row) for row in rows]
+
+    def instruction_block(self, user_id: str) -> str:
+        """The learned constraints as instruction lines, and marks them used. Empty when nothing is learned."""
+        prefs = self.preferences(user_id)
+        if not prefs:
+            return ""
+        with self._lock:
+            self._db.execute("UPDATE preferences SET hits = hits + 1 WHERE user_id = ?", (user_id,))
+            self._db.commit()
+        return "Learned preferences for this user (apply them without being asked):\n" + \
+            "\n".join(f"- {p.instruction}" for p in prefs)
+
+    def unmet(self, user_id: str, draft: str) -> list:
+        """Stored preferences the draft visibly fails; an empty list means it passes every check."""
+        return [p for p in self.preferences(user_id)
+                if (p.slot, p.value) in CHECKS and not CHECKS[(p.slot, p.value)](draft)]
+
+    def forget(self, user_id: str):
+        with self._lock:
+            for table in ("preferences", "feedback_seen", "rewrite_stats"):
+                self._db.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+            self._db.commit()
+
+    def record_run(self, user_id: str, rewrites: int = 0, avoided: int = 0):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO rewrite_stats (user_id, runs, rewrites, avoided) VALUES (?, 1, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET runs = runs + 1, "
+                "rewrites = rewrites + excluded.rewrites, avoided = avoided + excluded.avoided",
+                (user_id, rewrites, avoided),
+            )
+            self._db.commit()
+
+    def snapshot(self, user_id: str) -> dict:
+        """Runs, rewrite calls paid for and avoided, and the share of rewrites avoided."""
+        with self._lock:
+            row = self._db.execute("SELECT runs, rewrites, avoided FROM rewrite_stats WHERE user_id = ?",
+                                   (user_id,)).fetchone() or (0, 0, 0)
+        runs, rewrites, avoided = row
+        total = rewrites + avoided
+        return {"runs": runs, "rewrites": rewrites, "rewrites_avoided": avoided,
+                "avoided_rate": avoided / total if total else 0.0}
+
+
+_default_store = None
+
+
+def get_preference_store() -> PreferenceStore:
+    """Process-wide store; every connection shares the same WAL-backed file."""
+    global _default_store
+    if _default_store is None:
+        _default_store = PreferenceStore()
+    return _default_store
+
+
+if __name__ == "__main__":
+    store = PreferenceStore(":memory:")
+    feedback = "This is too technical. Rewrite it for a Board of Directors. Focus on ROI and remove the jargon."
+    print(f"🧠 Learned slots: {store.learn('demo', feedback)}")
+    print(f"🔁 Same feedback again: {store.learn('demo', feedback)} (already seen, nothing to extract)")
+    store.record_run("demo", rewrites=1)
+    for _ in range(4):
+        store.instruction_block("demo")
+        store.record_run("demo", avoided=1)
+    print(f"\n{store.instruction_block('demo')}\n")
+    draft = "Our SDN and VLAN orchestration cuts API latency across the MPLS core."
+    print(f"🔎 Unmet by a jargon-heavy draft: {[p.slot for p in store.unmet('demo', draft)]}")
+    print(f"📊 {store.snapshot('demo')}")
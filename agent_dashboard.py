@@ -1,8 +1,15 @@
+import time
+_script_started = time.perf_counter()
+
 import streamlit as st
-import asyncio
-import importlib
 import pandas as pd
+import asyncio
 import os
+import agent_runtime
+import background_loop
+import model_client
+import pattern_registry
+import response_cache
 
 # --- PAGE CONFIG ---
 st.set_page_config(
@@ -13,34 +20,31 @@ st.set_page_config(
 )
 
 # --- THE PATTERN REGISTRY ---
+# Patterns are discovered from the numbered folders without importing them;
+# each module (and its agents) is imported on first execution only.
+DISPLAY_NAMES = {
+    "01": "Chaining", "02": "Routing", "03": "Parallelization", "04": "Reflection",
+    "05": "Tool Use", "06": "Planning", "07": "Multi-Agent", "08": "Memory",
+    "09": "Learning", "10": "MCP", "11": "Goal Setting", "12": "Exception",
+    "13": "HITL", "14": "RAG", "15": "A2A", "16": "Resource Aware",
+    "17": "Reasoning", "18": "Guardrails", "19": "Evaluation", "20": "Prioritization",
+    "21": "Exploration"
+}
+
+@st.cache_resource
+def get_pattern_registry():
+    """Directory scan runs once per server process, not once per rerun."""
+    return pattern_registry.discover_patterns()
+
 PATTERNS = {
-    "01 Routing": "pattern_01_routing",
-    "02 Chaining": "pattern_02_chaining",
-    "03 Parallelization": "pattern_03_parallelization",
-    "04 Reflection": "pattern_04_reflection",
-    "05 Tool Use": "pattern_05_tool_use",
-    "06 Planning": "pattern_06_planning",
-    "07 Multi-Agent": "pattern_07_multi_agent",
-    "08 Memory": "pattern_08_memory",
-    "09 Learning": "pattern_09_learning",
-    "10 MCP": "pattern_10_mcp",
-    "11 Goal Setting": "pattern_11_goal_setting",
-    "12 Exception": "pattern_12_exception",
-    "13 HITL": "pattern_13_hitl",
-    "14 RAG": "pattern_14_rag",
-    "15 A2A": "pattern_15_a2a",
-    "16 Resource Aware": "pattern_16_resource_aware",
-    "17 Reasoning": "pattern_17_reasoning",
-    "18 Guardrails": "pattern_18_guardrails",
-    "19 Evaluation": "pattern_19_evaluation",
-    "20 Prioritization": "pattern_20_prioritization",
-    "21 Exploration": "pattern_21_exploration"
+    f"{number} {DISPLAY_NAMES.get(number, spec.title)}": spec
+    for number, spec in get_pattern_registry().items()
 }
 
 # --- MASTER SAMPLE LIBRARY ---
 SAMPLES = {
-    "01 Routing": "Triage this: 'Our cloud egress fees are spiking in AWS, and the HR payroll portal is throwing 404 errors.'",
-    "02 Chaining": "Analyze the risk of our current legacy firewall, then synthesize a 3-step mitigation plan for the board.",
+    "01 Chaining": "Analyze the risk of our current legacy firewall, then synthesize a 3-step mitigation plan for the board.",
+    "02 Routing": "Triage this: 'Our cloud egress fees are spiking in AWS, and the HR payroll portal is throwing 404 errors.'",
     "03 Parallelization": "Compare the SaaS security features of Microsoft 365, Google Workspace, and Slack side-by-side.",
     "04 Reflection": "Draft a remote work policy. Then, critique it against the latest 2026 labor laws and provide a revised version.",
     "05 Tool Use": "Pull the latest project status from the PMO database and calculate the current budget burn rate.",
@@ -65,6 +69,11 @@ SAMPLES = {
 # --- SESSION STATE INITIALIZATION ---
 if "user_query" not in st.session_state:
     st.session_state.user_query = ""
+if "script_ms" not in st.session_state:
+    st.session_state.script_ms = []
+if "ttft_log" not in st.session_state:
+    # Time-to-first-token samples per output mode, for before/after comparison
+    st.session_state.ttft_log = {"Streaming": [], "Buffered": []}
 
 # --- CALLBACK FUNCTION FOR INJECTION ---
 def inject_sample_callback():
@@ -72,10 +81,9 @@ def inject_sample_callback():
     st.session_state.user_query = SAMPLES.get(st.session_state.selected_pattern, "No sample available.")
 
 # --- HELPER: DYNAMIC EXECUTION ---
-async def call_pattern(pattern_key, query):
-    module_name = PATTERNS[pattern_key]
-    module = importlib.import_module(module_name)
-    generator = await module.run_pattern(query)
+async def call_pattern(pattern_key, query, stream=False):
+    module = pattern_registry.load_pattern(PATTERNS[pattern_key])
+    generator = await module.run_pattern(query, stream=stream)
     return generator
 
 # --- UI: SIDEBAR ---
@@ -92,11 +100,34 @@ with st.sidebar:
     )
     
     st.info(f"**Pattern Focus:** {selected_pattern.split(' ', 1)[1]}")
+    stream_tokens = st.toggle("Stream tokens (live output)", value=True)
     
     with st.expander("System Telemetry"):
         st.write("🟢 Ollama (Llama 3.2)")
         st.write("🟢 Google AI (Gemini 2.0)")
         st.write("⚡ Edge Routing: Active")
+        pool = agent_runtime.runtime_stats()
+        st.write(f"♻️ Pooled Runners: {pool['pooled_runners']} ({pool['runner_reuses']} reuses)")
+        st.write(f"⏱️ Setup Time Saved: {pool['setup_seconds_saved'] * 1000:,.1f} ms")
+        cache = response_cache.get_response_cache().snapshot()
+        st.write(f"🗄️ Response Cache: {cache['hit_rate']:.0%} hit rate "
+                 f"({cache['memory_hits']} memory / {cache['disk_hits']} disk / {cache['misses']} miss)")
+        registry = pattern_registry.registry_stats()
+        st.write(f"📦 Patterns Loaded: {registry['loaded']}/{len(PATTERNS)} "
+                 f"({sum(registry['load_seconds'].values()) * 1000:,.0f} ms import, {registry['cache_hits']} cache hits)")
+        conns = model_client.pool_stats()
+        st.write(f"🔌 Ollama Pool: {conns['max_connections']} keep-alive connections, {conns['requests']} requests "
+                 f"({conns['queued']} queued, {conns['avg_wait_ms']:,.0f} ms avg wait, {conns['rejected']} rejected)")
+        loop_stats = background_loop.get_background_loop().stats
+        st.write(f"🧵 Background Loop: {loop_stats['jobs_started']} workflows "
+                 f"({loop_stats['jobs_started'] - loop_stats['jobs_finished']} running)")
+        if st.session_state.script_ms:
+            runs = st.session_state.script_ms
+            warm = runs[1:] or runs
+            st.write(f"🔁 Dashboard Script: {runs[0]:,.0f} ms first run, {sum(warm) / len(warm):,.0f} ms avg rerun")
+        for mode, samples in st.session_state.ttft_log.items():
+            if samples:
+                st.write(f"⚡ TTFT ({mode}): {sum(samples) / len(samples):.2f}s avg over {len(samples)} runs")
 
 # --- UI: MAIN DASHBOARD ---
 st.title(f"🚀 Pattern Demo: {selected_pattern}")
@@ -112,27 +143,58 @@ user_query = st.text_area(
     key="user_query" # Link directly to the session_state variable
 )
 
+def render_job(job, mode, live=True):
+    """Follows a background job; `live` is False when re-attaching after a rerun (no TTFT sample then)."""
+    status_placeholder = st.empty()
+    output_container = st.empty()
+    try:
+        ttft = None
+        live_text = ""
+        for update in job.follow():
+            update_str = str(update)
+            if isinstance(update, agent_runtime.TextDelta):
+                # Token deltas are appended and re-rendered as they arrive
+                ttft = ttft or time.perf_counter() - job.started
+                live_text += update_str
+                output_container.markdown(live_text + " ▌")
+            elif "###" in update_str: 
+                ttft = ttft or time.perf_counter() - job.started
+                output_container.markdown(update_str)
+            else:
+                live_text = ""
+                status_placeholder.status(update_str, state="running")
+        if ttft is not None and live:
+            st.session_state.ttft_log[mode].append(ttft)
+            st.caption(f"⚡ Time to first token ({mode}): {ttft:.2f}s")
+        saved_ms = (agent_runtime.runtime_stats()["setup_seconds_saved"] - st.session_state.active_job["saved_before"]) * 1000
+        st.success(f"Workflow Finalized in {job.finished - job.started:.2f}s. (Runner pool saved {saved_ms:,.1f} ms of setup)")
+    except asyncio.CancelledError:
+        # follow() re-raises the job's cancellation, which is a BaseException and skips the handler below
+        st.warning("⏹️ Workflow was cancelled before it finished; any output above is partial.")
+    except Exception as e:
+        st.error(f"Execution Error: {str(e)}")
+
+workflow_ran = False
 if st.button("Execute Agentic Workflow", type="primary"):
     if user_query:
-        status_placeholder = st.empty()
-        output_container = st.empty()
-        
-        async def run_ui():
-            try:
-                gen = await call_pattern(selected_pattern, user_query)
-                async for update in gen:
-                    update_str = str(update)
-                    if "###" in update_str: 
-                        output_container.markdown(update_str)
-                    else:
-                        status_placeholder.status(update_str, state="running")
-                st.success("Workflow Finalized.")
-            except Exception as e:
-                st.error(f"Execution Error: {str(e)}")
-
-        asyncio.run(run_ui())
+        workflow_ran = True
+        mode = "Streaming" if stream_tokens else "Buffered"
+        # Runs on the shared background loop: connections stay warm and the job survives reruns
+        job = background_loop.get_background_loop().start_job(
+            lambda pattern=selected_pattern, query=user_query, stream=stream_tokens: call_pattern(pattern, query, stream=stream)
+        )
+        st.session_state.active_job = {
+            "job": job, "mode": mode,
+            "saved_before": agent_runtime.runtime_stats()["setup_seconds_saved"],
+        }
+        render_job(job, mode)
     else:
         st.warning("Please enter a query or inject a sample.")
+elif st.session_state.get("active_job") and not st.session_state.active_job["job"].done:
+    # A rerun interrupted the page while the workflow kept running; re-attach and replay its output
+    workflow_ran = True
+    st.info("⏳ A workflow started earlier is still running in the background; re-attached.")
+    render_job(st.session_state.active_job["job"], st.session_state.active_job["mode"], live=False)
 
 # --- UI: ARCHITECTURE VISUALIZER ---
 st.divider()
@@ -178,4 +240,9 @@ with col2:
     st.bar_chart(chart_data, x="Category", y="Expense ($)", color="#2E86C1")
 
 st.sidebar.markdown("---")
-st.sidebar.caption("© 2026 Strategic Command Center")
\ No newline at end of file
+st.sidebar.caption("© 2026 Strategic Command Center")
+
+# Cold-start vs warm-rerun profile (shown in System Telemetry on the next rerun);
+# runs that executed a workflow are excluded so they measure the dashboard alone
+if not workflow_ran:
+    st.session_state.script_ms.append((time.perf_counter() - _script_started) * 1000)
\ No newline at end of file
@@ -0,0 +1,183 @@
+"""
+Shared Agent Runtime (Runner & Session Pooling)
+Description: Process-wide execution layer used by all 21 patterns. Runners are
+             pooled per (agent, app_name) and a single session service holds
+             sessions with a bounded idle lifetime, so the setup cost of a
+             workflow is paid once per process instead of once per click.
+             Each invocation allocates its own namespaced session, so
+             concurrent runs of the same pattern never share history.
+             stream_agent() optionally surfaces token deltas as they arrive;
+             single_turn() is the buffered one-shot form used by fan-out
+             branches, reviewers and cascade tiers.
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import aclosing, asynccontextmanager
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+# 1. Configuration
+SESSION_TTL_SECONDS = 30 * 60   # Idle sessions are evicted after 30 minutes
+MAX_SESSIONS = 512              # Hard cap on live sessions held by the service
+
+# 2. Process-wide State
+_session_service = InMemorySessionService()
+_runner_pool = {}                    # (agent_name, app_name) -> (Runner, build_seconds)
+_session_deadlines = OrderedDict()   # (app_name, user_id, session_id) -> expiry timestamp
+_session_locks = {}                  # (app_name, user_id, session_id) -> asyncio.Lock
+_stats = {
+    "runners_built": 0,
+    "runner_reuses": 0,
+    "sessions_expired": 0,
+    "sessions_allocated": 0,
+    "sessions_released": 0,
+    "setup_seconds_saved": 0.0,
+}
+
+
+def get_session_service() -> InMemorySessionService:
+    """Returns the process-wide session service shared by every pattern."""
+    return _session_service
+
+
+def get_runner(agent, app_name: str) -> Runner:
+    """Returns the pooled Runner for (agent, app_name), building it on first use."""
+    key = (agent.name, app_name)
+    pooled = _runner_pool.get(key)
+
+    # A reloaded module produces a new Agent object; never serve a stale runner
+    if pooled and pooled[0].agent is agent:
+        runner, build_seconds = pooled
+        _stats["runner_reuses"] += 1
+        _stats["setup_seconds_saved"] += build_seconds
+        return runner
+
+    started = time.perf_counter()
+    runner = Runner(agent=agent, session_service=_session_service, app_name=app_name)
+    _runner_pool[key] = (runner, time.perf_counter() - started)
+    _stats["runners_built"] += 1
+    return runner
+
+
+async def _expire_sessions():
+    """Drops sessions past their idle deadline or beyond the MAX_SESSIONS cap."""
+    now = time.monotonic()
+    while _session_deadlines:
+        key, deadline = next(iter(_session_deadlines.items()))
+        if deadline > now and len(_session_deadlines) <= MAX_SESSIONS:
+            break
+        _session_deadlines.popitem(last=False)
+        _session_locks.pop(key, None)
+        app_name, user_id, session_id = key
+        await _session_service.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        _stats["sessions_expired"] += 1
+
+
+async def open_session(app_name: str, user_id: str, session_id: str, persistent: bool = False, state: dict = None):
+    """
+    Ensures a session exists in the shared service and refreshes its lifetime.
+    By default the session starts empty, matching a freshly built service;
+    persistent sessions keep their history until they expire. A new session
+    starts with the given state (e.g. values for {placeholders} in instructions).
+    """
+    await _expire_sessions()
+    key = (app_name, user_id, session_id)
+    existing = await _session_service.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+
+    if existing and not persistent:
+        await _session_service.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        existing = None
+    if not existing:
+        await _session_service.create_session(app_name=app_name, user_id=user_id, session_id=session_id, state=state)
+
+    _session_deadlines.pop(key, None)
+    _session_deadlines[key] = time.monotonic() + SESSION_TTL_SECONDS
+
+
+async def acquire_runner(agent, app_name: str, user_id: str, session_id: str, persistent: bool = False) -> Runner:
+    """Opens the session and returns the pooled Runner in a single call."""
+    await open_session(app_name, user_id, session_id, persistent=persistent)
+    return get_runner(agent, app_name)
+
+
+async def allocate_session(app_name: str, user_id: str, prefix: str, state: dict = None) -> str:
+    """Creates an empty session under a unique, namespaced ID (e.g. 'routing_3f9c...')."""
+    session_id = f"{prefix}_{uuid.uuid4().hex[:12]}"
+    await open_session(app_name, user_id, session_id, state=state)
+    _stats["sessions_allocated"] += 1
+    return session_id
+
+
+async def release_session(app_name: str, user_id: str, session_id: str):
+    """Frees a session allocated for a single invocation."""
+    key = (app_name, user_id, session_id)
+    _session_locks.pop(key, None)
+    if _session_deadlines.pop(key, None) is not None:
+        await _session_service.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        _stats["sessions_released"] += 1
+
+
+@asynccontextmanager
+async def session_scope(app_name: str, user_id: str, prefix: str, state: dict = None):
+    """Allocates a private session for one run_pattern invocation and frees it on exit."""
+    session_id = await allocate_session(app_name, user_id, prefix, state=state)
+    try:
+        yield session_id
+    finally:
+        await release_session(app_name, user_id, session_id)
+
+
+def session_lock(app_name: str, user_id: str, session_id: str) -> asyncio.Lock:
+    """
+    Lock for sessions that are shared on purpose (e.g. long-term memory).
+    Concurrent turns on the same history are serialized instead of interleaved.
+    """
+    key = (app_name, user_id, session_id)
+    if key not in _session_locks:
+        _session_locks[key] = asyncio.Lock()
+    return _session_locks[key]
+
+
+class TextDelta(str):
+    """A partial chunk of model output. Consumers append these instead of replacing the view."""
+
+
+async def stream_agent(runner: Runner, user_id: str, session_id: str, new_message, stream: bool = False):
+    """
+    Runs one agent turn. With stream=True, partial text is yielded as TextDelta
+    chunks while the model generates; the complete response is always yielded
+    last as a plain str, so callers get the same final text in both modes.
+    Closing this generator early (e.g. a streaming guardrail abort) also
+    closes the underlying model stream.
+    """
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE if stream else StreamingMode.NONE)
+    final_text = ""
+    events = runner.run_async(user_id=user_id, session_id=session_id,
+                              new_message=new_message, run_config=run_config)
+    async with aclosing(events):
+        async for event in events:
+            if event.partial:
+                if event.content and event.content.parts and event.content.parts[0].text:
+                    yield TextDelta(event.content.parts[0].text)
+            elif event.is_final_response():
+                final_text = event.content.parts[0].text
+    yield final_text
+
+
+async def single_turn(agent, app_name: str, user_id: str, prefix: str, prompt: str) -> str:
+    """One buffered turn in a private session, so concurrent callers never share history. Returns the final text."""
+    async with session_scope(app_name, user_id, prefix) as session_id:
+        msg = types.Content(role="user", parts=[types.Part(text=prompt)])
+        final_text = ""
+        async for chunk in stream_agent(get_runner(agent, app_name), user_id, session_id, msg):
+            final_text = chunk
+        return final_text
+
+
+def runtime_stats() -> dict:
+    """Snapshot of pool counters, including setup time saved by runner reuse."""
+    return {**_stats, "pooled_runners": len(_runner_pool), "live_sessions": len(_session_deadlines)}
@@ -0,0 +1,181 @@
+"""
+Background Event Loop (Persistent Loop for the Dashboard)
+Description: One long-lived asyncio loop running in a daemon thread, shared
+             by every Streamlit script run. Workflows are submitted to it
+             through a thread-safe API instead of asyncio.run() per click, so
+             loop-bound state (LiteLlm/httpx connection pools, runner pools)
+             stays warm, and a workflow keeps running when Streamlit reruns
+             the script mid-execution.
+
+Usage:
+    job = get_background_loop().start_job(agen_factory)   # returns immediately
+    for update in job.follow(): ...                        # replayable, from any thread
+
+Run `python background_loop.py` for the back-to-back latency comparison
+(the pooled LiteLLM client against model_client's mock Ollama server).
+"""
+import asyncio
+import itertools
+import statistics
+import threading
+import time
+
+
+class WorkflowJob:
+    """
+    Output of one async-generator workflow, buffered so any script run can
+    (re)attach to it with follow() and replay what has already been produced.
+    """
+
+    def __init__(self, job_id: int):
+        self.job_id = job_id
+        self.updates = []
+        self.done = False
+        self.error = None
+        self.started = time.perf_counter()
+        self.finished = None
+        self.future = None
+        self._changed = threading.Condition()
+
+    def _publish(self, update=None, done: bool = False, error: BaseException = None):
+        with self._changed:
+            if update is not None:
+                self.updates.append(update)
+            if done:
+                self.done, self.error, self.finished = True, error, time.perf_counter()
+            self._changed.notify_all()
+
+    def follow(self, poll_seconds: float = 0.5):
+        """Yields every update from the start, then new ones as they arrive, until the job ends."""
+        seen = 0
+        while True:
+            with self._changed:
+                while seen == len(self.updates) and not self.done:
+                    self._changed.wait(poll_seconds)
+                fresh, done = self.updates[seen:], self.done
+            seen += len(fresh)
+            yield from fresh
+            if done and seen == len(self.updates):
+                if self.error is not None:
+                    raise self.error
+                return
+
+    def cancel(self):
+        if self.future is not None:
+            self.future.cancel()
+
+
+class BackgroundLoop:
+    """A private event loop on a daemon thread plus a thread-safe submit API."""
+
+    def __init__(self, name: str = "agent-event-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._ids = itertools.count(1)
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+        self._ready.wait()
+        self.stats = {"submitted": 0, "jobs_started": 0, "jobs_finished": 0}
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._ready.set)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedules a coroutine on the loop; returns a concurrent.futures.Future."""
+        self.stats["submitted"] += 1
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout: float = None):
+        """Blocking helper for callers on other threads."""
+        return self.submit(coro).result(timeout)
+
+    def start_job(self, agen_factory) -> WorkflowJob:
+        """
+        Starts `agen_factory()` (a coroutine returning an async generator, or an
+        async generator function) on the loop and buffers its updates in a WorkflowJob.
+        """
+        job = WorkflowJob(next(self._ids))
+
+        async def drive():
+            try:
+                agen = agen_factory()
+                if asyncio.iscoroutine(agen):
+                    agen = await agen
+                async for update in agen:
+                    job._publish(update)
+            except BaseException as e:   # Includes cancellation; the follower must always be released
+                job._publish(done=True, error=e)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+            else:
+                job._publish(done=True)
+            finally:
+                self.stats["jobs_finished"] += 1
+
+        self.stats["jobs_started"] += 1
+        job.future = self.submit(drive())
+        return job
+
+    def stop(self):
+        """Cancels whatever is still running, then stops the loop and joins the thread."""
+        async def cancel_pending():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.run(cancel_pending(), timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+_default_loop = None
+_default_lock = threading.Lock()
+
+
+def get_background_loop() -> BackgroundLoop:
+    """Process-wide loop; Streamlit reruns and sessions all share it."""
+    global _default_loop
+    with _default_lock:
+        if _default_loop is None:
+            _default_loop = BackgroundLoop()
+        return _default_loop
+
+
+# --- BENCHMARK: BACK-TO-BACK EXECUTIONS ---
+def compare_back_to_back(runs: int = 30, model_seconds: float = 0.02, connect_seconds: float = 0.015):
+    """Two chat completions per run through PooledLiteLLMClient (LiteLLM + httpx) against model_client's mock Ollama."""
+    import litellm
+    from model_client import MOCK_MODEL, OLLAMA_NUM_PARALLEL, PooledLiteLLMClient, start_mock_ollama
+    litellm.suppress_debug_info = True
+    server_loop, port, counters = start_mock_ollama(model_seconds, connect_seconds, OLLAMA_NUM_PARALLEL)
+    client, api_base = PooledLiteLLMClient(), f"http://127.0.0.1:{port}"
+    print(f"🔁 Back-to-back executions ({runs} runs, mock model {model_seconds * 1000:.0f} ms, "
+          f"connection setup {connect_seconds * 1000:.0f} ms)")
+    print("-" * 72)
+    print(f"{'Mode':<28}{'p50 ms':>10}{'p95 ms':>10}{'Mean ms':>10}{'Conns':>8}")
+
+    async def workflow():
+        for _ in range(2):   # Two model calls, like a writer/judge pattern
+            await client.acompletion(MOCK_MODEL, [{"role": "user", "content": "ping"}], None, api_base=api_base)
+
+    for mode in ("asyncio.run per click", "persistent loop"):
+        opened_before = counters["connections"]
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            if mode == "persistent loop":
+                get_background_loop().run(workflow())
+            else:
+                asyncio.run(workflow())   # A fresh loop each time, so the loop-bound httpx pool starts cold
+            timings.append((time.perf_counter() - started) * 1000)
+        cuts = statistics.quantiles(timings, n=20)
+        print(f"{mode:<28}{statistics.median(timings):>10.1f}{cuts[18]:>10.1f}"
+              f"{statistics.mean(timings):>10.1f}{counters['connections'] - opened_before:>8}")
+    server_loop.stop()
+
+
+if __name__ == "__main__":
+    compare_back_to_back()
@@ -0,0 +1,68 @@
+"""
+Benchmark: Concurrent run_pattern Throughput
+Description: Fires N parallel run_pattern calls per pattern and reports
+             throughput, so session isolation can be checked for linear
+             scaling instead of flatlining on a shared session.
+
+Usage: python benchmark_concurrency.py --levels 1 2 4 8 --patterns 02 18
+"""
+import argparse
+import asyncio
+import time
+import agent_runtime
+from pattern_registry import discover_patterns, load_pattern
+
+BENCH_QUERY = "Summarize the top three risks of running a legacy ERP on-premise."
+
+
+async def drain(module, query: str):
+    """Runs one invocation to completion, exactly as the dashboard would."""
+    gen = await module.run_pattern(query)
+    async for _ in gen:
+        pass
+
+
+async def measure(module, concurrency: int, query: str) -> float:
+    """Returns wall-clock seconds for `concurrency` simultaneous invocations."""
+    started = time.perf_counter()
+    await asyncio.gather(*(drain(module, query) for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+
+async def main(levels, selected, query):
+    patterns = discover_patterns()
+    print("📈 Concurrent run_pattern Throughput Benchmark")
+    print("-" * 72)
+    print(f"{'Pattern':<32}{'N':>4}{'Wall (s)':>11}{'Runs/s':>10}{'Scaling':>11}")
+
+    for number, spec in patterns.items():
+        if selected and number not in selected:
+            continue
+        module_name = spec.module_name
+        module = load_pattern(spec)
+        baseline = None
+        for n in levels:
+            try:
+                wall = await measure(module, n, query)
+            except Exception as e:
+                print(f"{module_name:<32}{n:>4}   FAILED: {e}")
+                break
+            throughput = n / wall
+            baseline = baseline or throughput / n
+            # 1.00x means perfectly linear scaling relative to a single run
+            scaling = throughput / (baseline * n)
+            print(f"{module_name:<32}{n:>4}{wall:>11.2f}{throughput:>10.2f}{scaling:>10.2f}x")
+
+    stats = agent_runtime.runtime_stats()
+    print("-" * 72)
+    print(f"Sessions allocated: {stats['sessions_allocated']} | released: {stats['sessions_released']} "
+          f"| still live: {stats['live_sessions']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--patterns", nargs="*", default=[], help="Pattern numbers, e.g. 02 18")
+    parser.add_argument("--query", default=BENCH_QUERY)
+    args = parser.parse_args()
+    asyncio.run(main(args.levels, set(args.patterns), args.query))
@@ -0,0 +1,172 @@
+"""
+Context Budget (Compacted History for Multi-Turn Patterns)
+Description: Owns the conversation history of a multi-turn pattern instead of
+             letting the session replay every event verbatim. Each outgoing
+             message is deduplicated against history (paragraphs the model
+             has already seen become a short reference), older turns are
+             summarized once the prompt would exceed a token budget, and
+             every turn records its prompt tokens next to what the naive
+             replay would have sent. Pair it with an agent built with
+             include_contents="none", so the rendered prompt is all the
+             model receives.
+
+Run `python context_budget.py` for the per-round prompt-token comparison.
+"""
+import hashlib
+import re
+from collections import namedtuple
+
+# 1. Configuration
+DEFAULT_BUDGET_TOKENS = 1500    # Prompt size above which older turns are summarized
+KEEP_RECENT_TURNS = 2           # Always sent verbatim
+MIN_DEDUPE_CHARS = 80           # Shorter paragraphs are cheaper to repeat than to reference
+SUMMARY_SENTENCES = 2           # Per turn, for the extractive summarizer
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+PARAGRAPH_RE = re.compile(r"\n\s*\n")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+Turn = namedtuple("Turn", "index role text tokens")
+TurnStats = namedtuple("TurnStats", "round naive_tokens sent_tokens deduped_tokens summarized_turns")
+
+
+def count_tokens(text: str) -> int:
+    """Word/punctuation pieces; tracks BPE token counts closely enough for budgeting English prose."""
+    return len(TOKEN_RE.findall(text))
+
+
+def _fingerprint(paragraph: str) -> str:
+    return hashlib.blake2b(" ".join(paragraph.split()).lower().encode("utf-8"), digest_size=12).hexdigest()
+
+
+def extractive_summary(turns: list) -> str:
+    """No-LLM fallback: the first sentences of each turn, with any heading lines kept."""
+    lines = []
+    for turn in turns:
+        headings = [l.strip("# ").strip() for l in turn.text.splitlines() if l.lstrip().startswith("#")][:3]
+        body = " ".join(SENTENCE_RE.split(" ".join(turn.text.split()))[:SUMMARY_SENTENCES])
+        lines.append(f"- Turn {turn.index} ({turn.role}): {body}" + (f" [sections: {'; '.join(headings)}]" if headings else ""))
+    return "\n".join(lines)
+
+
+# 2. Context Window
+class ContextWindow:
+    """History + dedupe index + running summary for one conversation."""
+
+    def __init__(self, budget_tokens: int = DEFAULT_BUDGET_TOKENS, keep_recent: int = KEEP_RECENT_TURNS,
+                 summarize=None):
+        self.budget_tokens = budget_tokens
+        self.keep_recent = keep_recent
+        self.summarize = summarize       # Optional coroutine function: list[Turn] -> summary text
+        self.turns = []
+        self.summary = ""
+        self.summarized_upto = 0         # Turns before this index are represented by self.summary only
+        self.stats = []
+        self.naive_tokens = 0            # Running size of the verbatim history a plain session would replay
+        self._seen = {}                  # paragraph fingerprint -> latest turn index holding it
+
+    def add(self, role: str, text: str) -> Turn:
+        turn = Turn(len(self.turns) + 1, role, text, count_tokens(text))
+        self.turns.append(turn)
+        self.naive_tokens += turn.tokens
+        for paragraph in PARAGRAPH_RE.split(text):
+            if len(paragraph.strip()) >= MIN_DEDUPE_CHARS:
+                self._seen[_fingerprint(paragraph)] = turn.index   # Latest copy: the one most likely still verbatim
+        return turn
+
+    def dedupe(self, text: str) -> tuple:
+        """
+        Replaces paragraphs still present verbatim in history with a reference; a turn
+        already folded into the summary cannot be referenced. Returns (text, tokens_removed).
+        """
+        kept, removed, last_ref = [], 0, None
+        for paragraph in PARAGRAPH_RE.split(text):
+            source = self._seen.get(_fingerprint(paragraph)) if len(paragraph.strip()) >= MIN_DEDUPE_CHARS else None
+            if source is None or source <= self.summarized_upto:
+                kept.append(paragraph)
+                last_ref = None
+                continue
+            removed += count_tokens(paragraph)
+            if last_ref != source:   # A run of repeated paragraphs collapses into one reference
+                kept.append(f"[See turn {source} above.]")
+                last_ref = source
+        return "\n\n".join(kept), removed
+
+    def _history_text(self) -> str:
+        parts = [f"Summary of earlier turns:\n{self.summary}"] if self.summary else []
+        parts += [f"[Turn {t.index} - {t.role}]\n{t.text}" for t in self.turns[self.summarized_upto:]]
+        return "\n\n".join(parts)
+
+    async def _compact(self, message_tokens: int) -> int:
+        """Folds the oldest verbatim turns into the summary until the prompt fits. Returns turns summarized."""
+        folded = 0
+        while count_tokens(self._history_text()) + message_tokens > self.budget_tokens:
+            cutoff = len(self.turns) - self.keep_recent
+            if cutoff <= self.summarized_upto:
+                break   # Only the protected recent turns are left
+            batch = self.turns[self.summarized_upto:cutoff]
+            previous = [Turn(0, "summary", self.summary, count_tokens(self.summary))] if self.summary else []
+            if self.summarize:
+                self.summary = await self.summarize(previous + batch)
+            else:
+                self.summary = "\n".join(filter(None, [self.summary, extractive_summary(batch)]))
+            folded += len(batch)
+            self.summarized_upto = cutoff
+        return folded
+
+    async def render(self, message: str, round_label=None) -> str:
+        """
+        The full prompt for the next turn: summary + recent turns + the deduplicated
+        new message, which is recorded as a user turn. Record the reply with add().
+        """
+        raw_tokens = count_tokens(message)
+        naive = self.naive_tokens + raw_tokens
+        # Compacting can fold a turn a reference points to, so dedupe again until nothing more is folded
+        folded = 0
+        while True:
+            deduped, removed = self.dedupe(message)
+            step = await self._compact(count_tokens(deduped))
+            folded += step
+            if not step:
+                break
+        message = deduped
+        history = self._history_text()
+        prompt = f"{history}\n\n[Turn {len(self.turns) + 1} - user]\n{message}" if history else message
+        self.add("user", message)
+        self.naive_tokens += raw_tokens - self.turns[-1].tokens
+        self.stats.append(TurnStats(round_label if round_label is not None else len(self.stats) + 1,
+                                    naive, count_tokens(prompt), removed, folded))
+        return prompt
+
+    def report(self) -> str:
+        """Markdown table of naive vs sent prompt tokens per round."""
+        rows = ["| Round | Naive replay | Sent | Reduction | Deduped | Summarized turns |",
+                "|---|---|---|---|---|---|"]
+        for s in self.stats:
+            reduction = 1 - s.sent_tokens / s.naive_tokens if s.naive_tokens else 0.0
+            rows.append(f"| {s.round} | {s.naive_tokens:,} | {s.sent_tokens:,} | {reduction:.0%} | "
+                        f"{s.deduped_tokens:,} | {s.summarized_turns} |")
+        naive, sent = sum(s.naive_tokens for s in self.stats), sum(s.sent_tokens for s in self.stats)
+        if naive:
+            rows.append(f"| **Total** | {naive:,} | {sent:,} | {1 - sent / naive:.0%} | | |")
+        return "\n".join(rows)
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    async def demo(rounds: int = 4):
+        window = ContextWindow(budget_tokens=900)
+        draft = "\n\n".join(f"## Section {i}\n" + " ".join(["The plan upgrades the plant network in phases"] * 12) + "."
+                            for i in range(1, 5))
+        await window.render("Draft an IT strategy for a private 5G network.", 0)
+        window.add("assistant", draft)
+        for r in range(1, rounds + 1):
+            message = f"Your previous response was:\n\n{draft}\n\nFEEDBACK {r}: make it shorter and focus on ROI."
+            await window.render(message, r)
+            draft = "\n\n".join(f"## Revision {r}.{i}\n" + " ".join([f"Round {r} keeps ROI first for area {i}"] * 10) + "."
+                                for i in range(1, 4))
+            window.add("assistant", draft)
+        print("🧮 Prompt tokens per feedback round (draft pasted back each round, budget 900)\n")
+        print(window.report())
+
+    asyncio.run(demo())
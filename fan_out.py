@@ -0,0 +1,144 @@
+"""
+Fan-Out / Fan-In Engine (Bounded Concurrency, As-Completed Streaming)
+Description: Runs any number of perspective branches behind a semaphore,
+             each with its own timeout, and hands every result back the
+             moment it finishes instead of waiting for the slowest branch.
+             A reducer then merges the perspectives: rule_reduce() is a
+             deterministic merge (stance vote, shared themes, one key
+             point per perspective); pattern 03 puts an LLM synthesizer in
+             front of it and falls back to the rules if that fails. Pattern
+             02 dispatches its routed sub-requests through the same engine.
+
+Run `python fan_out.py` for wall time versus number of branches.
+"""
+import asyncio
+import random
+import re
+import time
+from collections import Counter, namedtuple
+
+# 1. Configuration
+DEFAULT_CONCURRENCY = 4
+DEFAULT_TIMEOUT_SECONDS = 120.0
+
+Branch = namedtuple("Branch", "name title call")   # call: zero-argument coroutine function returning text
+BranchResult = namedtuple("BranchResult", "name title text seconds status")   # status: ok | timeout | error
+
+STANCES = {
+    "proceed": re.compile(r"\b(?:recommend (?:proceeding|adopting|moving)|go ahead|proceed|strong(?:ly)? (?:support|case)"
+                          r"|clear (?:benefit|win)|should (?:adopt|move|invest))\b", re.IGNORECASE),
+    "caution": re.compile(r"\b(?:with caution|pilot|phased|mitigat\w*|conditional(?:ly)?|guardrails?|carefully"
+                          r"|proof of concept|poc)\b", re.IGNORECASE),
+    "defer": re.compile(r"\b(?:do not|don't|avoid|defer|postpone|not recommend|reject|too risky|hold off)\b", re.IGNORECASE),
+}
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+TERM_RE = re.compile(r"[a-z][a-z-]{4,}")
+STOPWORDS = {"about", "after", "their", "there", "these", "those", "which", "while", "would", "should", "could",
+             "other", "where", "being", "within", "across", "perspective", "analysis", "query", "strictly"}
+
+
+# 2. Fan-Out
+async def fan_out(branches: list, concurrency: int = DEFAULT_CONCURRENCY, timeout: float = DEFAULT_TIMEOUT_SECONDS):
+    """Async generator: yields a BranchResult per branch in completion order. A slow or failing branch never blocks the rest."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_branch(branch: Branch) -> BranchResult:
+        async with semaphore:
+            # The timeout starts once the branch holds a slot, so queueing never eats into its budget
+            started = time.perf_counter()
+            try:
+                text = await asyncio.wait_for(branch.call(), timeout)
+                return BranchResult(branch.name, branch.title, text, time.perf_counter() - started, "ok")
+            except asyncio.TimeoutError:
+                return BranchResult(branch.name, branch.title, f"No answer within {timeout:.0f}s.",
+                                    time.perf_counter() - started, "timeout")
+            except Exception as e:
+                return BranchResult(branch.name, branch.title, f"Branch failed: {e}", time.perf_counter() - started, "error")
+
+    tasks = [asyncio.create_task(run_branch(b)) for b in branches]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # The consumer stopped early (or was cancelled): do not leave branches running
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# 3. Rule-Based Reducer
+def classify_stance(text: str) -> str:
+    hits = {stance: len(pattern.findall(text)) for stance, pattern in STANCES.items()}
+    return max(hits, key=hits.get) if any(hits.values()) else "neutral"
+
+
+def key_point(text: str) -> str:
+    """The sentence carrying the perspective's recommendation, else its first substantive sentence."""
+    sentences = [s.strip(" -*#") for s in SENTENCE_RE.split(text) if len(s.split()) >= 6]
+    for sentence in sentences:
+        if any(p.search(sentence) for p in STANCES.values()):
+            return sentence
+    return sentences[0] if sentences else text.strip()[:200]
+
+
+def rule_reduce(query: str, results: list) -> str:
+    """Deterministic consensus: stance vote, themes raised by 2+ perspectives, one key point each."""
+    answered = [r for r in results if r.status == "ok"]
+    if not answered:
+        return "**Consensus unavailable:** no perspective completed."
+    stances = {r.title: classify_stance(r.text) for r in answered}
+    votes = Counter(stances.values())
+    leading, count = votes.most_common(1)[0]
+    query_terms = set(TERM_RE.findall(query.lower()))
+    per_branch = [set(TERM_RE.findall(r.text.lower())) - STOPWORDS - query_terms for r in answered]
+    shared = Counter(term for terms in per_branch for term in terms)
+    themes = [term for term, n in shared.most_common(8) if n >= 2]
+
+    verdicts = {"proceed": "Proceed", "caution": "Proceed in phases, with the mitigations below",
+                "defer": "Defer until the concerns below are resolved", "neutral": "No clear direction; more analysis needed"}
+    split = ", ".join(f"{title}: {stance}" for title, stance in stances.items())
+    lines = [f"**Strategic Consensus:** {verdicts[leading]} ({count}/{len(answered)} perspectives; {split})."]
+    if themes:
+        lines.append(f"**Shared themes:** {', '.join(themes)}")
+    lines += [f"- **{r.title}:** {key_point(r.text)}" for r in answered]
+    missing = [r.title for r in results if r.status != "ok"]
+    if missing:
+        lines.append(f"_Not included (timed out or failed): {', '.join(missing)}_")
+    return "\n".join(lines)
+
+
+# --- BENCHMARK: WALL TIME VS NUMBER OF BRANCHES ---
+def run_benchmark(branch_counts=(1, 2, 4, 8, 16, 32), limits=(4, None), mean_seconds: float = 2.0,
+                  time_scale: float = 0.02, seed: int = 3):
+    """Mock branches with log-normal latency around `mean_seconds`; times are reported in simulated seconds."""
+    print(f"🌿 Fan-out wall time vs branches (mock branches ~{mean_seconds:.0f}s each, log-normal)")
+    print("-" * 80)
+    print(f"{'Branches':>9}{'Limit':>7}{'Sequential s':>14}{'Fan-out wall s':>16}{'First result s':>16}")
+    for n in branch_counts:
+        for limit in limits:
+            rng = random.Random(seed + n)
+            latencies = [rng.lognormvariate(0, 0.35) * mean_seconds for _ in range(n)]
+
+            def make(seconds):
+                async def call():
+                    await asyncio.sleep(seconds * time_scale)
+                    return "We recommend proceeding with a phased pilot."
+                return call
+
+            async def measure():
+                started = time.perf_counter()
+                first = None
+                async for _ in fan_out([Branch(f"b{i}", f"B{i}", make(s)) for i, s in enumerate(latencies)],
+                                       concurrency=limit or n):
+                    first = first or time.perf_counter() - started
+                return time.perf_counter() - started, first
+
+            wall, first = asyncio.run(measure())
+            print(f"{n:>9}{str(limit or 'none'):>7}{sum(latencies):>14.1f}{wall / time_scale:>16.1f}{first / time_scale:>16.1f}")
+    print("\nasyncio.gather() shows nothing until the slowest branch ends (first result = wall time). With limit L,\n"
+          "wall time grows ~ceil(N/L) x branch time; against Ollama, L should match OLLAMA_NUM_PARALLEL,\n"
+          "since branches past that limit only queue on the server.")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,114 @@
+"""
+Local Embedders (Offline, Pluggable)
+Description: Turns text into L2-normalized float32 vectors without any
+             network access. The default HashingEmbedder uses signed feature
+             hashing over word unigrams, bigrams and character trigrams, so
+             paraphrases that share stems still land near each other. The
+             "content" variant drops stopwords, down-weights the trigrams
+             against whole words and, once fit() has seen a corpus, weights
+             every feature by its IDF, so short sentences are not dominated
+             by "the", "is" or shared word fragments. Other local models can be
+             plugged in through register_embedder().
+
+Usage:
+    embedder = get_embedder()                 # LOCAL_EMBEDDER env var, default "hashing"
+    vectors = embedder.embed(["text", ...])   # (n, embedder.dim) float32
+"""
+import hashlib
+import math
+import os
+import re
+from collections import Counter
+import numpy as np
+
+DEFAULT_DIM = 256
+WORD_RE = re.compile(r"[a-z0-9]+")
+TRIGRAM_WEIGHT = 0.4   # Content variant: a character trigram counts for less than a whole word
+STOPWORDS = frozenset(
+    "a an the this that these those is are was were be been being am do does did doing has have had having "
+    "i me my we our us you your he she it its they them their what which who whom how why when where there here "
+    "to of in on at by for from with about into after before since until again "
+    "and or but if so as than too very can could should would will shall may might must need needs "
+    "not no all any some each every more most much many just also only still even own same such other "
+    "s t get got keep keeps going please".split()
+)
+
+
+class HashingEmbedder:
+    """Deterministic feature-hashing embedder; no model files, no network."""
+
+    def __init__(self, dim: int = DEFAULT_DIM, content_only: bool = False):
+        self.name = f"{'content' if content_only else 'hashing'}:{dim}"
+        self.dim = dim
+        self.content_only = content_only
+        self.idf = None   # feature -> weight, learned by fit(); None weighs every feature 1.0
+
+    def fit(self, texts: list):
+        """Learns IDF weights from a corpus. Features the corpus never saw get no weight."""
+        n = len(texts)
+        df = Counter(feature for text in texts for feature in set(self._features(text)))
+        self.idf = {feature: math.log((1 + n) / (1 + count)) + 1 for feature, count in df.items()}
+        return self
+
+    def _features(self, text: str) -> list:
+        words = WORD_RE.findall(text.lower())
+        if self.content_only:
+            words = [w for w in words if w not in STOPWORDS]
+        features = list(words)
+        features += [f"{a}_{b}" for a, b in zip(words, words[1:])]
+        # Character trigrams make 'rotate'/'rotation' or 'password'/'passwords' overlap.
+        # The content variant marks them ('~') so they never share a weight with a 3-letter word
+        mark = "~" if self.content_only else ""
+        for word in words:
+            padded = f"#{word}#"
+            features += [mark + padded[i:i + 3] for i in range(len(padded) - 2)]
+        return features
+
+    def embed(self, texts: list) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                weight = 1.0 if self.idf is None else self.idf.get(feature, 0.0)
+                if feature[0] == "~":
+                    weight *= TRIGRAM_WEIGHT
+                if not weight:
+                    continue
+                digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                out[row, digest % self.dim] += weight if (digest >> 63) else -weight
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    """Adapter for a sentence-transformers model already on local disk (optional dependency)."""
+
+    def __init__(self, model_path: str):
+        from sentence_transformers import SentenceTransformer  # Imported lazily; only needed for this embedder
+        self.name = f"st:{model_path}"
+        self._model = SentenceTransformer(model_path, device="cpu")
+        self.dim = self._model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: list) -> np.ndarray:
+        vectors = self._model.encode(list(texts), batch_size=64, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+_EMBEDDERS = {
+    "hashing": lambda arg: HashingEmbedder(int(arg) if arg else DEFAULT_DIM),
+    "content": lambda arg: HashingEmbedder(int(arg) if arg else DEFAULT_DIM, content_only=True),
+    "st": lambda arg: SentenceTransformerEmbedder(arg),
+}
+
+
+def register_embedder(kind: str, factory):
+    """Registers a factory(arg) -> embedder with `.name`, `.dim` and `.embed(texts)`."""
+    _EMBEDDERS[kind] = factory
+
+
+def get_embedder(spec: str = None):
+    """Builds an embedder from a spec such as 'hashing', 'hashing:384', 'content:2048' or 'st:/models/minilm'."""
+    spec = spec or os.getenv("LOCAL_EMBEDDER", "hashing")
+    kind, _, arg = spec.partition(":")
+    if kind not in _EMBEDDERS:
+        raise ValueError(f"Unknown embedder '{kind}'. Registered: {sorted(_EMBEDDERS)}")
+    return _EMBEDDERS[kind](arg)
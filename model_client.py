@@ -0,0 +1,254 @@
+"""
+Shared Model Client (Pooled Ollama Connections)
+Description: One factory for every pattern's LiteLlm. Models are built once
+             per name and shared, and all Ollama traffic goes through a single
+             tuned HTTP pool per event loop: keep-alive connections, a
+             connection cap matched to Ollama's OLLAMA_NUM_PARALLEL, and a
+             bounded FIFO queue in front of it. Requests beyond the cap wait
+             on the client side instead of opening more sockets; once the
+             queue is full, new requests are refused with
+             ModelBackpressureError instead of piling up.
+
+Usage:
+    from model_client import get_model
+    OLLAMA_MODEL = get_model("ollama_chat/llama3.2")
+
+Run `python model_client.py` for the load test: LiteLLM's default client vs the
+pooled client, both against a local mock Ollama server.
+"""
+import asyncio
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from google.adk.models.lite_llm import LiteLLMClient
+from response_cache import CachedLiteLlm
+
+# 1. Configuration
+DEFAULT_MODEL = "ollama_chat/llama3.2"
+OLLAMA_PREFIXES = ("ollama/", "ollama_chat/")
+OLLAMA_NUM_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))   # Requests Ollama serves at once per model
+OLLAMA_MAX_QUEUE = int(os.getenv("OLLAMA_MAX_QUEUE", "512"))       # Same default as Ollama's own queue
+KEEPALIVE_SECONDS = 300.0        # Matches Ollama's default model keep-alive, so idle gaps between clicks reuse sockets
+REQUEST_TIMEOUT_SECONDS = 600.0  # Long generations on CPU-only hosts
+
+
+class ModelBackpressureError(RuntimeError):
+    """Raised when the request queue in front of Ollama is full."""
+
+
+# 2. Per-Loop Pool
+_stats = {"requests": 0, "queued": 0, "rejected": 0, "wait_seconds": 0.0, "peak_waiting": 0, "pools": 0}
+
+
+class ModelPool:
+    """Connection cap + bounded FIFO queue for one event loop (httpx clients and asyncio primitives are loop-bound)."""
+
+    def __init__(self, max_active: int = OLLAMA_NUM_PARALLEL, max_queued: int = OLLAMA_MAX_QUEUE):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.waiting = 0
+        self._slots = asyncio.Semaphore(max_active)
+        self._http = None
+        _stats["pools"] += 1
+
+    @asynccontextmanager
+    async def slot(self):
+        """Holds one of the max_active request slots; waits in FIFO order or refuses when the queue is full."""
+        _stats["requests"] += 1
+        if self._slots.locked():
+            if self.waiting >= self.max_queued:
+                _stats["rejected"] += 1
+                raise ModelBackpressureError(f"Ollama queue full ({self.waiting} waiting, {self.max_active} active)")
+            _stats["queued"] += 1
+        self.waiting += 1
+        _stats["peak_waiting"] = max(_stats["peak_waiting"], self.waiting)
+        started = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+            _stats["wait_seconds"] += time.perf_counter() - started
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    async def http_client(self):
+        """LiteLLM HTTP handler over one keep-alive httpx pool, capped at max_active connections."""
+        if self._http is None:
+            import httpx
+            from litellm.llms.custom_httpx.http_handler import AsyncHTTPHandler
+            handler = AsyncHTTPHandler(timeout=REQUEST_TIMEOUT_SECONDS, concurrent_limit=self.max_active)
+            default_client, handler.client = handler.client, httpx.AsyncClient(
+                timeout=REQUEST_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=self.max_active, max_keepalive_connections=self.max_active,
+                                    keepalive_expiry=KEEPALIVE_SECONDS),
+            )
+            self._http = handler
+            await default_client.aclose()   # The handler's own client never sent a request; release it anyway
+        return self._http
+
+    async def aclose(self):
+        """Closes the keep-alive connections; call before the owning event loop shuts down."""
+        if self._http is not None:
+            http, self._http = self._http, None
+            await http.client.aclose()
+
+
+_pools = weakref.WeakKeyDictionary()   # event loop -> ModelPool
+_pools_lock = threading.Lock()
+
+
+def get_pool() -> ModelPool:
+    """The pool for the running event loop (the dashboard's background loop keeps one for its lifetime)."""
+    loop = asyncio.get_running_loop()
+    with _pools_lock:
+        pool = _pools.get(loop)
+        if pool is None:
+            pool = _pools[loop] = ModelPool()
+        return pool
+
+
+def pool_stats() -> dict:
+    """Counters across all loops, for dashboard telemetry."""
+    waited = _stats["queued"]
+    return {**_stats, "avg_wait_ms": _stats["wait_seconds"] / waited * 1000 if waited else 0.0,
+            "max_connections": OLLAMA_NUM_PARALLEL}
+
+
+# 3. Pooled LiteLLM Client & Factory
+class PooledLiteLLMClient(LiteLLMClient):
+    """Routes every completion through the loop's ModelPool: shared HTTP client, slot held until the stream ends."""
+
+    async def acompletion(self, model, messages, tools, **kwargs):
+        pool = get_pool()
+        if "client" not in kwargs:
+            kwargs["client"] = await pool.http_client()
+        if not kwargs.get("stream"):
+            async with pool.slot():
+                return await super().acompletion(model, messages, tools, **kwargs)
+        return self._stream(pool, model, messages, tools, kwargs)
+
+    async def _stream(self, pool, model, messages, tools, kwargs):
+        # The slot is taken on first iteration and released when the stream ends or is closed early
+        async with pool.slot():
+            async for chunk in await super().acompletion(model, messages, tools, **kwargs):
+                yield chunk
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_model(model: str = DEFAULT_MODEL) -> CachedLiteLlm:
+    """Returns the shared model for `model`; Ollama models get the pooled client, cloud models keep LiteLLM's default."""
+    with _models_lock:
+        if model not in _models:
+            extra = {"llm_client": PooledLiteLLMClient()} if model.startswith(OLLAMA_PREFIXES) else {}
+            _models[model] = CachedLiteLlm(model=model, **extra)
+        return _models[model]
+
+
+# --- LOAD TEST: MOCK OLLAMA SERVER ---
+MOCK_MODEL = "ollama_chat/mock"
+
+
+def start_mock_ollama(model_seconds: float, handshake_seconds: float, num_parallel: int) -> tuple:
+    """
+    Keep-alive HTTP server that answers /api/chat like Ollama under load:
+    num_parallel generations at once (the rest wait in its queue), and a
+    per-connection handshake on a single acceptor, so bursts of new sockets
+    are set up serially.
+    """
+    from background_loop import BackgroundLoop
+    server_loop = BackgroundLoop(name="mock-ollama")
+    counters = {"connections": 0, "peak_open": 0, "open": 0, "requests": 0}
+    state = {}
+    chat_reply = json.dumps({"model": MOCK_MODEL.split("/", 1)[1], "created_at": "2024-01-01T00:00:00Z",
+                             "message": {"role": "assistant", "content": "ok"}, "done": True,
+                             "done_reason": "stop", "prompt_eval_count": 1, "eval_count": 1}).encode()
+
+    async def handle(reader, writer):
+        counters["connections"] += 1
+        counters["open"] += 1
+        counters["peak_open"] = max(counters["peak_open"], counters["open"])
+        try:
+            async with state["acceptor"]:
+                await asyncio.sleep(handshake_seconds)
+            while True:
+                request_line, *header_lines = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+                headers = dict(line.split(":", 1) for line in header_lines if ":" in line)
+                headers = {k.strip().lower(): v.strip() for k, v in headers.items()}
+                await reader.readexactly(int(headers.get("content-length", 0)))
+                if " /api/chat " in request_line:
+                    counters["requests"] += 1
+                    async with state["generators"]:
+                        await asyncio.sleep(model_seconds)
+                    body = chat_reply
+                else:
+                    body = b"{}"   # Metadata lookups (e.g. /api/show) are answered at once
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: keep-alive\r\n"
+                             b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            writer.close()
+        finally:
+            counters["open"] -= 1
+
+    async def start():
+        state["acceptor"], state["generators"] = asyncio.Lock(), asyncio.Semaphore(num_parallel)
+        return await asyncio.start_server(handle, "127.0.0.1", 0, backlog=1024)
+
+    server = server_loop.run(start())
+    return server_loop, server.sockets[0].getsockname()[1], counters
+
+
+async def simulate_users(client: LiteLLMClient, api_base: str, users: int, requests_per_user: int,
+                         think_seconds: float) -> list:
+    """Each user sends chat completions through `client` with a random think time between them; returns latencies in ms."""
+    latencies = []
+
+    async def user(rng):
+        for _ in range(requests_per_user):
+            await asyncio.sleep(rng.uniform(0, think_seconds))
+            started = time.perf_counter()
+            await client.acompletion(MOCK_MODEL, [{"role": "user", "content": "ping"}], None, api_base=api_base)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    try:
+        await asyncio.gather(*(user(random.Random(seed)) for seed in range(users)))
+    finally:
+        if isinstance(client, PooledLiteLLMClient):
+            await get_pool().aclose()
+    return latencies
+
+
+def run_load_test(users: int = 50, requests_per_user: int = 20, model_seconds: float = 0.05,
+                  handshake_seconds: float = 0.015, think_seconds: float = 1.0):
+    import litellm
+    litellm.suppress_debug_info = True
+    print(f"🔌 Load test: {users} concurrent users x {requests_per_user} requests, mock Ollama "
+          f"(NUM_PARALLEL={OLLAMA_NUM_PARALLEL}, {model_seconds * 1000:.0f} ms/generation, "
+          f"{handshake_seconds * 1000:.0f} ms/handshake, think time up to {think_seconds:.1f}s)")
+    print("-" * 78)
+    print(f"{'Client':<26}{'p50 ms':>9}{'p99 ms':>9}{'Wall s':>8}{'Conns opened':>14}{'Peak open':>11}")
+    for label, client in (("LiteLLM default client", LiteLLMClient()), ("PooledLiteLLMClient", PooledLiteLLMClient())):
+        server_loop, port, counters = start_mock_ollama(model_seconds, handshake_seconds, OLLAMA_NUM_PARALLEL)
+        started = time.perf_counter()
+        latencies = asyncio.run(simulate_users(client, f"http://127.0.0.1:{port}", users, requests_per_user,
+                                               think_seconds))
+        wall = time.perf_counter() - started
+        p99 = statistics.quantiles(latencies, n=100)[98]
+        print(f"{label:<26}{statistics.median(latencies):>9.0f}{p99:>9.0f}{wall:>8.2f}"
+              f"{counters['connections']:>14}{counters['peak_open']:>11}")
+        server_loop.stop()
+    print(f"\nPooled client counters: {pool_stats()}")
+
+
+if __name__ == "__main__":
+    run_load_test()
@@ -0,0 +1,129 @@
+"""
+Pattern Registry (Lazy Discovery & Loading)
+Description: Finds the 21 patterns from the numbered directories by file
+             name alone, so listing them costs a directory scan instead of
+             importing every module (and building its LiteLlm/Agent objects).
+             A pattern is imported on first use only, and the loaded module is
+             kept in a process-wide cache that survives Streamlit reruns.
+
+Run `python pattern_registry.py` for the import-time profile (cold start per
+pattern via `-X importtime`, plus warm-rerun cost).
+"""
+import glob
+import importlib
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+PatternSpec = namedtuple("PatternSpec", "number module_name folder path title")
+
+_loaded = {}            # module_name -> module
+_load_seconds = {}      # module_name -> first-import wall time
+_load_lock = threading.Lock()
+_stats = {"discoveries": 0, "loads": 0, "cache_hits": 0}
+
+
+def _title_of(path: str) -> str:
+    """Reads 'Pattern: <title>' from the module docstring without importing it."""
+    with open(path, encoding="utf-8") as f:
+        head = f.read(600)
+    match = re.search(r"Pattern:\s*([^\r\n(]+)", head)
+    return match.group(1).strip() if match else os.path.basename(os.path.dirname(path)).split("_", 1)[1].replace("_", " ")
+
+
+def discover_patterns(root: str = ROOT) -> dict:
+    """Maps pattern number ('01'..'21') to its PatternSpec. No pattern module is imported."""
+    _stats["discoveries"] += 1
+    found = {}
+    for path in glob.glob(os.path.join(root, "[0-9]*_*", "pattern_[0-9]*_*.py")):
+        folder, filename = os.path.split(path)
+        module_name = filename[:-3]
+        number = module_name.split("_")[1]
+        found[number] = PatternSpec(number, module_name, folder, path, _title_of(path))
+    return dict(sorted(found.items()))
+
+
+def load_pattern(spec: PatternSpec):
+    """Imports a pattern on first use (building its agents) and returns the cached module afterwards."""
+    module = _loaded.get(spec.module_name)
+    if module is not None:
+        _stats["cache_hits"] += 1
+        return module
+    with _load_lock:
+        if spec.module_name not in _loaded:
+            # Pattern folders hold helper modules (policy_index, guardrail_rules...) imported by bare name
+            if spec.folder not in sys.path:
+                sys.path.append(spec.folder)
+            started = time.perf_counter()
+            _loaded[spec.module_name] = importlib.import_module(spec.module_name)
+            _load_seconds[spec.module_name] = time.perf_counter() - started
+            _stats["loads"] += 1
+        return _loaded[spec.module_name]
+
+
+def registry_stats() -> dict:
+    """Counters plus per-module first-import times, for dashboard telemetry."""
+    return {**_stats, "loaded": len(_loaded), "load_seconds": dict(_load_seconds)}
+
+
+# --- IMPORT-TIME PROFILE ---
+def profile_import(spec: PatternSpec, top: int = 5) -> tuple:
+    """
+    Cold-imports one pattern in a fresh interpreter with `-X importtime`.
+    Returns (total_seconds, [(cumulative_us, package)]) for the module and its heaviest direct imports.
+    """
+    code = f"import sys; sys.path[:0] = [{ROOT!r}, {spec.folder!r}]; import {spec.module_name}"
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    total = time.perf_counter() - started
+    heaviest = []
+    for line in result.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | <indent>package"; two spaces of indent per nesting level,
+        # so depth 1 holds the imports made directly by the pattern module
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| ( *)(\S.*)$", line)
+        if match and len(match.group(2)) // 2 <= 1:
+            heaviest.append((int(match.group(1)), match.group(3).strip()))
+    if result.returncode != 0:
+        heaviest = [(0, result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")]
+    return total, sorted(heaviest, reverse=True)[:top]
+
+
+def run_profile(numbers=None):
+    print("⏱️ Pattern Registry Import Profile")
+    print("-" * 78)
+    started = time.perf_counter()
+    patterns = discover_patterns()
+    discover_ms = (time.perf_counter() - started) * 1000
+    print(f"Discovery of {len(patterns)} patterns (no imports): {discover_ms:.2f} ms")
+
+    print(f"\n{'Pattern':<28}{'Cold import s':>14}  Module + heaviest direct imports (cumulative ms)")
+    for number, spec in patterns.items():
+        if numbers and number not in numbers:
+            continue
+        total, heaviest = profile_import(spec, top=3)
+        detail = ", ".join(f"{pkg} {us / 1000:.0f}" if us else pkg for us, pkg in heaviest)
+        print(f"{spec.module_name:<28}{total:>14.2f}  {detail}")
+
+    print("\nWarm rerun (Streamlit re-executes the script; modules stay cached):")
+    selected = [s for n, s in patterns.items() if not numbers or n in numbers]
+    for label in ("first load", "rerun"):
+        started = time.perf_counter()
+        discover_patterns()
+        failures = 0
+        for spec in selected:
+            try:
+                load_pattern(spec)
+            except Exception:
+                failures += 1
+        note = f" ({failures} failed to import)" if failures else ""
+        print(f"  {label:<12}{(time.perf_counter() - started) * 1000:>10.1f} ms{note}")
+
+
+if __name__ == "__main__":
+    run_profile(set(sys.argv[1:]) or None)
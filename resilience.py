@@ -0,0 +1,256 @@
+"""
+Tool Resilience Engine (Retry, Circuit Breaker, Hedging, Fallback)
+Description: Reusable wrapper for agent tool functions. Failures are absorbed
+             locally with jittered exponential backoff, per-tool circuit
+             breakers with half-open probing, hedged requests and a cache of
+             last-known-good values (served with a DEGRADED label and only up
+             to max_stale seconds old), so a flaky backend no longer costs a
+             full LLM round trip to "explain the failure".
+
+Usage:
+    @resilient(retry=RetryPolicy(max_attempts=4), hedge_after=0.25)
+    def query_legacy_system(system_name: str) -> str: ...
+
+Run `python resilience.py` for the seeded fault-injection benchmark.
+"""
+import asyncio
+import functools
+import inspect
+import random
+import statistics
+import time
+from tool_runtime import as_tool
+
+DEFAULT_MAX_STALE_SECONDS = 300.0   # Older last-known-good values are not served; `fallback` answers instead
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised when a call is short-circuited because the tool's breaker is open."""
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter: sleep ~ U(0, min(max_delay, base * 2^attempt))."""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.1, max_delay: float = 2.0,
+                 retry_on: tuple = (ConnectionError, TimeoutError)):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+
+    def backoff(self, attempt: int, rng: random.Random) -> float:
+        return rng.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """
+    Classic three-state breaker. After `failure_threshold` consecutive failures
+    the circuit opens; once `reset_timeout` has elapsed a single half-open probe
+    is let through, and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 5.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = self.clock()
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        """Frees a half-open probe that ended without a verdict (e.g. cancelled), so another can run."""
+        self._probe_in_flight = False
+
+
+class ResilientTool:
+    """Async callable that applies timeout, hedging, retry, breaker and fallback to one tool."""
+
+    def __init__(self, func, retry: RetryPolicy = None, breaker: CircuitBreaker = None,
+                 timeout: float = None, hedge_after: float = None, fallback=None, seed: int = None,
+                 max_stale: float = DEFAULT_MAX_STALE_SECONDS, clock=None):
+        self.func = func
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.clock = clock or self.breaker.clock
+        self.max_stale = max_stale
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.fallback = fallback
+        self.rng = random.Random(seed)
+        self.last_good = {}   # normalized args -> (last successful result, clock time it was stored)
+        self.stats = {"calls": 0, "successes": 0, "retries": 0, "hedges": 0,
+                      "short_circuits": 0, "fallbacks": 0, "failures": 0}
+        functools.update_wrapper(self, func)
+
+    async def _attempt(self, args, kwargs):
+        if inspect.iscoroutinefunction(self.func):
+            call = self.func(*args, **kwargs)
+        else:
+            call = asyncio.to_thread(self.func, *args, **kwargs)
+        return await asyncio.wait_for(call, self.timeout) if self.timeout else await call
+
+    async def _hedged(self, args, kwargs):
+        """Starts a duplicate attempt if the first is slower than hedge_after; first success wins."""
+        pending = {asyncio.ensure_future(self._attempt(args, kwargs))}
+        if self.hedge_after is not None:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_after)
+            if not done:
+                pending.add(asyncio.ensure_future(self._attempt(args, kwargs)))
+                self.stats["hedges"] += 1
+
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            # Read every outcome so a failed duplicate never logs "exception was never retrieved"
+            outcomes = [(task, task.exception()) for task in done]
+            winners = [task for task, exc in outcomes if exc is None]
+            if winners:
+                for loser in pending:
+                    loser.cancel()
+                return winners[0].result()
+            error = outcomes[-1][1]
+        raise error
+
+    async def __call__(self, *args, **kwargs):
+        self.stats["calls"] += 1
+        key = repr((args, sorted(kwargs.items())))
+        error = None
+
+        for attempt in range(self.retry.max_attempts):
+            if not self.breaker.allow():
+                self.stats["short_circuits"] += 1
+                error = CircuitOpenError(f"Circuit open for {self.func.__name__}")
+                break
+            try:
+                result = await self._hedged(args, kwargs)
+            except self.retry.retry_on as e:
+                self.breaker.record_failure()
+                error = e
+                if attempt + 1 < self.retry.max_attempts:
+                    self.stats["retries"] += 1
+                    await asyncio.sleep(self.retry.backoff(attempt, self.rng))
+                continue
+            except Exception:
+                # Not retried, but still a failed call: a half-open probe must reach a verdict
+                self.breaker.record_failure()
+                raise
+            except BaseException:
+                self.breaker.release_probe()   # Cancelled: says nothing about the backend
+                raise
+            self.breaker.record_success()
+            self.last_good[key] = (result, self.clock())
+            self.stats["successes"] += 1
+            return result
+
+        # All attempts exhausted (or circuit open): degrade instead of failing the agent turn
+        if key in self.last_good:
+            value, stored_at = self.last_good[key]
+            age = self.clock() - stored_at
+            if self.max_stale is None or age <= self.max_stale:
+                self.stats["fallbacks"] += 1
+                return _label_cached(value, age)
+        if self.fallback is not None:
+            self.stats["fallbacks"] += 1
+            return self.fallback(*args, **kwargs)
+        self.stats["failures"] += 1
+        raise error
+
+
+def _label_cached(value, age: float):
+    """A cached value must never read like a live one: strings get a DEGRADED prefix, other results a flag."""
+    if isinstance(value, str):
+        return f"DEGRADED (cached {age:.0f}s ago): {value}"
+    return {"degraded": True, "cached_seconds_ago": round(age), "value": value}
+
+
+def resilient(**options):
+    """Decorator form of ResilientTool. The wrapped tool is always awaitable."""
+    def wrap(func):
+        return as_tool(ResilientTool(func, **options), func, "resilience")
+    return wrap
+
+
+# --- DETERMINISTIC FAULT-INJECTION HARNESS ---
+def make_flaky_backend(failure_rate: float, rng: random.Random, base_latency: float):
+    """Backend whose failures and latencies are fully determined by the seeded RNG."""
+    async def backend(system_name: str) -> str:
+        latency = base_latency * rng.lognormvariate(0, 0.6)
+        fails = rng.random() < failure_rate
+        await asyncio.sleep(latency)
+        if fails:
+            raise ConnectionError(f"{system_name} unreachable")
+        return f"SUCCESS: {system_name}"
+    return backend
+
+
+async def run_fault_injection(failure_rates=(0.1, 0.3, 0.5, 0.7, 0.9), calls: int = 200,
+                              seed: int = 42, base_latency: float = 0.002):
+    """Compares a bare tool against the resilient wrapper under injected failure rates."""
+    print("🧪 Fault-Injection Harness (seed=%d, %d calls per cell)" % (seed, calls))
+    print("-" * 78)
+    print(f"{'Fail %':>7}{'Mode':>11}{'Success':>10}{'Fallback':>10}{'Error':>8}{'p50 ms':>10}{'p99 ms':>10}{'Retries':>9}")
+
+    for rate in failure_rates:
+        for mode in ("bare", "resilient"):
+            rng = random.Random(seed)
+            backend = make_flaky_backend(rate, rng, base_latency)
+            if mode == "resilient":
+                tool = ResilientTool(
+                    backend,
+                    retry=RetryPolicy(max_attempts=4, base_delay=base_latency, max_delay=base_latency * 8),
+                    breaker=CircuitBreaker(failure_threshold=8, reset_timeout=base_latency * 20),
+                    hedge_after=base_latency * 3,
+                    fallback=lambda name: f"DEGRADED: {name}",
+                    seed=seed,
+                )
+            else:
+                tool = backend
+
+            latencies, outcomes = [], {"ok": 0, "fallback": 0, "error": 0}
+            for i in range(calls):
+                started = time.perf_counter()
+                fallbacks_before = tool.stats["fallbacks"] if mode == "resilient" else 0
+                try:
+                    # A small key space lets the last-known-good cache participate
+                    await tool(f"system-{i % 10}")
+                    degraded = mode == "resilient" and tool.stats["fallbacks"] > fallbacks_before
+                    outcomes["fallback" if degraded else "ok"] += 1
+                except ConnectionError:
+                    outcomes["error"] += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+                # Steady arrival rate, so open breakers see real time pass before probing
+                await asyncio.sleep(base_latency)
+
+            cuts = statistics.quantiles(latencies, n=100)
+            retries = tool.stats["retries"] if mode == "resilient" else 0
+            print(f"{rate:>7.0%}{mode:>11}{outcomes['ok'] / calls:>10.1%}{outcomes['fallback'] / calls:>10.1%}"
+                  f"{outcomes['error'] / calls:>8.1%}{cuts[49]:>10.2f}{cuts[98]:>10.2f}{retries:>9}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_fault_injection())
@@ -0,0 +1,164 @@
+"""
+Content-Addressed LLM Response Cache
+Description: Sits in front of LiteLlm so that repeated prompts (dashboard
+             samples, fixed templates, compliance checks) are answered from
+             cache instead of going back to Ollama. Entries are keyed on the
+             model, the agent instruction and the full message content, and
+             live in two tiers: an in-memory LRU and an on-disk SQLite store
+             with TTL and size-based eviction.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from google.adk.models.lite_llm import LiteLlm
+from google.adk.models.llm_response import LlmResponse
+
+# 1. Configuration
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".llm_cache.sqlite3"))
+CACHE_TTL_SECONDS = 24 * 60 * 60     # Disk entries older than a day are treated as misses
+MEMORY_MAX_ENTRIES = 256             # Hot tier capacity
+DISK_MAX_BYTES = 64 * 1024 * 1024    # Cold tier is trimmed (least recently used first) above 64 MB
+CACHE_ENABLED = os.getenv("LLM_CACHE", "on").lower() != "off"   # Benchmarks turn it off to measure real model latency
+
+
+class ResponseCache:
+    """Two-tier (memory LRU + SQLite) cache of serialized LLM responses."""
+
+    def __init__(self, path: str = CACHE_PATH, ttl_seconds: float = CACHE_TTL_SECONDS,
+                 memory_max_entries: int = MEMORY_MAX_ENTRIES, disk_max_bytes: int = DISK_MAX_BYTES):
+        self.enabled = CACHE_ENABLED
+        self.ttl_seconds = ttl_seconds
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_bytes = disk_max_bytes
+        self._memory = OrderedDict()   # key -> (payload, stored_at)
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, payload TEXT NOT NULL, size INTEGER NOT NULL, "
+            "stored_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, instruction: str, contents: str, tools: str = "") -> str:
+        """SHA-256 over everything that determines the model's answer."""
+        digest = hashlib.sha256()
+        for part in (model, instruction, contents, tools):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get(self, key: str):
+        """Returns the cached payload or None. Promotes disk hits into memory."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[1] < self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry[0]
+            self._memory.pop(key, None)
+
+            row = self._db.execute("SELECT payload, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] < self.ttl_seconds:
+                self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                self._db.commit()
+                self._remember(key, row[0], row[1])
+                self.stats["disk_hits"] += 1
+                return row[0]
+            if row:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                self.stats["evictions"] += 1
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, payload: str):
+        """Stores a payload in both tiers and trims the disk tier to its size budget."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, payload, now)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, payload, size, stored_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload.encode("utf-8")), now, now),
+            )
+            self._trim_disk()
+            self._db.commit()
+            self.stats["stores"] += 1
+
+    def _remember(self, key: str, payload: str, stored_at: float):
+        self._memory[key] = (payload, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+
+    def _trim_disk(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.disk_max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.stats["evictions"] += 1
+            total -= size
+            if total <= self.disk_max_bytes:
+                break
+
+    def snapshot(self) -> dict:
+        """Counters plus the overall hit rate, for dashboard telemetry."""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {**self.stats, "hit_rate": hits / lookups if lookups else 0.0, "memory_entries": len(self._memory)}
+
+
+_default_cache = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache shared by every CachedLiteLlm instance."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
+
+
+class CachedLiteLlm(LiteLlm):
+    """LiteLlm with the response cache in front of every generate call."""
+
+    async def generate_content_async(self, llm_request, stream: bool = False):
+        cache = get_response_cache()
+        if not cache.enabled:
+            async for response in super().generate_content_async(llm_request, stream=stream):
+                yield response
+            return
+
+        config = llm_request.config
+        instruction = str(config.system_instruction) if config and config.system_instruction else ""
+        tools = ",".join(sorted(llm_request.tools_dict)) if llm_request.tools_dict else ""
+        contents = json.dumps([c.model_dump(mode="json", exclude_none=True) for c in llm_request.contents], sort_keys=True)
+        key = ResponseCache.make_key(self.model, instruction, contents, tools)
+
+        cached = cache.get(key)
+        if cached is not None:
+            for item in json.loads(cached):
+                yield LlmResponse.model_validate(item)
+            return
+
+        # Only complete (non-partial) responses are stored; streamed deltas pass straight through
+        finals = []
+        async for response in super().generate_content_async(llm_request, stream=stream):
+            if not response.partial:
+                finals.append(response)
+            yield response
+
+        if finals and not any(r.error_code for r in finals):
+            cache.put(key, json.dumps([r.model_dump(mode="json", exclude_none=True) for r in finals]))
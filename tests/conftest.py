@@ -0,0 +1,14 @@
+"""Shared test setup: root modules and pattern folders are imported by bare name, as pattern_registry does."""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def add_to_path(*folders: str):
+    for folder in (ROOT,) + tuple(os.path.join(ROOT, f) for f in folders):
+        if folder not in sys.path:
+            sys.path.insert(0, folder)
+
+
+add_to_path()
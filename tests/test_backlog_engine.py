@@ -0,0 +1,22 @@
+"""Rule-first triage must never fall back to a tier whose only evidence is negated."""
+import asyncio
+
+from conftest import add_to_path
+
+add_to_path("20_Prioritization")
+
+from backlog_engine import BacklogEngine, classify_rules
+
+
+def test_negated_top_tier_falls_back_to_next_live_tier():
+    assert classify_rules("No outage, just add a dark mode toggle") == (None, False)
+    assert classify_rules("Not down, but the app is slow after the upgrade") == ("P2", False)
+
+
+def test_llm_failure_on_negated_item_does_not_promote_to_p0():
+    async def failing_llm(text: str) -> str:
+        raise TimeoutError("model unavailable")
+
+    engine = BacklogEngine(llm_classify=failing_llm, default_priority="P2")
+    assert asyncio.run(engine.classify("No outage, just add a dark mode toggle")) == ("P2", "rules")
+    assert asyncio.run(BacklogEngine().classify("No outage, just add a dark mode toggle")) == ("P2", "rules")
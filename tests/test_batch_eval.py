@@ -0,0 +1,52 @@
+"""Checkpoint resume in the batch evaluation harness after a run was killed mid-write."""
+import asyncio
+import importlib
+import json
+import sys
+import types
+
+import pytest
+
+from conftest import add_to_path
+
+add_to_path("19_EvaluationAndMonitoring")
+
+
+@pytest.fixture
+def batch_eval(monkeypatch):
+    # Only the checkpoint logic is under test; the writer/judge pair and the response cache need ADK
+    monkeypatch.setitem(sys.modules, "response_cache", types.SimpleNamespace(get_response_cache=lambda: None))
+    monkeypatch.setitem(sys.modules, "pattern_19_evaluation",
+                        types.SimpleNamespace(RUBRIC={}, grade_proposal=None))
+    monkeypatch.delitem(sys.modules, "batch_eval", raising=False)
+    module = importlib.import_module("batch_eval")
+    yield module
+    sys.modules.pop("batch_eval", None)
+
+
+async def fake_grade(prompt: str) -> dict:
+    return {"proposal": f"re: {prompt}", "audit_report": "ok", "writer_seconds": 0.0, "judge_seconds": 0.0,
+            "scores": {"Clarity": 4}}
+
+
+def _row(item_id: str) -> str:
+    return json.dumps({"id": item_id, "mean_score": 4}) + "\n"
+
+
+def test_torn_line_in_the_middle_does_not_hide_later_rows(batch_eval, tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    path.write_text(_row("a") + '{"id": "b", "mean_sc' + "\n" + _row("c") + _row("d"), encoding="utf-8")
+    assert sorted(batch_eval.load_checkpoint(str(path))) == ["a", "c", "d"]
+
+
+def test_resume_after_torn_tail_keeps_every_row(batch_eval, tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    path.write_text(_row("a") + '{"id": "b", "propos', encoding="utf-8")   # Killed while writing b
+
+    items = [("a", "first"), ("b", "second"), ("c", "third")]
+    done = asyncio.run(batch_eval.run_batch(items, concurrency=2, checkpoint_path=str(path), grade=fake_grade))
+    assert sorted(done) == ["a", "b", "c"]
+
+    # The fragment was cut before appending, so every line parses and a later resume sees all rows
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert sorted(json.loads(line)["id"] for line in lines) == ["a", "b", "c"]
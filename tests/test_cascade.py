@@ -0,0 +1,52 @@
+"""Speculative cascade: the premium task is always collected, whatever happens to eco."""
+import asyncio
+
+import pytest
+
+from conftest import add_to_path
+
+add_to_path("16_ResourceAwareOptimization")
+
+pytest.importorskip("numpy")
+from cascade import run_cascade
+
+QUERY = "Plan the ERP consolidation budget"
+GOOD_ANSWER = ("Plan:\n- Option 1: consolidate the ERP budget in 3 phases over 12 months.\n"
+               + "Rationale: the erp consolidation budget plan is sound. " * 8)
+
+
+def _other_tasks() -> list:
+    return [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+
+def test_failed_premium_is_retrieved_when_eco_passes():
+    async def eco():
+        await asyncio.sleep(0.02)
+        return GOOD_ANSWER
+
+    async def premium():
+        raise RuntimeError("premium down")
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        unretrieved = []
+        loop.set_exception_handler(lambda _, context: unretrieved.append(context))
+        result = await run_cascade(QUERY, eco, premium, 0.1, speculative=True)
+        return result, unretrieved
+
+    result, unretrieved = asyncio.run(main())
+    assert result.answer == GOOD_ANSWER and not result.premium_cancelled
+    assert unretrieved == []
+
+
+def test_cancelling_the_cascade_cancels_speculative_premium():
+    async def main():
+        cascade = asyncio.ensure_future(run_cascade(QUERY, lambda: asyncio.sleep(5), lambda: asyncio.sleep(5),
+                                                    0.1, speculative=True))
+        await asyncio.sleep(0.02)
+        cascade.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cascade
+        return _other_tasks()
+
+    assert asyncio.run(main()) == []
@@ -0,0 +1,55 @@
+"""Pattern 07 pipeline with the response cache enabled: a replayed answer carries no partial deltas."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("google.adk")
+pytest.importorskip("litellm")
+
+from conftest import add_to_path
+
+add_to_path("7_MultiAgent_Collaboration")
+
+from google.adk.models.lite_llm import LiteLlm
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+import response_cache
+
+BLUEPRINT = "## Network\nSegment the estate into VLANs.\n\n## Identity\nFederate sign-in through Okta.\n"
+
+
+def _response(text: str, partial: bool) -> LlmResponse:
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]), partial=partial)
+
+
+async def _fake_generate(self, llm_request, stream: bool = False):
+    """Architect streams the blueprint in deltas; Security answers in one final response."""
+    instruction = str(llm_request.config.system_instruction)
+    text = BLUEPRINT if "Architect" in instruction else "NO MATERIAL RISKS"
+    if stream:
+        for i in range(0, len(text), 16):
+            yield _response(text[i:i + 16], partial=True)
+    yield _response(text, partial=False)
+
+
+async def _final_report(module, query: str) -> str:
+    updates = [update async for update in module.execute_pipeline(query)]
+    return updates[-1]
+
+
+def test_pipeline_reviews_sections_on_cache_hit(monkeypatch, tmp_path):
+    monkeypatch.setattr(LiteLlm, "generate_content_async", _fake_generate)
+    cache = response_cache.ResponseCache(path=str(tmp_path / "llm_cache.sqlite3"))
+    cache.enabled = True
+    monkeypatch.setattr(response_cache, "_default_cache", cache)
+    import pattern_07_multi_agent as pattern
+
+    query = "Design a zero-trust rollout for the branch offices"
+    cold = asyncio.run(_final_report(pattern, query))
+    warm = asyncio.run(_final_report(pattern, query))   # Architect answer now replayed from the cache
+
+    assert cache.snapshot()["memory_hits"] >= 1
+    for report in (cold, warm):
+        assert "Segment the estate into VLANs" in report
+        assert "2 sections reviewed" in report
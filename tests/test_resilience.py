@@ -0,0 +1,97 @@
+"""Circuit breaker recovery after half-open probes, and how last-known-good values are served."""
+import asyncio
+
+import pytest
+
+from resilience import CircuitBreaker, ResilientTool, RetryPolicy
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _open_tool(backend):
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5.0, clock=clock)
+    breaker.record_failure()   # Open, as after a real outage
+    clock.now = 10.0           # Past reset_timeout: the next call is the half-open probe
+    return ResilientTool(backend, retry=RetryPolicy(max_attempts=1), breaker=breaker), clock
+
+
+def test_probe_error_not_in_retry_on_reopens_circuit():
+    calls = []
+
+    async def backend(name: str) -> str:
+        calls.append(name)
+        if len(calls) == 1:
+            raise ValueError("malformed response")
+        return f"SUCCESS: {name}"
+
+    tool, clock = _open_tool(backend)
+    with pytest.raises(ValueError):
+        asyncio.run(tool("erp"))
+    assert tool.breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 20.0
+    assert asyncio.run(tool("erp")) == "SUCCESS: erp"
+    assert tool.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_probe_releases_half_open_slot():
+    async def backend(name: str) -> str:
+        await asyncio.sleep(10)
+
+    tool, _ = _open_tool(backend)
+
+    async def cancel_probe():
+        task = asyncio.ensure_future(tool("erp"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_probe())
+    assert tool.breaker.state == CircuitBreaker.HALF_OPEN
+    assert tool.breaker.allow()   # A new probe may go through
+
+
+def _flaky_after_first_call(clock):
+    calls = []
+
+    async def backend(name: str) -> str:
+        calls.append(name)
+        if len(calls) > 1:
+            raise ConnectionError(f"{name} unreachable")
+        return f"SUCCESS: {name} 99.9% uptime"
+
+    breaker = CircuitBreaker(failure_threshold=10, clock=clock)
+    return backend, breaker
+
+
+def test_last_known_good_is_labelled_with_its_age():
+    clock = FakeClock()
+    backend, breaker = _flaky_after_first_call(clock)
+    tool = ResilientTool(backend, retry=RetryPolicy(max_attempts=1), breaker=breaker, max_stale=60.0)
+
+    assert asyncio.run(tool("erp")) == "SUCCESS: erp 99.9% uptime"
+    clock.now = 42.0
+    assert asyncio.run(tool("erp")) == "DEGRADED (cached 42s ago): SUCCESS: erp 99.9% uptime"
+
+
+def test_stale_last_known_good_gives_way_to_fallback():
+    clock = FakeClock()
+    backend, breaker = _flaky_after_first_call(clock)
+    tool = ResilientTool(backend, retry=RetryPolicy(max_attempts=1), breaker=breaker, max_stale=60.0,
+                         fallback=lambda name: f"DEGRADED: {name} historical average")
+
+    asyncio.run(tool("erp"))
+    clock.now = 61.0
+    assert asyncio.run(tool("erp")) == "DEGRADED: erp historical average"
+
+    tool.fallback = None   # Without a fallback, a stale value is still never served
+    with pytest.raises(ConnectionError):
+        asyncio.run(tool("erp"))
@@ -0,0 +1,259 @@
+"""
+Tool Execution Layer (TTL Cache, Single-Flight, Thread Offload)
+Description: Wraps agent tool functions so that repeated calls stop hitting
+             slow backends. Results are cached per tool with a TTL, keyed on
+             normalized arguments (defaults applied, whitespace collapsed,
+             case folded unless the tool is case-sensitive); identical calls
+             already in flight share one backend request; synchronous tools
+             run in a shared thread pool so they never block the event loop.
+             Every tool exports its hit rate and a latency histogram.
+
+Usage:
+    @cached_tool(ttl_seconds=60)
+    def check_system_latency(region: str) -> str: ...
+
+Run `python tool_runtime.py` for the cold/warm benchmark with a slow mock backend.
+"""
+import asyncio
+import functools
+import inspect
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# 1. Configuration
+TOOL_THREADS = int(os.getenv("TOOL_THREADS", "16"))   # Shared by every synchronous tool
+DEFAULT_TTL_SECONDS = 60.0
+DEFAULT_MAX_ENTRIES = 1024
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+_executor = ThreadPoolExecutor(max_workers=TOOL_THREADS, thread_name_prefix="tool")
+_registry = {}   # "module.qualname" -> ToolCache; re-decorating (e.g. a module reload) replaces the entry
+
+
+def as_tool(wrapper, func, attr: str):
+    """
+    Exposes an async callable object as a plain coroutine function with
+    `func`'s name, signature and docstring, so ADK's introspection is
+    unchanged. The object stays reachable as `<tool>.<attr>`.
+    """
+    @functools.wraps(func)
+    async def call(*args, **kwargs):
+        return await wrapper(*args, **kwargs)
+
+    setattr(call, attr, wrapper)
+    return call
+
+
+class LatencyHistogram:
+    """Cumulative-style bucket counts (Prometheus 'le' semantics) plus a running sum."""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total_ms = 0.0
+        self.observations = 0
+
+    def observe(self, ms: float):
+        self.observations += 1
+        self.total_ms += ms
+        for i, bound in enumerate(self.buckets):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation."""
+        if not self.observations:
+            return 0.0
+        target, seen = q * self.observations, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.buckets[-1]
+
+    def snapshot(self) -> dict:
+        running, cumulative = 0, {}
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            cumulative["+Inf" if bound == float("inf") else f"{bound:g}"] = running
+        return {"le_ms": cumulative, "count": self.observations,
+                "mean_ms": self.total_ms / self.observations if self.observations else 0.0}
+
+
+class ToolCache:
+    """Async callable that serves one tool from a TTL cache and coalesces identical in-flight calls."""
+
+    def __init__(self, func, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 case_sensitive: bool = False, clock=time.monotonic):
+        self.func = func
+        self.name = func.__name__
+        self.key = f"{func.__module__}.{func.__qualname__}"
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.case_sensitive = case_sensitive
+        self.clock = clock
+        self.signature = inspect.signature(func)
+        self._entries = OrderedDict()   # key -> (result, expires_at)
+        self._in_flight = {}            # key -> Task shared by every caller waiting on it
+        self.latency = LatencyHistogram()           # What callers saw, hits included
+        self.backend_latency = LatencyHistogram()   # Misses only: the cost of the real backend
+        self.stats = {"calls": 0, "hits": 0, "coalesced": 0, "misses": 0, "errors": 0, "evictions": 0}
+        functools.update_wrapper(self, func)
+
+    def _normalize(self, value):
+        if isinstance(value, str):
+            value = " ".join(value.split())
+            return value if self.case_sensitive else value.casefold()
+        if isinstance(value, (list, tuple)):
+            return tuple(self._normalize(v) for v in value)
+        if isinstance(value, dict):
+            return tuple(sorted((k, self._normalize(v)) for k, v in value.items()))
+        return value
+
+    def make_key(self, args, kwargs) -> tuple:
+        bound = self.signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return tuple((name, self._normalize(value)) for name, value in bound.arguments.items())
+
+    async def _invoke(self, args, kwargs):
+        if inspect.iscoroutinefunction(self.func):
+            return await self.func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(self.func, *args, **kwargs))
+
+    async def _fetch(self, key, args, kwargs):
+        """The one backend call behind a key; its result is cached and shared by every waiter."""
+        started = time.perf_counter()
+        try:
+            result = await self._invoke(args, kwargs)
+        except Exception:
+            self.stats["errors"] += 1   # Errors are never cached; the next call retries the backend
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+            self.backend_latency.observe((time.perf_counter() - started) * 1000)
+        self._entries[key] = (result, self.clock() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        return result
+
+    async def __call__(self, *args, **kwargs):
+        started = time.perf_counter()
+        self.stats["calls"] += 1
+        key = self.make_key(args, kwargs)
+        try:
+            entry = self._entries.get(key)
+            if entry and entry[1] > self.clock():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[0]
+
+            task = self._in_flight.get(key)
+            if task is not None:
+                self.stats["coalesced"] += 1
+            else:
+                self.stats["misses"] += 1
+                task = asyncio.ensure_future(self._fetch(key, args, kwargs))
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())   # Never "exception was never retrieved"
+                self._in_flight[key] = task
+            # A caller that gives up does not cancel the backend call the others are waiting on
+            return await asyncio.shield(task)
+        finally:
+            self.latency.observe((time.perf_counter() - started) * 1000)
+
+    def invalidate(self, *args, **kwargs):
+        """Drops one entry, or the whole cache when called without arguments."""
+        if args or kwargs:
+            self._entries.pop(self.make_key(args, kwargs), None)
+        else:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        served = self.stats["hits"] + self.stats["coalesced"]
+        return {**self.stats, "hit_rate": served / self.stats["calls"] if self.stats["calls"] else 0.0,
+                "entries": len(self._entries), "latency": self.latency.snapshot(),
+                "backend_latency": self.backend_latency.snapshot()}
+
+
+def cached_tool(**options):
+    """Decorator form of ToolCache. The wrapped tool is always awaitable."""
+    def wrap(func):
+        cache = ToolCache(func, **options)
+        _registry[cache.key] = cache
+        return as_tool(cache, func, "cache")
+    return wrap
+
+
+def tool_metrics() -> dict:
+    """Per-tool counters, hit rate and latency histograms for every cached tool in the process."""
+    return {key: cache.snapshot() for key, cache in _registry.items()}
+
+
+def metrics_report(tools: list = None) -> str:
+    """Markdown summary for the dashboard: one row per cached tool (only `tools`, if given)."""
+    caches = [tool.cache for tool in tools] if tools else list(_registry.values())
+    rows = ["| Tool | Calls | Hit rate | Coalesced | Backend calls | p50 | p99 |", "|---|---|---|---|---|---|---|"]
+    for cache in caches:
+        s = cache.snapshot()
+        p50, p99 = ((f"≤{cache.latency.quantile(q):g} ms" if s["calls"] else "-") for q in (0.5, 0.99))
+        rows.append(f"| `{cache.name}` | {s['calls']} | {s['hit_rate']:.0%} | {s['coalesced']} | {s['misses']} | {p50} | {p99} |")
+    return "\n".join(rows)
+
+
+# --- BENCHMARK: SLOW MOCK BACKEND ---
+if __name__ == "__main__":
+    import random
+
+    BACKEND_SECONDS = 0.08
+
+    def slow_latency_lookup(region: str) -> str:
+        time.sleep(BACKEND_SECONDS)   # A blocking client, as most vendor SDKs are
+        return f"NETWORK_STATUS: {region} ok"
+
+    async def loop_lag(stop: asyncio.Event, samples: list):
+        """Measures how late a 5 ms ticker wakes up; a blocked event loop shows up here."""
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            samples.append((time.perf_counter() - started - 0.005) * 1000)
+
+    async def run(label: str, tool, users: int = 20, calls_per_user: int = 10):
+        rng = random.Random(7)
+        regions = ["us-east", "eu-west", "ap-south", "US-East ", "eu-central", "sa-east"]
+        stop, lag = asyncio.Event(), []
+        ticker = asyncio.create_task(loop_lag(stop, lag))
+        started = time.perf_counter()
+
+        async def user():
+            for _ in range(calls_per_user):
+                region = rng.choice(regions)
+                if inspect.iscoroutinefunction(tool):
+                    await tool(region)
+                else:
+                    tool(region)   # What a plain sync tool does inside the loop today
+                    await asyncio.sleep(0)
+
+        await asyncio.gather(*(user() for _ in range(users)))
+        wall = time.perf_counter() - started
+        stop.set()
+        await ticker
+        print(f"{label:<28}{users * calls_per_user:>7}{wall:>10.2f}s{max(lag, default=0):>14.1f} ms")
+
+    async def main():
+        print(f"🔧 Tool execution benchmark (mock backend {BACKEND_SECONDS * 1000:.0f} ms, 20 users x 10 calls)\n")
+        print(f"{'Mode':<28}{'Calls':>7}{'Wall':>11}{'Max loop lag':>17}")
+        await run("plain sync tool", slow_latency_lookup)
+        await run("thread pool, no TTL cache", cached_tool(ttl_seconds=0)(slow_latency_lookup))
+        cached = cached_tool(ttl_seconds=30)(slow_latency_lookup)
+        await run("cached + single-flight", cached)
+        await run("cached, warm", cached)
+        s = cached.cache.snapshot()
+        print(f"\ncached tool: hits {s['hits']}, coalesced {s['coalesced']}, backend calls {s['misses']}, hit rate {s['hit_rate']:.0%}")
+        print(metrics_report())
+
+    asyncio.run(main())
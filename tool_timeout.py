@@ -0,0 +1,102 @@
+"""
+Tool Call Timeouts (Bounded Waits Within One Agent Turn)
+Description: ADK already runs the function calls of one model turn
+             concurrently, so what stalls a turn is a single hung backend:
+             every other call has answered and the model still waits for
+             the slowest one. timed_tool() bounds each call by a timeout and
+             answers with a message the model can act on instead of hanging
+             the turn. Sync tools are offloaded to a thread first; a thread
+             that is still blocked keeps running, the turn just stops
+             waiting for it. Stacked on cached_tool, the abandoned backend
+             call still completes and fills the cache for the next turn.
+
+Usage:
+    @timed_tool(timeout=10)
+    @cached_tool(ttl_seconds=15)
+    def check_system_latency(region: str) -> str: ...
+
+Run `python tool_timeout.py` for the hung-backend benchmark.
+"""
+import asyncio
+import inspect
+import os
+import time
+from tool_runtime import as_tool
+
+# 1. Configuration
+DEFAULT_CALL_TIMEOUT = float(os.getenv("TOOL_CALL_TIMEOUT", "15"))
+
+
+# 2. Timeout Wrapper
+class TimedTool:
+    """Async callable that bounds one tool call by `timeout` seconds and reports a timeout as the tool's answer."""
+
+    def __init__(self, func, timeout: float = DEFAULT_CALL_TIMEOUT):
+        self.func = func
+        self.name = func.__name__
+        self.timeout = timeout
+        self.stats = {"calls": 0, "timeouts": 0}
+
+    async def __call__(self, *args, **kwargs):
+        self.stats["calls"] += 1
+        if inspect.iscoroutinefunction(self.func):
+            call = self.func(*args, **kwargs)
+        else:
+            call = asyncio.to_thread(self.func, *args, **kwargs)
+        try:
+            return await asyncio.wait_for(call, self.timeout)
+        except asyncio.TimeoutError:
+            self.stats["timeouts"] += 1
+            return f"{self.name} did not answer within {self.timeout:g}s; report it as unavailable."
+
+
+def timed_tool(**options):
+    """Decorator form of TimedTool. The wrapped tool is always awaitable."""
+    def wrap(func):
+        return as_tool(TimedTool(func, **options), func, "timing")
+    return wrap
+
+
+def timeout_summary(tools: list) -> str:
+    """One dashboard line: timed-out calls across `tools`."""
+    calls = sum(tool.timing.stats["calls"] for tool in tools)
+    timeouts = sum(tool.timing.stats["timeouts"] for tool in tools)
+    return f"**Tool timeouts:** {timeouts} of {calls} calls (limit {tools[0].timing.timeout:g}s)"
+
+
+# --- BENCHMARK: ONE HUNG BACKEND IN A CONCURRENT TURN ---
+if __name__ == "__main__":
+    HUNG_SECONDS = 2.0
+
+    def check_latency(region: str) -> str:
+        time.sleep(0.2)   # Blocking client
+        return f"{region}: 24ms"
+
+    async def query_plane(plane: str) -> str:
+        await asyncio.sleep(0.25)
+        return f"{plane}: ok"
+
+    def legacy_backend(target: str) -> str:
+        time.sleep(HUNG_SECONDS)
+        return f"{target}: finally answered"
+
+    async def untimed(func, *args):
+        return await func(*args) if inspect.iscoroutinefunction(func) else await asyncio.to_thread(func, *args)
+
+    async def turn(call) -> tuple:
+        """ADK's same-turn execution, modelled as asyncio.gather over the turn's calls."""
+        started = time.perf_counter()
+        results = await asyncio.gather(call(check_latency, "us-east"), call(query_plane, "prod"),
+                                       call(legacy_backend, "mainframe"))
+        return time.perf_counter() - started, results
+
+    async def main():
+        timed = {func: timed_tool(timeout=1.0)(func) for func in (check_latency, query_plane, legacy_backend)}
+        print(f"⏱️ One turn, 3 concurrent calls, one backend hung for {HUNG_SECONDS:g}s\n")
+        print(f"{'Mode':<22}{'Turn':>8}  Answers")
+        for label, call in (("no timeout", untimed), ("timed_tool(1s)", lambda func, *args: timed[func](*args))):
+            seconds, results = await turn(call)
+            print(f"{label:<22}{seconds:>7.2f}s  {results}")
+        print(f"\n{timeout_summary(list(timed.values()))}")
+
+    asyncio.run(main())